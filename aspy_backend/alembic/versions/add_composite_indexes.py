@@ -0,0 +1,64 @@
+# alembic/versions/add_composite_indexes.py
+"""Add composite indexes for per-user hot queries
+Revision ID: add_composite_indexes
+Create Date: 2026-10-17 12:00:00
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'add_composite_indexes'
+down_revision = 'add_usage_counters'
+branch_labels = None
+depends_on = None
+
+# name -> table and column list; IF NOT EXISTS because create_all may have built them already
+INDEXES = {
+    'ix_transpiler_jobs_user_submitted': 'transpiler_jobs (user_id, submitted_at)',
+    'ix_transpiler_jobs_user_status_submitted': 'transpiler_jobs (user_id, status, submitted_at)',
+    'ix_code_executions_user_created': 'code_executions (user_id, created_at)',
+    'ix_subscriptions_user_status': 'subscriptions (user_id, status)',
+    'ix_invoices_user_created': 'invoices (user_id, created_at)',
+}
+
+# Single-column indexes the composites above start with
+REDUNDANT = {
+    'ix_transpiler_jobs_user_id': 'transpiler_jobs (user_id)',
+    'ix_transpiler_jobs_idempotency_key': 'transpiler_jobs (idempotency_key)',
+    'ix_code_executions_user_id': 'code_executions (user_id)',
+}
+
+
+def upgrade():
+    # Keep an idempotency key only on the first job that used it, so the
+    # unique index can be built over rows written before it was enforced
+    op.execute("""
+        UPDATE transpiler_jobs SET idempotency_key = NULL
+        WHERE idempotency_key IS NOT NULL AND id NOT IN (
+            SELECT DISTINCT ON (user_id, idempotency_key) id
+            FROM transpiler_jobs
+            WHERE idempotency_key IS NOT NULL
+            ORDER BY user_id, idempotency_key, submitted_at, id
+        )
+    """)
+
+    # CONCURRENTLY keeps the tables writable while the indexes build; it
+    # cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {columns}")
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_transpiler_jobs_user_idempotency_key "
+            "ON transpiler_jobs (user_id, idempotency_key) WHERE idempotency_key IS NOT NULL"
+        )
+        for name in REDUNDANT:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, columns in REDUNDANT.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {columns}")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_transpiler_jobs_user_idempotency_key")
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,28 @@
+# alembic/versions/add_execution_id_unique.py
+"""Make code_executions.execution_id unique again, with created_at
+Revision ID: add_execution_id_unique
+Create Date: 2026-10-17 21:00:00
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'add_execution_id_unique'
+down_revision = 'add_usage_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Partitioning dropped the unique index on execution_id; a unique
+    # constraint on the partitioned table has to include created_at
+    op.create_unique_constraint(
+        'uq_code_executions_execution_id_created_at', 'code_executions', ['execution_id', 'created_at']
+    )
+    # The constraint's index also serves lookups by execution_id
+    op.drop_index('ix_code_executions_execution_id', table_name='code_executions')
+
+
+def downgrade():
+    op.create_index('ix_code_executions_execution_id', 'code_executions', ['execution_id'])
+    op.drop_constraint('uq_code_executions_execution_id_created_at', 'code_executions', type_='unique')
@@ -0,0 +1,45 @@
+# alembic/versions/add_keyset_indexes.py
+"""Extend per-user listing indexes with id for keyset pagination
+Revision ID: add_keyset_indexes
+Create Date: 2026-10-17 14:00:00
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'add_keyset_indexes'
+down_revision = 'add_composite_indexes'
+branch_labels = None
+depends_on = None
+
+# Listings page on (timestamp, id); with id in the index the order and the
+# cursor comparison are both served by the index, without a sort
+REPLACED = {
+    'ix_transpiler_jobs_user_submitted': (
+        'ix_transpiler_jobs_user_submitted_id', 'transpiler_jobs (user_id, submitted_at, id)',
+        'transpiler_jobs (user_id, submitted_at)'),
+    'ix_transpiler_jobs_user_status_submitted': (
+        'ix_transpiler_jobs_user_status_submitted_id', 'transpiler_jobs (user_id, status, submitted_at, id)',
+        'transpiler_jobs (user_id, status, submitted_at)'),
+    'ix_code_executions_user_created': (
+        'ix_code_executions_user_created_id', 'code_executions (user_id, created_at, id)',
+        'code_executions (user_id, created_at)'),
+    'ix_invoices_user_created': (
+        'ix_invoices_user_created_id', 'invoices (user_id, created_at, id)',
+        'invoices (user_id, created_at)'),
+}
+
+
+def upgrade():
+    # Build each replacement before dropping the old index so the listing is never unindexed
+    with op.get_context().autocommit_block():
+        for old_name, (new_name, new_columns, _) in REPLACED.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {new_name} ON {new_columns}")
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {old_name}")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for old_name, (new_name, _, old_columns) in REPLACED.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {old_name} ON {old_columns}")
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {new_name}")
@@ -0,0 +1,145 @@
+# alembic/versions/add_payload_blobs.py
+"""Move job code, output and logs into a compressed content-addressed blob table
+Revision ID: add_payload_blobs
+Create Date: 2026-10-17 16:00:00
+
+"""
+import hashlib
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'add_payload_blobs'
+down_revision = 'add_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+# Old text column -> new hash column
+PAYLOADS = {
+    'code': 'code_ref',
+    'transpiled_code': 'transpiled_code_ref',
+    'execution_output': 'output_ref',
+    'errors': 'errors_ref',
+    'logs': 'logs_ref',
+}
+BATCH = 500
+
+blobs = sa.table(
+    'payload_blobs',
+    sa.column('hash', sa.String), sa.column('codec', sa.String),
+    sa.column('size', sa.Integer), sa.column('data', sa.LargeBinary),
+)
+jobs = sa.table(
+    'transpiler_jobs', sa.column('id', sa.String), sa.column('output_preview', sa.String),
+    *[sa.column(name, sa.Text) for name in PAYLOADS], *[sa.column(ref, sa.String) for ref in PAYLOADS.values()],
+)
+
+
+def encode(text):
+    # Same format as PayloadStore.encode with the default zlib codec
+    raw = text.encode('utf-8')
+    codec, data = 'raw', raw
+    if len(raw) >= 256:
+        compressed = zlib.compress(raw, 6)
+        if len(compressed) < len(raw):
+            codec, data = 'zlib', compressed
+    return {'hash': hashlib.sha256(raw).hexdigest(), 'codec': codec, 'size': len(raw), 'data': data}
+
+
+def decode(blob):
+    data = blob.data
+    if blob.codec == 'zlib':
+        data = zlib.decompress(data)
+    elif blob.codec == 'zstd':
+        import zstandard
+        data = zstandard.ZstdDecompressor().decompress(data, max_output_size=blob.size)
+    return data.decode('utf-8')
+
+
+def upgrade():
+    op.create_table(
+        'payload_blobs',
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('codec', sa.String(length=8), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('hash')
+    )
+    for ref in PAYLOADS.values():
+        op.add_column('transpiler_jobs', sa.Column(ref, sa.String(length=64), nullable=True))
+    op.add_column('transpiler_jobs', sa.Column('output_preview', sa.String(length=103), nullable=True))
+
+    # Move existing payloads over in batches, keyed on id so memory stays flat
+    bind = op.get_bind()
+    last_id = ''
+    while True:
+        rows = bind.execute(
+            sa.select(jobs.c.id, *[jobs.c[name] for name in PAYLOADS])
+            .where(jobs.c.id > last_id).order_by(jobs.c.id).limit(BATCH)
+        ).mappings().all()
+        if not rows:
+            break
+        new_blobs, updates = {}, []
+        for row in rows:
+            update = {'job_id': row['id']}
+            for name, ref in PAYLOADS.items():
+                blob = encode(row[name]) if row[name] is not None else None
+                if blob:
+                    new_blobs[blob['hash']] = blob
+                update[f'new_{ref}'] = blob['hash'] if blob else None
+            output = row['execution_output']
+            update['new_output_preview'] = output[:100] + ('...' if len(output) > 100 else '') if output else None
+            updates.append(update)
+        bind.execute(
+            postgresql.insert(blobs).values(list(new_blobs.values())).on_conflict_do_nothing(index_elements=['hash'])
+        )
+        bind.execute(
+            jobs.update().where(jobs.c.id == sa.bindparam('job_id')).values(
+                **{ref: sa.bindparam(f'new_{ref}') for ref in PAYLOADS.values()},
+                output_preview=sa.bindparam('new_output_preview')
+            ),
+            updates
+        )
+        last_id = rows[-1]['id']
+
+    op.alter_column('transpiler_jobs', 'code_ref', nullable=False)
+    # The freed space is reused by new rows; VACUUM FULL (or pg_repack) returns it to the OS
+    for name in PAYLOADS:
+        op.drop_column('transpiler_jobs', name)
+
+
+def downgrade():
+    for name in PAYLOADS:
+        op.add_column('transpiler_jobs', sa.Column(name, sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    last_id = ''
+    while True:
+        rows = bind.execute(
+            sa.select(jobs.c.id, *[jobs.c[ref] for ref in PAYLOADS.values()])
+            .where(jobs.c.id > last_id).order_by(jobs.c.id).limit(BATCH)
+        ).mappings().all()
+        if not rows:
+            break
+        hashes = {row[ref] for row in rows for ref in PAYLOADS.values() if row[ref]}
+        texts = {
+            blob.hash: decode(blob) for blob in bind.execute(sa.select(blobs).where(blobs.c.hash.in_(hashes)))
+        }
+        bind.execute(
+            jobs.update().where(jobs.c.id == sa.bindparam('job_id')).values(
+                **{name: sa.bindparam(f'new_{name}') for name in PAYLOADS}
+            ),
+            [{'job_id': row['id'], **{f'new_{name}': texts.get(row[ref]) for name, ref in PAYLOADS.items()}}
+             for row in rows]
+        )
+        last_id = rows[-1]['id']
+
+    op.alter_column('transpiler_jobs', 'code', nullable=False)
+    op.drop_column('transpiler_jobs', 'output_preview')
+    for ref in PAYLOADS.values():
+        op.drop_column('transpiler_jobs', ref)
+    op.drop_table('payload_blobs')
@@ -0,0 +1,38 @@
+# alembic/versions/add_usage_counters.py
+"""Add per-period usage counters for execution quotas
+Revision ID: add_usage_counters
+Create Date: 2026-10-17 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_usage_counters'
+down_revision = 'add_webhook_url'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'usage_counters',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('period', sa.String(length=7), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('user_id', 'period')
+    )
+
+    # Seed the current month from existing jobs so quotas carry over
+    op.execute("""
+        INSERT INTO usage_counters (user_id, period, count)
+        SELECT user_id, to_char(now() AT TIME ZONE 'UTC', 'YYYY-MM'), count(id)
+        FROM transpiler_jobs
+        WHERE submitted_at >= date_trunc('month', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+        GROUP BY user_id
+    """)
+
+
+def downgrade():
+    op.drop_table('usage_counters')
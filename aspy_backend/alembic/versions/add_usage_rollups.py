@@ -0,0 +1,41 @@
+# alembic/versions/add_usage_rollups.py
+"""Add per-user daily usage rollups
+Revision ID: add_usage_rollups
+Create Date: 2026-10-17 19:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_usage_rollups'
+down_revision = 'partition_job_tables'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'usage_rollups',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('language', sa.String(length=50), nullable=False),
+        sa.Column('executions', sa.Integer(), nullable=False),
+        sa.Column('successes', sa.Integer(), nullable=False),
+        sa.Column('execution_ms', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('user_id', 'day', 'language')
+    )
+    # Same as `python -m app.maintenance rollups`, in one statement
+    op.execute("""
+        INSERT INTO usage_rollups (user_id, day, language, executions, successes, execution_ms)
+        SELECT user_id, (submitted_at AT TIME ZONE 'UTC')::date, language,
+               count(*), count(*) FILTER (WHERE success), coalesce(sum(execution_time_ms), 0)
+        FROM transpiler_jobs
+        WHERE status IN ('COMPLETED', 'FAILED')
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade():
+    op.drop_table('usage_rollups')
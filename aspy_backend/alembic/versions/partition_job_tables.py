@@ -0,0 +1,130 @@
+# alembic/versions/partition_job_tables.py
+"""Range-partition transpiler_jobs and code_executions by month
+Revision ID: partition_job_tables
+Create Date: 2026-10-17 18:00:00
+
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'partition_job_tables'
+down_revision = 'add_payload_blobs'
+branch_labels = None
+depends_on = None
+
+# Same layout as app.services.partition_service; later months are created by
+# `python -m app.maintenance partitions`
+MONTHS_AHEAD = 3
+TABLES = {
+    'transpiler_jobs': {
+        'column': 'submitted_at',
+        'indexes': {
+            'ix_transpiler_jobs_user_submitted_id': '(user_id, submitted_at, id)',
+            'ix_transpiler_jobs_user_status_submitted_id': '(user_id, status, submitted_at, id)',
+            'ix_transpiler_jobs_code_hash': '(code_hash)',
+        },
+        'foreign_keys': {},
+    },
+    'code_executions': {
+        'column': 'created_at',
+        'indexes': {
+            'ix_code_executions_user_created_id': '(user_id, created_at, id)',
+            'ix_code_executions_id': '(id)',
+            'ix_code_executions_execution_id': '(execution_id)',
+            'ix_code_executions_code_hash': '(code_hash)',
+        },
+        'foreign_keys': {'code_executions_user_id_fkey': 'FOREIGN KEY (user_id) REFERENCES users (id)'},
+    },
+}
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def rebuild(table, spec, partitioned):
+    """Copy ``table`` into a fresh (partitioned or plain) table and swap it in.
+
+    Runs in the migration's transaction, so readers wait on the table lock
+    rather than seeing a half-copied table.
+    """
+    column, bind = spec['column'], op.get_bind()
+    op.execute(f"UPDATE {table} SET {column} = now() WHERE {column} IS NULL")
+    op.execute(f"LOCK TABLE {table} IN EXCLUSIVE MODE")
+
+    partition_by = f" PARTITION BY RANGE ({column})" if partitioned else ""
+    primary_key = f"id, {column}" if partitioned else "id"
+    op.execute(
+        f"CREATE TABLE {table}_new (LIKE {table} INCLUDING DEFAULTS, PRIMARY KEY ({primary_key})){partition_by}"
+    )
+    op.execute(f"ALTER TABLE {table}_new ALTER COLUMN {column} SET NOT NULL")
+    if partitioned:
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table}_new DEFAULT")
+        oldest = bind.execute(sa.text(f"SELECT min({column}) FROM {table}")).scalar()
+        now = datetime.now(timezone.utc)
+        month = (oldest or now).astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        while month < add_months(now, MONTHS_AHEAD):
+            op.execute(
+                f"CREATE TABLE {table}_p{month:%Y_%m} PARTITION OF {table}_new "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{add_months(month, 1):%Y-%m-%d} 00:00:00+00')"
+            )
+            month = add_months(month, 1)
+    op.execute(f"INSERT INTO {table}_new SELECT * FROM {table}")
+
+    # The id sequence must outlive the old table it is attached to
+    if table == 'code_executions':
+        op.execute("ALTER SEQUENCE code_executions_id_seq OWNED BY NONE")
+    op.execute(f"DROP TABLE {table}")
+    op.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    op.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {table}_new_pkey TO {table}_pkey")
+    if table == 'code_executions':
+        op.execute("ALTER SEQUENCE code_executions_id_seq OWNED BY code_executions.id")
+    for name, columns in spec['indexes'].items():
+        op.execute(f"CREATE INDEX {name} ON {table} {columns}")
+    for name, definition in spec['foreign_keys'].items():
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+
+
+def upgrade():
+    # Unique indexes on a partitioned table must include the partition key,
+    # so idempotency keys are claimed in a table of their own
+    op.create_table(
+        'job_idempotency_keys',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('idempotency_key', sa.String(length=100), nullable=False),
+        sa.Column('job_id', sa.String(length=50), nullable=False),
+        sa.Column('submitted_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'idempotency_key')
+    )
+    op.execute("""
+        INSERT INTO job_idempotency_keys (user_id, idempotency_key, job_id, submitted_at)
+        SELECT user_id, idempotency_key, id, coalesce(submitted_at, now())
+        FROM transpiler_jobs WHERE idempotency_key IS NOT NULL
+        ON CONFLICT DO NOTHING
+    """)
+
+    op.add_column('payload_blobs', sa.Column('used_at', sa.DateTime(timezone=True), server_default=sa.text('now()')))
+    op.execute("UPDATE payload_blobs SET used_at = created_at WHERE created_at IS NOT NULL")
+    op.create_index('ix_payload_blobs_used_at', 'payload_blobs', ['used_at'])
+
+    op.execute("DROP INDEX IF EXISTS uq_transpiler_jobs_user_idempotency_key")
+    for table, spec in TABLES.items():
+        rebuild(table, spec, partitioned=True)
+
+
+def downgrade():
+    # Archived months are not restored; load them from ARCHIVE_DIR first if needed
+    for table, spec in TABLES.items():
+        rebuild(table, spec, partitioned=False)
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_transpiler_jobs_user_idempotency_key "
+        "ON transpiler_jobs (user_id, idempotency_key) WHERE idempotency_key IS NOT NULL"
+    )
+
+    op.drop_index('ix_payload_blobs_used_at', table_name='payload_blobs')
+    op.drop_column('payload_blobs', 'used_at')
+    op.drop_table('job_idempotency_keys')
@@ -13,6 +13,7 @@ from .webhooks import router as webhooks_router
 from .billing import router as billing_router
 from .invoice import router as invoice_router
 from .transpiler import router as transpiler_router
+from .metrics import router as metrics_router
 
 # Include all routers without additional prefixes — each sub-router declares its own paths
 router.include_router(auth_router, tags=["Authentication"])
@@ -22,6 +23,8 @@ router.include_router(payments_router, tags=["Payments"])
 router.include_router(webhooks_router, tags=["Webhooks"])
 router.include_router(billing_router, tags=["Billing"])
 router.include_router(invoice_router, tags=["Invoices"])
+# Metrics must be registered before the transpiler's catch-all /{job_id} route
+router.include_router(metrics_router, tags=["Metrics"])
 router.include_router(transpiler_router, tags=["Transpiler"])
 
 # Health check endpoint at /api/v1/health (kept for completeness)
@@ -1,8 +1,8 @@
 # app/api/v1/billing.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, select
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel
@@ -27,7 +27,9 @@ from ....db.session import get_db
 from ....models.invoice import Invoice as InvoiceModel
 from ....models.subscription import Subscription, SubscriptionStatus, Plan
 from ....models.user import User
-from ....models.code_execution import CodeExecution
+from ....services.plan_service import plan_catalog
+from ....services.usage_service import usage_rollups
+from ...pagination import MAX_PAGE_SIZE, count_query, paginate, split_page, total_info
 from ...security import get_current_user
 
 router = APIRouter()
@@ -198,13 +200,19 @@ class UsageStats(BaseModel):
 
 @router.get("/billing/invoices", response_model=Dict[str, Any], tags=["Billing"])
 def get_invoices(
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_total: bool = False,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
-    """Get all invoices for current user"""
-    invoices = db.query(InvoiceModel).filter(
-        InvoiceModel.user_id == current_user.id
-    ).order_by(InvoiceModel.created_at.desc()).all()
+    """Get current user's invoices, newest first, one cursor page at a time"""
+    query = select(InvoiceModel).where(InvoiceModel.user_id == current_user.id)
+    invoices = db.execute(
+        paginate(query, InvoiceModel.created_at, InvoiceModel.id, cursor, limit)
+    ).scalars().all()
+    invoices, next_cursor = split_page(invoices, limit, "created_at", response=response)
 
     # Format response with consistent structure
     invoice_list = []
@@ -218,13 +226,15 @@ def get_invoices(
             "paid_at": invoice.paid_at
         })
 
-    return {
-        "ok": True,
-        "data": {
-            "invoices": invoice_list,
-            "total": len(invoice_list)
-        }
+    data = {
+        "invoices": invoice_list,
+        "limit": limit,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None
     }
+    if include_total:
+        data.update(total_info(db.scalar(count_query(query))))
+    return {"ok": True, "data": data}
 
 
 @router.get("/billing/invoices/{invoice_id}", tags=["Billing"])
@@ -251,7 +261,7 @@ def get_invoice(
     # Get plan details for the invoice
     plan = None
     if invoice.plan_id:
-        plan = db.query(Plan).filter(Plan.id == invoice.plan_id).first()
+        plan = plan_catalog.get(invoice.plan_id)
 
     if format.lower() == "pdf":
         # Generate and return PDF
@@ -312,45 +322,27 @@ def get_usage_stats(
             "error": {"message": "No active subscription found"}
         }
 
-    plan = db.query(Plan).filter(Plan.id == subscription.plan_id).first()
+    plan = plan_catalog.get(subscription.plan_id)
     if not plan:
         return {
             "ok": False,
             "error": {"message": "Plan not found"}
         }
 
-    # Get invoices
-    invoices = db.query(InvoiceModel).filter(
+    total_spent = float(db.query(func.coalesce(func.sum(InvoiceModel.amount), 0)).filter(
         InvoiceModel.user_id == current_user.id,
         InvoiceModel.status == 'paid'
-    ).all()
-
-    total_spent = sum(float(invoice.amount) for invoice in invoices if invoice.amount)
+    ).scalar())
 
     # Get current date for calculations
     today = datetime.now(timezone.utc)
     first_day_of_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
-    # Use CodeExecution model directly
-    executions_this_month = db.query(func.count(CodeExecution.id)).filter(
-        and_(
-            CodeExecution.user_id == current_user.id,
-            CodeExecution.created_at >= first_day_of_month
-        )
-    ).scalar() or 0
-
-    # Get total executions
-    total_executions = db.query(func.count(CodeExecution.id)).filter(
-        CodeExecution.user_id == current_user.id
-    ).scalar() or 0
-
-    # Get successful executions
-    successful_executions = db.query(func.count(CodeExecution.id)).filter(
-        and_(
-            CodeExecution.user_id == current_user.id,
-            CodeExecution.success == True
-        )
-    ).scalar() or 0
+    # Execution counts come from the daily rollups in one query
+    usage = usage_rollups.summary(db, current_user.id, first_day_of_month.date())
+    executions_this_month = usage["period_executions"]
+    total_executions = usage["executions"]
+    successful_executions = usage["successes"]
 
     # Calculate quota usage
     monthly_quota = plan.monthly_executions or 10
@@ -406,7 +398,7 @@ def get_plan_usage(
             "error": {"message": "No active subscription found"}
         }
 
-    plan = db.query(Plan).filter(Plan.id == subscription.plan_id).first()
+    plan = plan_catalog.get(subscription.plan_id)
     if not plan:
         return {
             "ok": False,
@@ -417,12 +409,7 @@ def get_plan_usage(
     today = datetime.now(timezone.utc)
     first_day_of_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
-    executions_this_month = db.query(func.count(CodeExecution.id)).filter(
-        and_(
-            CodeExecution.user_id == current_user.id,
-            CodeExecution.created_at >= first_day_of_month
-        )
-    ).scalar() or 0
+    executions_this_month = usage_rollups.summary(db, current_user.id, first_day_of_month.date())["period_executions"]
 
     monthly_quota = plan.monthly_executions or 10
     remaining_quota = max(0, monthly_quota - executions_this_month)
@@ -468,7 +455,7 @@ def download_invoice(
     # Get plan details for the invoice
     plan = None
     if invoice.plan_id:
-        plan = db.query(Plan).filter(Plan.id == invoice.plan_id).first()
+        plan = plan_catalog.get(invoice.plan_id)
 
     try:
         pdf_bytes = generate_invoice_pdf(invoice, current_user, plan)
@@ -1,8 +1,10 @@
 # app/api/v1/invoice.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from ....db.session import get_db
+from ...pagination import MAX_PAGE_SIZE, paginate, split_page
 from ...security import get_current_user
 from ....models.user import User
 from ....models.invoice import Invoice
@@ -12,13 +14,17 @@ router = APIRouter(tags=["Invoices"])
 
 @router.get("/invoices/my", response_model=List[InvoiceResponse])
 def get_my_invoices(
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get current user's invoices"""
-    invoices = db.query(Invoice).filter(
-        Invoice.user_id == current_user.id
-    ).order_by(Invoice.created_at.desc()).all()
+    """Get current user's invoices, newest first; the next page's cursor is in X-Next-Cursor"""
+    invoices = db.execute(paginate(
+        select(Invoice).where(Invoice.user_id == current_user.id), Invoice.created_at, Invoice.id, cursor, limit
+    )).scalars().all()
+    invoices, _ = split_page(invoices, limit, "created_at", response=response)
     return invoices
 
 @router.get("/invoices/{invoice_id}", response_model=InvoiceResponse)
@@ -0,0 +1,42 @@
+# app/api/v1/metrics.py
+from fastapi import APIRouter
+from typing import Dict, Any
+
+from ....db.session import async_engine, engine, pool_stats
+from ....services.cache_service import execution_cache, execution_cache_enabled, transpile_cache
+from ....services.concurrency_service import concurrency_limiter
+from ....services.job_event_service import job_events
+from ....services.job_output_service import job_output
+from ....services.payload_service import payload_store
+from ....services.plan_service import plan_catalog
+from ....services.queue_service import queue_service
+from ....services.user_cache_service import user_cache
+from ....services.quota_service import quota_service
+from ....services.sandbox_pool import sandbox_enabled, sandbox_pool
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_model=Dict[str, Any], tags=["Metrics"])
+def get_metrics():
+    """Operational counters for database pools, caches (including auth), the plan catalog, queues, quotas, concurrency slots, job payloads, job event and output streams and the sandbox pool"""
+    return {
+        "ok": True,
+        "data": {
+            "database": {"sync": pool_stats(engine), "async": pool_stats(async_engine)},
+            "transpile_cache": transpile_cache.stats(),
+            "execution_cache": {**execution_cache.stats(), "enabled": execution_cache_enabled},
+            "sandbox_pool": {**sandbox_pool.stats(), "enabled": sandbox_enabled},
+            "queue": {
+                **queue_service.stats("transpiler_jobs"),
+                "lanes": queue_service.lane_stats("transpiler_jobs")
+            },
+            "concurrency": concurrency_limiter.stats(),
+            "quota": quota_service.stats(),
+            "plan_catalog": plan_catalog.stats(),
+            "auth_cache": user_cache.stats(),
+            "payloads": payload_store.stats(),
+            "job_events": job_events.stats(),
+            "job_output": job_output.stats()
+        }
+    }
@@ -1,7 +1,8 @@
 # app/api/v1/payments.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import stripe
 import os
 from datetime import datetime, timedelta, timezone
@@ -15,9 +16,12 @@ except ImportError:
     razorpay = None
 
 from ....db.session import get_db
+from ...pagination import MAX_PAGE_SIZE, paginate, split_page
 from ....models.user import User
-from ....models.subscription import Plan, Subscription, SubscriptionStatus
+from ....models.subscription import Subscription, SubscriptionStatus
 from ....models.invoice import Invoice
+from ....services.plan_service import plan_catalog
+from ....services.user_cache_service import user_cache
 from ....schemas.payment import (
     StripeCheckoutRequest,
     StripeCheckoutResponse,
@@ -45,7 +49,7 @@ def create_stripe_checkout(
 ):
     """Create Stripe checkout session for subscription - BACKEND CONTROLLED"""
     # Get the plan
-    plan = db.query(Plan).filter(Plan.id == request.plan_id).first()
+    plan = plan_catalog.get(request.plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
 
@@ -76,9 +80,11 @@ def create_stripe_checkout(
                     "username": current_user.username
                 }
             )
-            # Update user with stripe customer id
+            # Update user with stripe customer id (current_user belongs to the auth session)
             current_user.stripe_customer_id = customer.id
+            db.query(User).filter(User.id == current_user.id).update({"stripe_customer_id": customer.id})
             db.commit()
+            user_cache.invalidate(current_user.id)
 
         # Determine unit amount for Stripe
         currency = plan.currency.upper()
@@ -170,7 +176,7 @@ def create_razorpay_order(
 ):
     """Create Razorpay order for payment - BACKEND CONTROLLED"""
     # Get the plan
-    plan = db.query(Plan).filter(Plan.id == request.plan_id).first()
+    plan = plan_catalog.get(request.plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
 
@@ -280,7 +286,7 @@ def verify_razorpay_payment(
         invoice.amount = float(order['amount']) / 100  # Convert paise to rupees
 
         # Get plan from invoice
-        plan = db.query(Plan).filter(Plan.id == invoice.plan_id).first()
+        plan = plan_catalog.get(invoice.plan_id)
 
         if plan:
             # Create or update subscription
@@ -337,13 +343,17 @@ def verify_razorpay_payment(
 
 @router.get("/payments/history", response_model=List[PaymentHistory], tags=["Payments"])
 def get_payment_history(
+        response: Response,
+        limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
         db: Session = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
-    """Get payment history for current user"""
-    invoices = db.query(Invoice).filter(
-        Invoice.user_id == current_user.id
-    ).order_by(Invoice.created_at.desc()).all()
+    """Get payment history for current user, newest first; the next page's cursor is in X-Next-Cursor"""
+    invoices = db.execute(paginate(
+        select(Invoice).where(Invoice.user_id == current_user.id), Invoice.created_at, Invoice.id, cursor, limit
+    )).scalars().all()
+    invoices, _ = split_page(invoices, limit, "created_at", response=response)
 
     history = []
     for invoice in invoices:
@@ -360,7 +370,7 @@ def get_payment_history(
         # Get plan name if available
         plan_name = None
         if invoice.plan_id:
-            plan = db.query(Plan).filter(Plan.id == invoice.plan_id).first()
+            plan = plan_catalog.get(invoice.plan_id)
             plan_name = plan.name if plan else None
 
         history.append(PaymentHistory(
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from typing import List
 from ....db.session import get_db
-from ....models.subscription import Subscription, Plan, SubscriptionStatus
+from ....models.subscription import Subscription, SubscriptionStatus
+from ....services.plan_service import plan_catalog
 from ....schemas.subscription import (
     Subscription as SubscriptionSchema,
     SubscriptionCreate,
@@ -14,10 +16,13 @@ from datetime import datetime, timedelta, timezone
 router = APIRouter()
 
 @router.get("/plans", response_model=List[PlanSchema], tags=["Plans"])
-def get_available_plans(db: Session = Depends(get_db)):
-    """Get all available subscription plans"""
-    plans = db.query(Plan).all()
-    return plans
+def get_available_plans(request: Request):
+    """Get all available subscription plans (served from the plan catalog)"""
+    plans, etag = plan_catalog.listing()
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=plans, headers=headers)
 
 @router.get("/subscriptions", response_model=List[SubscriptionSchema], tags=["Subscriptions"])
 def get_user_subscriptions(
@@ -54,7 +59,7 @@ def create_subscription(
     current_user = Depends(get_current_user)
 ):
     """Create a new subscription"""
-    plan = db.query(Plan).filter(Plan.id == subscription_data.plan_id).first()
+    plan = plan_catalog.get(subscription_data.plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
 
@@ -1,23 +1,40 @@
 # app/api/v1/transpiler.py
-from fastapi import APIRouter, Depends, HTTPException, Request, BackgroundTasks, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, BackgroundTasks, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, Tuple, Union
 from datetime import datetime, timedelta, timezone
+import asyncio
 import hashlib
-import uuid
+import os
 from enum import Enum
 
-from ...security import get_current_user
-from ....db.session import get_db
+from ...pagination import MAX_PAGE_SIZE, count_query, paginate, split_page, total_info
+from ...security import authenticate_token, get_current_user, get_stream_user
+from ....db.session import get_async_db
 from ....models.user import User
-from ....models.subscription import Subscription, Plan, SubscriptionStatus
-from ....models.transpiler_job import TranspilerJob, JobStatus
+from ....models.subscription import Subscription, SubscriptionStatus
+from ....models.transpiler_job import JobIdempotencyKey, TranspilerJob, JobStatus
+from ....services.concurrency_service import concurrency_limiter
+from ....services.job_event_service import TERMINAL_STATUSES, job_events
+from ....services.job_output_service import job_output
+from ....services.partition_service import job_filter, new_job_id
+from ....services.payload_service import payload_store
+from ....services.plan_service import plan_catalog
 from ....services.queue_service import queue_service
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from ....services.quota_service import quota_service
+from ....services.usage_service import usage_rollups
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select
+from sqlalchemy.exc import IntegrityError
 
 router = APIRouter()
 
+# Idle job streams send a ping and re-check the job this often (seconds)
+EVENT_KEEPALIVE = float(os.getenv("JOB_EVENTS_KEEPALIVE", "15"))
+# Longest GET /{job_id}?wait= a client may ask for (seconds)
+MAX_STATUS_WAIT = int(os.getenv("JOB_STATUS_MAX_WAIT", "60"))
+
 
 # Define supported languages
 class LanguageCode(str, Enum):
@@ -74,6 +91,12 @@ class JobData(BaseModel):
     quota_used: int = 1
 
 
+class OutputChunk(BaseModel):
+    seq: int
+    stream: str
+    data: str
+
+
 class StandardResponse(BaseModel):
     ok: bool = True
     data: JobData
@@ -87,56 +110,41 @@ class ErrorResponse(BaseModel):
 # Helper Functions
 async def check_subscription_and_quota(
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Check user has active subscription and quota"""
     user_id = current_user.id
 
-    # Calculate quota for current month
-    today = datetime.now(timezone.utc)
-    first_day_of_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-    # Count jobs this month
-    jobs_this_month = db.query(func.count(TranspilerJob.id)).filter(
-        and_(
-            TranspilerJob.user_id == user_id,
-            TranspilerJob.submitted_at >= first_day_of_month
-        )
-    ).scalar() or 0
+    # Executions charged this month (one counter row, not a scan of the month's jobs)
+    jobs_this_month = await db.run_sync(lambda session: quota_service.usage(session, user_id))
 
     # Check active subscription
-    subscription = db.query(Subscription).filter(
+    subscription = (await db.execute(select(Subscription).where(
         and_(
             Subscription.user_id == user_id,
             Subscription.status == SubscriptionStatus.ACTIVE,
             Subscription.current_period_end > datetime.now(timezone.utc)
         )
-    ).first()
+    ))).scalars().first()
 
     if subscription:
-        # User has active subscription - use plan quota
-        plan = db.query(Plan).filter(Plan.id == subscription.plan_id).first()
+        # User has active subscription - use plan quota (plans are cached in memory)
+        plan = plan_catalog.get(subscription.plan_id)
         if not plan:
             raise HTTPException(status_code=500, detail="Plan not found")
 
-        # Get monthly quota based on plan
-        quota_map = {
-            "free": 10,
-            "pro": 100,
-            "team": 1000,
-            "campus": 10000
-        }
-
-        monthly_quota = quota_map.get(plan.name.lower(), 100)
+        monthly_quota = plan.monthly_executions or 10
         plan_type = plan.name.lower()
         plan_name = plan.name
         subscription_id = subscription.id
+        concurrent_executions = plan.concurrent_executions or 1
     else:
         # User doesn't have subscription - use free tier quota
         monthly_quota = 5  # Free users get 5 executions per month
         plan_type = "free"
         plan_name = "Free Tier"
         subscription_id = None
+        concurrent_executions = 1
 
     quota_remaining = monthly_quota - jobs_this_month
 
@@ -159,17 +167,60 @@ async def check_subscription_and_quota(
         "plan_name": plan_name,
         "monthly_quota": monthly_quota,
         "quota_remaining": quota_remaining,
-        "executions_this_month": jobs_this_month
+        "executions_this_month": jobs_this_month,
+        "concurrent_executions": concurrent_executions
     }
 
 
+async def find_idempotent_job(db: AsyncSession, user_id: int, idempotency_key: str) -> Optional[TranspilerJob]:
+    claim = await db.get(JobIdempotencyKey, (user_id, idempotency_key))
+    if claim is None:
+        return None
+    # submitted_at confines the lookup to the job's partition
+    return (await db.execute(select(TranspilerJob).where(
+        and_(
+            TranspilerJob.id == claim.job_id,
+            TranspilerJob.submitted_at == claim.submitted_at
+        )
+    ))).scalars().first()
+
+
+async def load_result(db: AsyncSession, job: TranspilerJob) -> Optional[JobResult]:
+    """The job's result payloads, read from the payload store only for completed jobs"""
+    if job.status != JobStatus.COMPLETED:
+        return None
+    payloads = await db.run_sync(lambda session: payload_store.load_job(
+        session, job, "transpiled_code", "execution_output", "errors", "logs"
+    ))
+    return JobResult(**payloads)
+
+
+async def existing_job_response(db: AsyncSession, existing_job: TranspilerJob) -> StandardResponse:
+    """Replay of the job created by an earlier request with the same idempotency key"""
+    return StandardResponse(
+        ok=True,
+        data=JobData(
+            job_id=existing_job.id,
+            status=existing_job.status,
+            submitted_at=existing_job.submitted_at,
+            started_at=existing_job.started_at,
+            completed_at=existing_job.completed_at,
+            language=existing_job.language,
+            timeout=existing_job.timeout_seconds,
+            execution_time_ms=existing_job.execution_time_ms,
+            result=await load_result(db, existing_job),
+            quota_used=existing_job.quota_used
+        )
+    )
+
+
 # API Endpoints
 @router.post("/", response_model=StandardResponse, status_code=202)
 async def create_transpiler_job(
         request: TranspileRequest,
         background_tasks: BackgroundTasks,
         subscription_info: dict = Depends(check_subscription_and_quota),
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_user: User = Depends(get_current_user),
         http_request: Request = None
 ):
@@ -185,42 +236,28 @@ async def create_transpiler_job(
 
     # Check idempotency key
     if request.idempotency_key:
-        existing_job = db.query(TranspilerJob).filter(
-            and_(
-                TranspilerJob.user_id == user_id,
-                TranspilerJob.idempotency_key == request.idempotency_key
-            )
-        ).first()
-
+        existing_job = await find_idempotent_job(db, user_id, request.idempotency_key)
         if existing_job:
-            return StandardResponse(
-                ok=True,
-                data=JobData(
-                    job_id=existing_job.id,
-                    status=existing_job.status,
-                    submitted_at=existing_job.submitted_at,
-                    started_at=existing_job.started_at,
-                    completed_at=existing_job.completed_at,
-                    language=existing_job.language,
-                    timeout=existing_job.timeout_seconds,
-                    execution_time_ms=existing_job.execution_time_ms,
-                    result=JobResult(
-                        transpiled_code=existing_job.transpiled_code,
-                        execution_output=existing_job.execution_output,
-                        errors=existing_job.errors,
-                        logs=existing_job.logs
-                    ) if existing_job.status == JobStatus.COMPLETED else None,
-                    quota_used=existing_job.quota_used
-                )
-            )
+            return await existing_job_response(db, existing_job)
+
+    # Charge the execution atomically so concurrent submits cannot overshoot
+    # the quota; the charge commits together with the job row below
+    charged = await db.run_sync(
+        lambda session: quota_service.consume(session, user_id, subscription_info["monthly_quota"])
+    )
+    if charged is None:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Monthly execution quota exceeded ({subscription_info['monthly_quota']} executions)."
+        )
 
     # Create job record
-    job_id = f"job_{uuid.uuid4().hex[:12]}"
+    submitted_at = datetime.utcnow()
+    job_id = new_job_id(submitted_at)
     job = TranspilerJob(
         id=job_id,
         user_id=user_id,
         language=request.language,
-        code=request.code,
         code_hash=code_hash,
         input_data=request.input_data,
         timeout_seconds=request.timeout,
@@ -228,44 +265,76 @@ async def create_transpiler_job(
         ip_address=http_request.client.host if http_request and http_request.client else None,
         user_agent=http_request.headers.get("user-agent") if http_request else None,
         status=JobStatus.QUEUED,
-        submitted_at=datetime.utcnow()
+        submitted_at=submitted_at
     )
+    await db.run_sync(lambda session: payload_store.save_job(session, job, code=request.code))
 
     db.add(job)
-    db.commit()
-    db.refresh(job)
-
-    # For synchronous requests with small code
+    if request.idempotency_key:
+        db.add(JobIdempotencyKey(
+            user_id=user_id, idempotency_key=request.idempotency_key,
+            job_id=job_id, submitted_at=job.submitted_at
+        ))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request with the same idempotency key committed first;
+        # the rollback also returns this request's quota charge
+        await db.rollback()
+        existing_job = request.idempotency_key and await find_idempotent_job(db, user_id, request.idempotency_key)
+        if not existing_job:
+            raise
+        return await existing_job_response(db, existing_job)
+    await db.refresh(job)
+
+    # For synchronous requests with small code, if the plan has a free execution slot
+    slot = None
     if request.sync and len(request.code) < 1000 and request.timeout <= 5:
+        slot = await asyncio.to_thread(
+            concurrency_limiter.acquire,
+            user_id, subscription_info["concurrent_executions"], lease_seconds=request.timeout + 10
+        )
+    if slot:
         from app.services.transpiler_service import transpiler_service
 
         try:
             # Process immediately
             job.status = JobStatus.PROCESSING
             job.started_at = datetime.utcnow()
-            db.commit()
+            await db.commit()
+            job_events.publish(job.id, JobStatus.PROCESSING.value)
 
             start_time = datetime.now()
             result = await transpiler_service.transpile_and_execute(
                 code=request.code,
                 language=request.language,
                 input_data=request.input_data,
-                timeout=request.timeout
+                timeout=request.timeout,
+                code_hash=code_hash,
+                on_output=job_output.writer(job.id)
             )
             end_time = datetime.now()
             execution_time = (end_time - start_time).total_seconds()
 
             # Update job
-            job.transpiled_code = result.get("transpiled_code")
-            job.execution_output = result.get("output")
-            job.errors = result.get("errors")
+            await db.run_sync(lambda session: payload_store.save_job(
+                session, job,
+                transpiled_code=result.get("transpiled_code"),
+                execution_output=result.get("output"),
+                errors=result.get("errors"),
+                logs=result.get("logs", "")
+            ))
             job.success = result.get("success", False)
             job.execution_time_ms = int(execution_time * 1000)
             job.status = JobStatus.COMPLETED if job.success else JobStatus.FAILED
             job.completed_at = datetime.utcnow()
-            job.logs = result.get("logs", "")
+            # Cache hits are still charged: the job row counts toward quota
+            job.meta = {**(job.meta or {}), "execution_cache_hit": result.get("execution_cache_hit", False)}
+            await db.run_sync(lambda session: usage_rollups.record_job(session, job))
 
-            db.commit()
+            await db.commit()
+            job_output.clear(job.id)
+            job_events.publish(job.id, job.status.value)
 
             return StandardResponse(
                 ok=True,
@@ -279,10 +348,10 @@ async def create_transpiler_job(
                     timeout=job.timeout_seconds,
                     execution_time_ms=job.execution_time_ms,
                     result=JobResult(
-                        transpiled_code=job.transpiled_code,
-                        execution_output=job.execution_output,
-                        errors=job.errors,
-                        logs=job.logs
+                        transpiled_code=result.get("transpiled_code"),
+                        execution_output=result.get("output"),
+                        errors=result.get("errors"),
+                        logs=result.get("logs", "")
                     ),
                     quota_used=job.quota_used
                 )
@@ -291,15 +360,20 @@ async def create_transpiler_job(
         except Exception as e:
             # Fall back to async
             pass
+        finally:
+            await asyncio.to_thread(concurrency_limiter.release, user_id, slot)
 
-    # Queue for async processing
-    queue_service.enqueue("transpiler_jobs", {
+    # Queue for async processing on the plan's priority lane
+    await asyncio.to_thread(queue_service.enqueue, "transpiler_jobs", {
         "job_id": job_id,
         "user_id": user_id,
         "language": request.language,
         "timeout": request.timeout,
+        "concurrency_limit": subscription_info["concurrent_executions"],
+        # Locates the job's partition for the worker
+        "submitted_at": job.submitted_at.isoformat(),
         "timestamp": datetime.utcnow().isoformat()
-    })
+    }, lane=subscription_info["plan_type"])
 
     return StandardResponse(
         ok=True,
@@ -317,53 +391,189 @@ async def create_transpiler_job(
 @router.get("/{job_id}", response_model=StandardResponse)
 async def get_job_status(
         job_id: str,
-        db: Session = Depends(get_db),
+        wait: float = Query(0, ge=0, le=MAX_STATUS_WAIT,
+                            description="Seconds to wait for the job to finish before answering"),
+        db: AsyncSession = Depends(get_async_db),
         current_user: User = Depends(get_current_user)
 ):
-    """Get job status and results"""
-    job = db.query(TranspilerJob).filter(TranspilerJob.id == job_id).first()
+    """Get job status and results; with ``wait``, long-poll until the job finishes"""
+    job = await get_user_job(db, job_id, current_user)
+    if wait and job.status.value not in TERMINAL_STATUSES:
+        job = await wait_for_job(db, job_id, wait) or job
+    result = await load_result(db, job)
+    return StandardResponse(ok=True, data=job_data(job, result))
+
+
+async def get_job(db: AsyncSession, job_id: str, populate_existing: bool = False) -> Optional[TranspilerJob]:
+    """The job, read from the partition of the month its id names"""
+    query = select(TranspilerJob).where(job_filter(job_id))
+    if populate_existing:
+        query = query.execution_options(populate_existing=True)
+    return (await db.execute(query)).scalars().first()
+
+
+async def get_user_job(db: AsyncSession, job_id: str, user: User) -> TranspilerJob:
+    job = await get_job(db, job_id)
 
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
     # Authorization
-    if job.user_id != current_user.id:
+    if job.user_id != user.id:
         raise HTTPException(status_code=403, detail="Not authorized to view this job")
+    return job
+
+
+def job_data(job: TranspilerJob, result: Optional[JobResult] = None) -> JobData:
+    return JobData(
+        job_id=job.id,
+        status=job.status,
+        submitted_at=job.submitted_at,
+        started_at=job.started_at,
+        completed_at=job.completed_at,
+        language=job.language,
+        timeout=job.timeout_seconds,
+        execution_time_ms=job.execution_time_ms,
+        result=result,
+        quota_used=job.quota_used
+    )
 
-    result = None
-    if job.status == JobStatus.COMPLETED:
-        result = JobResult(
-            transpiled_code=job.transpiled_code,
-            execution_output=job.execution_output,
-            errors=job.errors,
-            logs=job.logs
-        )
 
-    return StandardResponse(
-        ok=True,
-        data=JobData(
-            job_id=job.id,
-            status=job.status,
-            submitted_at=job.submitted_at,
-            started_at=job.started_at,
-            completed_at=job.completed_at,
-            language=job.language,
-            timeout=job.timeout_seconds,
-            execution_time_ms=job.execution_time_ms,
-            result=result,
-            quota_used=job.quota_used
-        )
+async def wait_for_job(db: AsyncSession, job_id: str, wait: float) -> Optional[TranspilerJob]:
+    """The job once it reaches a terminal state, or as it is after ``wait`` seconds.
+
+    Parks on the job's events without a database connection; a missed event
+    is caught by the re-check every EVENT_KEEPALIVE seconds.
+    """
+    async def terminal_event(events):
+        # Only a terminal event is worth another read
+        while (await events.get())["status"] not in TERMINAL_STATUSES:
+            pass
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    async with job_events.subscribe(job_id) as events:
+        while True:
+            # Read after subscribing, so a transition cannot slip in before the wait
+            job = await get_job(db, job_id, populate_existing=True)
+            remaining = deadline - loop.time()
+            if job is None or job.status.value in TERMINAL_STATUSES or remaining <= 0:
+                return job
+            await db.close()
+            try:
+                await asyncio.wait_for(terminal_event(events), min(remaining, EVENT_KEEPALIVE))
+            except asyncio.TimeoutError:
+                pass
+
+
+async def watch_job(db: AsyncSession, job_id: str) -> AsyncIterator[Tuple[str, Union[JobData, OutputChunk, None]]]:
+    """("status", data) on each state change, ("output", chunk) as the program prints,
+    then ("result", data); ("ping", None) while idle.
+
+    Status events only wake the watcher, which then re-reads the row, so a
+    missed event delays an update by at most EVENT_KEEPALIVE. Output chunks
+    are passed straight through, starting with those already buffered. No
+    connection is held while waiting.
+    """
+    async with job_events.subscribe(job_id) as events:
+        last_status = None
+        last_seq = None
+        while True:
+            # Read after subscribing, so a transition cannot slip in before the wait
+            job = await get_job(db, job_id, populate_existing=True)
+            if job is None:
+                return
+            if job.status != last_status:
+                last_status = job.status
+                yield "status", job_data(job)
+                if job.status.value in TERMINAL_STATUSES:
+                    result = await load_result(db, job)
+                    data = job_data(job, result)
+                    await db.close()
+                    yield "result", data
+                    return
+            await db.close()
+            if last_seq is None:
+                last_seq = 0
+                for chunk in job_output.backlog(job_id):
+                    last_seq = chunk["seq"]
+                    yield "output", OutputChunk(**chunk)
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), EVENT_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield "ping", None
+                    break
+                if "seq" not in event:
+                    break
+                # Chunks published while the backlog was read arrive twice
+                if event["seq"] > last_seq:
+                    last_seq = event["seq"]
+                    yield "output", OutputChunk(seq=event["seq"], stream=event["stream"], data=event["data"])
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(
+        job_id: str,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: User = Depends(get_stream_user)
+):
+    """Server-sent events for a job: ``status`` on each state change, ``output`` as it prints, then ``result``.
+
+    Replaces polling GET /{job_id}. EventSource clients pass the token as ?access_token=.
+    """
+    await get_user_job(db, job_id, current_user)
+
+    async def events():
+        async for name, data in watch_job(db, job_id):
+            if data is None:
+                yield ": ping\n\n"
+            else:
+                yield f"event: {name}\ndata: {data.model_dump_json()}\n\n"
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream",
+        # Proxies must pass events through as they are written
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
+@router.websocket("/{job_id}/ws")
+async def job_events_socket(
+        websocket: WebSocket,
+        job_id: str,
+        db: AsyncSession = Depends(get_async_db)
+):
+    """The events of GET /{job_id}/events as JSON messages ({"event": ..., "data": ...}); closes after ``result``"""
+    token = websocket.query_params.get("access_token")
+    scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        token = credentials
+    try:
+        if not token:
+            raise HTTPException(status_code=401, detail="Missing authorization token")
+        await get_user_job(db, job_id, await authenticate_token(token, db))
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=str(e.detail))
+        return
+
+    await websocket.accept()
+    try:
+        async for name, data in watch_job(db, job_id):
+            await websocket.send_json({"event": name, "data": data.model_dump(mode="json") if data else None})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
 @router.post("/{job_id}/cancel", response_model=StandardResponse)
 async def cancel_job(
         job_id: str,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_user: User = Depends(get_current_user)
 ):
     """Cancel a pending job"""
-    job = db.query(TranspilerJob).filter(TranspilerJob.id == job_id).first()
+    job = await get_job(db, job_id)
 
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -381,7 +591,8 @@ async def cancel_job(
 
     job.status = JobStatus.CANCELLED
     job.completed_at = datetime.utcnow()
-    db.commit()
+    await db.commit()
+    job_events.publish(job.id, JobStatus.CANCELLED.value)
 
     return StandardResponse(
         ok=True,
@@ -400,23 +611,27 @@ async def cancel_job(
 
 @router.get("/", response_model=Dict[str, Any])
 async def list_user_jobs(
-        skip: int = Query(0, ge=0),
-        limit: int = Query(20, ge=1, le=100),
+        response: Response,
+        limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+        include_total: bool = False,
         status: Optional[JobStatus] = None,
         language: Optional[str] = None,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_user: User = Depends(get_current_user)
 ):
-    """List user's transpiler jobs"""
-    query = db.query(TranspilerJob).filter(TranspilerJob.user_id == current_user.id)
+    """List user's transpiler jobs, newest first, one cursor page at a time"""
+    query = select(TranspilerJob).where(TranspilerJob.user_id == current_user.id)
 
     if status:
-        query = query.filter(TranspilerJob.status == status)
+        query = query.where(TranspilerJob.status == status)
     if language:
-        query = query.filter(TranspilerJob.language == language)
+        query = query.where(TranspilerJob.language == language)
 
-    total = query.count()
-    jobs = query.order_by(TranspilerJob.submitted_at.desc()).offset(skip).limit(limit).all()
+    jobs = (await db.execute(
+        paginate(query, TranspilerJob.submitted_at, TranspilerJob.id, cursor, limit)
+    )).scalars().all()
+    jobs, next_cursor = split_page(jobs, limit, "submitted_at", response=response)
 
     job_list = []
     for job in jobs:
@@ -434,23 +649,21 @@ async def list_user_jobs(
 
         if job.status == JobStatus.COMPLETED:
             job_data["result_preview"] = {
-                "output_preview": (job.execution_output or "")[:100] + (
-                    "..." if len(job.execution_output or "") > 100 else ""),
-                "has_errors": bool(job.errors)
+                "output_preview": job.output_preview or "",
+                "has_errors": job.errors_ref is not None
             }
 
         job_list.append(job_data)
 
-    return {
-        "ok": True,
-        "data": {
-            "jobs": job_list,
-            "total": total,
-            "skip": skip,
-            "limit": limit,
-            "has_more": (skip + limit) < total
-        }
+    data = {
+        "jobs": job_list,
+        "limit": limit,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None
     }
+    if include_total:
+        data.update(total_info(await db.scalar(count_query(query))))
+    return {"ok": True, "data": data}
 
 
 # Modern JSON-based endpoint
@@ -459,7 +672,7 @@ async def run_code(
         request: TranspileRequest,
         background_tasks: BackgroundTasks,
         subscription_info: dict = Depends(check_subscription_and_quota),
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_user: User = Depends(get_current_user),
         http_request: Request = None
 ):
@@ -482,7 +695,7 @@ async def run_code(
 @router.get("/run/quota", response_model=Dict[str, Any])
 async def get_execution_quota(
         subscription_info: dict = Depends(check_subscription_and_quota),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Get user's remaining execution quota"""
     user_id = subscription_info["user_id"]
@@ -491,29 +704,20 @@ async def get_execution_quota(
     today = datetime.utcnow()
     first_day_of_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
-    # Get job statistics
-    job_stats = db.query(
-        func.count(TranspilerJob.id),
-        func.sum(func.cast(TranspilerJob.success, func.Integer))
-    ).filter(
-        and_(
-            TranspilerJob.user_id == user_id,
-            TranspilerJob.submitted_at >= first_day_of_month
-        )
-    ).first()
-
-    total_jobs = job_stats[0] or 0
-    successful_jobs = job_stats[1] or 0
+    # Finished jobs this month, from the daily rollups
+    usage = await db.run_sync(lambda session: usage_rollups.summary(session, user_id, first_day_of_month.date()))
+    total_jobs = usage["period_executions"]
+    successful_jobs = usage["period_successes"]
 
     # Get active subscription
-    subscription = db.query(Subscription).filter(
+    subscription = (await db.execute(select(Subscription).where(
         and_(
             Subscription.user_id == user_id,
             Subscription.status == SubscriptionStatus.ACTIVE
         )
-    ).first()
+    ))).scalars().first()
 
-    plan = db.query(Plan).filter(Plan.id == subscription.plan_id).first() if subscription else None
+    plan = plan_catalog.get(subscription.plan_id) if subscription else None
 
     return {
         "ok": True,
@@ -591,28 +795,23 @@ async def get_supported_languages():
 
 @router.get("/run/history", response_model=Dict[str, Any])
 async def get_execution_history(
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    page: int = Query(1, ge=1, description="Page number"),
-    limit: int = Query(10, ge=1, le=100, description="Items per page")
+    db: AsyncSession = Depends(get_async_db),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE, description="Items per page"),
+    include_total: bool = False
 ):
     """Get user's code execution history"""
     try:
         from app.models.code_execution import CodeExecution
         
-        # Calculate offset for pagination
-        offset = (page - 1) * limit
-        
-        # Get total count
-        total_count = db.query(CodeExecution).filter(
-            CodeExecution.user_id == current_user.id
-        ).count()
-        
-        # Get paginated history
-        executions = db.query(CodeExecution).filter(
-            CodeExecution.user_id == current_user.id
-        ).order_by(CodeExecution.created_at.desc()).offset(offset).limit(limit).all()
-        
+        query = select(CodeExecution).where(CodeExecution.user_id == current_user.id)
+        executions = (await db.execute(
+            paginate(query, CodeExecution.created_at, CodeExecution.id, cursor, limit)
+        )).scalars().all()
+        executions, next_cursor = split_page(executions, limit, "created_at", response=response)
+
         # Format the response
         history_items = []
         for execution in executions:
@@ -621,21 +820,22 @@ async def get_execution_history(
                 "language": execution.language,
                 "success": execution.success,
                 "execution_time_ms": execution.execution_time_ms,
-                "error_message": execution.error_message,
+                "error_message": execution.errors,
                 "created_at": execution.created_at.isoformat() if execution.created_at else None
             })
         
-        return {
-            "ok": True,
-            "data": {
-                "history": history_items,
-                "total": total_count,
-                "page": page,
-                "limit": limit,
-                "total_pages": (total_count + limit - 1) // limit
-            }
+        data = {
+            "history": history_items,
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
         }
-        
+        if include_total:
+            data.update(total_info(await db.scalar(count_query(query))))
+        return {"ok": True, "data": data}
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -7,6 +7,7 @@ from ....schemas.user import UserResponse, UserProfileUpdate
 from ....models.user import User
 from ...security import get_current_user, hash_password
 from ....db.session import get_db
+from ....services.usage_service import usage_rollups
 
 router = APIRouter()
 
@@ -18,8 +19,11 @@ class StandardResponse(BaseModel):
 
 
 @router.get("/users/profile", response_model=StandardResponse, tags=["Users"])
-def get_user_profile(current_user: User = Depends(get_current_user)):
+def get_user_profile(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get current user's profile"""
+    # Execution totals come from the usage rollups: counting them on the
+    # users row would rewrite it (and drop it from the user cache) every job
+    usage = usage_rollups.summary(db, current_user.id)
     return StandardResponse(
         ok=True,
         data={
@@ -30,8 +34,8 @@ def get_user_profile(current_user: User = Depends(get_current_user)):
             "is_superuser": current_user.is_superuser,
             "created_at": current_user.created_at,
             "updated_at": current_user.updated_at,
-            "total_code_executions": current_user.total_code_executions or 0,
-            "last_execution_at": current_user.last_execution_at,
+            "total_code_executions": usage["successes"],
+            "last_execution_at": usage_rollups.last_execution(db, current_user.id),
             "preferred_language": current_user.preferred_language or "assamese",
             "stripe_customer_id": current_user.stripe_customer_id,
             "razorpay_customer_id": current_user.razorpay_customer_id
@@ -1,6 +1,6 @@
 # app/api/v1/webhooks.py
 from fastapi import APIRouter, Request, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 import stripe
 import hmac
 import hashlib
@@ -8,10 +8,11 @@ import json
 import os
 from datetime import datetime, timedelta
 
-from ....db.session import get_db
+from ....db.session import AsyncSessionLocal
 from ....models.user import User
-from ....models.subscription import Subscription, SubscriptionStatus, Plan
+from ....models.subscription import Subscription, SubscriptionStatus
 from ....models.invoice import Invoice
+from ....services.plan_service import plan_catalog
 
 router = APIRouter()
 
@@ -53,22 +54,21 @@ async def stripe_webhook(request: Request):
 
 async def handle_stripe_checkout_completed(session):
     """Handle successful Stripe checkout"""
-    db = next(get_db())
-    try:
+    async with AsyncSessionLocal() as db:
         user_id = session['metadata'].get('user_id')
         plan_id = session['metadata'].get('plan_id')
 
         if not user_id or not plan_id:
             return
 
-        user = db.query(User).filter(User.id == user_id).first()
-        plan = db.query(Plan).filter(Plan.id == plan_id).first()
+        user = await db.get(User, int(user_id))
+        plan = plan_catalog.get(plan_id)
 
         if user and plan:
             # Update invoice
-            invoice = db.query(Invoice).filter(
+            invoice = (await db.execute(select(Invoice).where(
                 Invoice.stripe_session_id == session.id
-            ).first()
+            ))).scalars().first()
 
             if invoice:
                 invoice.status = 'paid'
@@ -76,10 +76,10 @@ async def handle_stripe_checkout_completed(session):
                 invoice.stripe_payment_intent_id = session.get('payment_intent')
 
             # Create or update subscription
-            subscription = db.query(Subscription).filter(
+            subscription = (await db.execute(select(Subscription).where(
                 Subscription.user_id == user.id,
                 Subscription.plan_id == plan.id
-            ).first()
+            ))).scalars().first()
 
             if not subscription:
                 subscription = Subscription(
@@ -97,47 +97,39 @@ async def handle_stripe_checkout_completed(session):
                 subscription.current_period_start = datetime.utcnow()
                 subscription.current_period_end = datetime.utcnow() + timedelta(days=30)
 
-            db.commit()
-    finally:
-        db.close()
+            await db.commit()
 
 
 async def handle_stripe_invoice_paid(invoice):
     """Handle Stripe invoice payment"""
-    db = next(get_db())
-    try:
+    async with AsyncSessionLocal() as db:
         subscription_id = invoice.get('subscription')
 
         if subscription_id:
-            subscription = db.query(Subscription).filter(
+            subscription = (await db.execute(select(Subscription).where(
                 Subscription.stripe_subscription_id == subscription_id
-            ).first()
+            ))).scalars().first()
 
             if subscription:
                 subscription.current_period_start = datetime.fromtimestamp(invoice['period_start'])
                 subscription.current_period_end = datetime.fromtimestamp(invoice['period_end'])
-                db.commit()
-    finally:
-        db.close()
+                await db.commit()
 
 
 async def handle_stripe_subscription_cancelled(subscription):
     """Handle Stripe subscription cancellation"""
-    db = next(get_db())
-    try:
+    async with AsyncSessionLocal() as db:
         stripe_subscription_id = subscription.get('id')
 
         if stripe_subscription_id:
-            subscription = db.query(Subscription).filter(
+            subscription = (await db.execute(select(Subscription).where(
                 Subscription.stripe_subscription_id == stripe_subscription_id
-            ).first()
+            ))).scalars().first()
 
             if subscription:
                 subscription.status = SubscriptionStatus.CANCELLED
                 subscription.cancelled_at = datetime.utcnow()
-                db.commit()
-    finally:
-        db.close()
+                await db.commit()
 
 
 @router.post("/webhooks/razorpay", tags=["Webhooks"])
@@ -172,20 +164,19 @@ async def razorpay_webhook(request: Request):
 
 async def handle_razorpay_payment_captured(payment):
     """Handle Razorpay payment captured"""
-    db = next(get_db())
-    try:
+    async with AsyncSessionLocal() as db:
         user_id = payment['notes'].get('user_id')
         plan_id = payment['notes'].get('plan_id')
 
         if user_id and plan_id:
-            user = db.query(User).filter(User.id == user_id).first()
-            plan = db.query(Plan).filter(Plan.id == plan_id).first()
+            user = await db.get(User, int(user_id))
+            plan = plan_catalog.get(plan_id)
 
             if user and plan:
                 # Update invoice
-                invoice = db.query(Invoice).filter(
+                invoice = (await db.execute(select(Invoice).where(
                     Invoice.razorpay_order_id == payment['order_id']
-                ).first()
+                ))).scalars().first()
 
                 if invoice:
                     invoice.status = 'paid'
@@ -193,10 +184,10 @@ async def handle_razorpay_payment_captured(payment):
                     invoice.razorpay_payment_id = payment['id']
 
                 # Create or update subscription
-                subscription = db.query(Subscription).filter(
+                subscription = (await db.execute(select(Subscription).where(
                     Subscription.user_id == user.id,
                     Subscription.plan_id == plan.id
-                ).first()
+                ))).scalars().first()
 
                 if not subscription:
                     subscription = Subscription(
@@ -209,6 +200,7 @@ async def handle_razorpay_payment_captured(payment):
                     )
                     db.add(subscription)
                     if invoice:
+                        await db.flush()  # assigns subscription.id
                         invoice.subscription_id = subscription.id
                 else:
                     subscription.status = SubscriptionStatus.ACTIVE
@@ -216,25 +208,20 @@ async def handle_razorpay_payment_captured(payment):
                     subscription.current_period_end = datetime.utcnow() + timedelta(days=30)
                     subscription.razorpay_payment_id = payment['id']
 
-                db.commit()
-    finally:
-        db.close()
+                await db.commit()
 
 
 async def handle_razorpay_subscription_cancelled(subscription):
     """Handle Razorpay subscription cancellation"""
-    db = next(get_db())
-    try:
+    async with AsyncSessionLocal() as db:
         razorpay_subscription_id = subscription.get('id')
 
         if razorpay_subscription_id:
-            subscription = db.query(Subscription).filter(
+            subscription = (await db.execute(select(Subscription).where(
                 Subscription.razorpay_subscription_id == razorpay_subscription_id
-            ).first()
+            ))).scalars().first()
 
             if subscription:
                 subscription.status = SubscriptionStatus.CANCELLED
                 subscription.cancelled_at = datetime.utcnow()
-                db.commit()
-    finally:
-        db.close()
\ No newline at end of file
+                await db.commit()
@@ -0,0 +1,76 @@
+# app/core/pagination.py
+"""Keyset (cursor) pagination for per-user listings.
+
+Pages are ordered newest first by ``(timestamp, id)``. A cursor encodes the
+last row of a page, and the next page starts strictly after it, so every page
+is an index range read however deep the client goes, and rows inserted
+meanwhile neither repeat nor get skipped.
+"""
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.sql import Select
+
+MAX_PAGE_SIZE = 100
+# Totals stop counting here; past it they are reported as a lower bound
+COUNT_LIMIT = int(os.getenv("PAGINATION_COUNT_LIMIT", "10000"))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value: datetime, row_id: Any) -> str:
+    payload = json.dumps([sort_value.isoformat() if sort_value else None, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (datetime.fromisoformat(sort_value) if sort_value else None), row_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(query: Select, sort_column, id_column, cursor: Optional[str], limit: int) -> Select:
+    """``query`` narrowed to the page after ``cursor``, fetching one extra row to detect a next page"""
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+        if sort_value is not None:
+            # Redundant, but partition pruning cannot see through the row comparison
+            query = query.where(sort_column <= sort_value)
+    return query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def split_page(rows: List[Any], limit: int, sort_attr: str, id_attr: str = "id",
+               response: Optional[Response] = None) -> Tuple[List[Any], Optional[str]]:
+    """The page's rows and the cursor for the next page (None on the last one).
+
+    With ``response``, the cursor is also sent as an X-Next-Cursor header, for
+    listings whose body is a bare list.
+    """
+    rows = list(rows)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_attr), getattr(last, id_attr))
+        if response is not None:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return rows, next_cursor
+
+
+def count_query(query: Select) -> Select:
+    """Count of rows matching ``query``, stopping at COUNT_LIMIT + 1"""
+    capped = query.with_only_columns(query.selected_columns[0]).order_by(None).limit(COUNT_LIMIT + 1)
+    return select(func.count()).select_from(capped.subquery())
+
+
+def total_info(count: int) -> dict:
+    """``total`` and whether it is exact, from the result of count_query"""
+    return {"total": min(count, COUNT_LIMIT), "total_is_exact": count <= COUNT_LIMIT}
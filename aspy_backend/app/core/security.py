@@ -1,12 +1,15 @@
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError, ExpiredSignatureError
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
 import os
-from ..db.session import get_db
+from ..db.session import get_async_db
 from ..models.user import User
+from ..services.user_cache_service import user_cache
 import traceback
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
@@ -14,6 +17,8 @@ ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
 
 security = HTTPBearer()
+# Streams also take the token as ?access_token=, since EventSource and browser WebSockets cannot set headers
+optional_security = HTTPBearer(auto_error=False)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
@@ -32,9 +37,9 @@ def create_access_token(data: dict) -> str:
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(
+async def get_current_user(
         credentials: HTTPAuthorizationCredentials = Depends(security),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ) -> User:
     if not credentials:
         raise HTTPException(
@@ -42,11 +47,31 @@ def get_current_user(
             detail="Missing authorization token",
         )
 
-    token = credentials.credentials
+    return await authenticate_token(credentials.credentials, db)
 
+
+async def get_stream_user(
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+        access_token: Optional[str] = Query(None, description="Bearer token, for clients that cannot send headers"),
+        db: AsyncSession = Depends(get_async_db)
+) -> User:
+    token = credentials.credentials if credentials else access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Missing authorization token",
+        )
+    return await authenticate_token(token, db)
+
+
+async def authenticate_token(token: str, db: AsyncSession) -> User:
+    """The active user a bearer token identifies; raises HTTPException otherwise"""
     try:
-        # Decode token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        # Decode token, reusing the verification of a token seen recently
+        payload = user_cache.get_claims(token)
+        if payload is None:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            user_cache.set_claims(token, payload)
         email: str = payload.get("sub")
 
         if not email:
@@ -55,10 +80,16 @@ def get_current_user(
                 detail="Invalid token payload",
             )
 
-        # Get user from database
-        user = db.query(User).filter(User.email == email).first()
+        # Get user from the principal cache, then the database
+        user_id = payload.get("user_id")
+        user = await user_cache.get_user(db, user_id) if user_id else None
+        if user is None:
+            user = (await db.execute(select(User).where(User.email == email))).scalars().first()
+            if user:
+                user = await user_cache.set_user(db, user)
 
-        if not user:
+        # Tokens issued before an email change no longer identify the user
+        if not user or user.email != email:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found",
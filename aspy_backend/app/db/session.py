@@ -1,22 +1,174 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,  # Enable connection health checks
-    pool_recycle=300,    # Recycle connections every 5 minutes
-    connect_args={"application_name": "aspy_backend"}
-)
+
+
+class PoolMetrics:
+    """How long requests wait for a pooled connection"""
+
+    WAIT_THRESHOLD_MS = 1.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0  # checkouts that took longer than WAIT_THRESHOLD_MS
+        self.wait_ms_total = 0.0
+        self.max_wait_ms = 0.0
+        self.timeouts = 0
+
+    def record(self, wait_ms: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_ms_total += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            if wait_ms > self.WAIT_THRESHOLD_MS:
+                self.waits += 1
+
+
+class _MeteredPool:
+    """Times each checkout, including waits for a free connection and connects"""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        self.metrics.record((time.perf_counter() - start) * 1000)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() replaces the pool; keep counting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class MeteredQueuePool(_MeteredPool, QueuePool):
+    pass
+
+
+class MeteredAsyncQueuePool(_MeteredPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def async_database_url(url: str) -> str:
+    """Same database as ``url`` through an asyncio driver (asyncpg / aiosqlite)"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "postgresql":
+        # asyncpg spells libpq's sslmode as ssl
+        query = dict(url.query)
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        url = url.set(drivername="postgresql+asyncpg", query=query)
+    elif backend == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url.render_as_string(hide_password=False)
+
+
+def create_db_engine(url: str, is_async: bool = False):
+    """Build the sync or async engine with pool settings from the environment.
+
+    DB_POOL_SIZE / DB_MAX_OVERFLOW     connections kept / allowed beyond that, per process
+    DB_POOL_TIMEOUT                    seconds a request waits for a connection before failing
+    DB_POOL_RECYCLE                    seconds before a connection is replaced
+    DB_POOL_PRE_PING                   test connections on checkout (one extra round trip);
+                                       off by default, recycling retires idle-killed
+                                       connections and a disconnect error invalidates
+                                       the whole pool
+    DB_STATEMENT_TIMEOUT_MS            Postgres statement_timeout, 0 for none
+    DB_STATEMENT_CACHE_SIZE            asyncpg prepared statements cached per connection,
+                                       0 behind PgBouncer in transaction mode
+    """
+    url = make_url(url)
+    postgres = url.get_backend_name() == "postgresql"
+    options = {
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "false").lower() == "true",
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "300")),
+    }
+    # SQLite file databases default to a non-queueing pool; only size real pools
+    if postgres or url.database not in (None, "", ":memory:"):
+        options.update(
+            poolclass=MeteredAsyncQueuePool if is_async else MeteredQueuePool,
+            pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        )
+
+    statement_timeout = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    if postgres and is_async:
+        server_settings = {"application_name": "aspy_backend"}
+        if statement_timeout:
+            server_settings["statement_timeout"] = str(statement_timeout)
+        cache_size = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+        options["connect_args"] = {
+            "server_settings": server_settings,
+            "statement_cache_size": cache_size,
+            "prepared_statement_cache_size": cache_size,
+        }
+    elif postgres:
+        connect_args = {"application_name": "aspy_backend"}
+        if statement_timeout:
+            connect_args["options"] = f"-c statement_timeout={statement_timeout}"
+        options["connect_args"] = connect_args
+
+    engine = (create_async_engine if is_async else create_engine)(url, **options)
+    pool = engine.pool if not is_async else engine.sync_engine.pool
+    if isinstance(pool, _MeteredPool):
+        pool.metrics = PoolMetrics()
+    return engine
+
+
+def pool_stats(engine) -> dict:
+    """Pool occupancy and checkout wait counters for the metrics endpoint"""
+    pool = getattr(engine, "sync_engine", engine).pool
+    if not isinstance(pool, _MeteredPool):
+        return {"pool": type(pool).__name__}
+    metrics = pool.metrics
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(0, pool.overflow()),
+        "checkouts": metrics.checkouts,
+        "waits": metrics.waits,
+        "avg_wait_ms": round(metrics.wait_ms_total / metrics.checkouts, 3) if metrics.checkouts else 0,
+        "max_wait_ms": round(metrics.max_wait_ms, 3),
+        "timeouts": metrics.timeouts,
+    }
+
+
+engine = create_db_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=True, bind=engine)
 
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+async_engine = create_db_engine(ASYNC_DATABASE_URL, is_async=True)
+# Objects stay readable after commit without a lazy (blocking) refresh
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    """Session for async endpoints: database I/O awaits instead of blocking the event loop"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -62,6 +62,44 @@ else:
     def get_plans():
         return {"message": "API router not loaded", "plans": []}
 
+try:
+    from .services.sandbox_pool import sandbox_enabled, sandbox_pool
+except ImportError as e:
+    print(f"[WARNING] Sandbox pool unavailable: {e}")
+    sandbox_enabled = False
+
+from .services.job_event_service import job_events
+from .services.plan_service import plan_catalog
+from .services.user_cache_service import user_cache
+
+
+@app.on_event("startup")
+def start_sandbox_pool():
+    # Warm the sandboxes before the first request pays for interpreter startup
+    if sandbox_enabled:
+        sandbox_pool.start()
+
+
+@app.on_event("startup")
+def start_shared_caches():
+    plan_catalog.start()
+    user_cache.start()
+    job_events.start()
+
+
+@app.on_event("shutdown")
+def stop_sandbox_pool():
+    if sandbox_enabled:
+        sandbox_pool.stop()
+
+
+@app.on_event("shutdown")
+def stop_shared_caches():
+    plan_catalog.stop()
+    user_cache.stop()
+    job_events.stop()
+
+
 @app.get("/")
 def root():
     return {
@@ -0,0 +1,62 @@
+# app/maintenance.py Database maintenance commands
+"""
+Maintain job history: python -m app.maintenance COMMAND [--dry-run]
+
+  partitions  create this month's and the next PARTITION_MONTHS_AHEAD months' partitions
+  archive     move partitions older than ARCHIVE_RETENTION_MONTHS to ARCHIVE_DIR and
+              drop them, then drop idempotency keys and payload blobs only they used
+  rollups     recompute usage_rollups from the jobs in the database [--since YYYY-MM-DD]
+
+All are idempotent; run partitions and archive daily from cron (see README).
+"""
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+
+logger = logging.getLogger("app.maintenance")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DesiCodes database maintenance")
+    parser.add_argument("command", choices=["partitions", "archive", "rollups"])
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without changing it")
+    parser.add_argument("--since", type=lambda day: datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc),
+                        help="rollups: first day to recompute (default: the oldest job)")
+    args = parser.parse_args(argv)
+    if args.command == "rollups" and args.dry_run:
+        parser.error("rollups has no --dry-run")
+
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format="%(asctime)s [maintenance] %(levelname)s %(name)s: %(message)s"
+    )
+    from .db.session import SessionLocal
+    from .services.partition_service import partition_manager
+    from .services.usage_service import usage_rollups
+
+    db = SessionLocal()
+    try:
+        if args.command == "partitions":
+            created = partition_manager.ensure(db, dry_run=args.dry_run)
+            logger.info(f"{'Would create' if args.dry_run else 'Created'} {len(created)} partitions: {created}")
+        elif args.command == "rollups":
+            logger.info(f"Recomputed {usage_rollups.backfill(db, since=args.since)} usage rollups")
+        else:
+            archived = partition_manager.archive(db, dry_run=args.dry_run)
+            for name, rows in archived.items():
+                logger.info(f"{'Would archive' if args.dry_run else 'Archived'} {name}: {rows} rows")
+            pruned = partition_manager.prune(db, dry_run=args.dry_run)
+            logger.info(f"{'Would prune' if args.dry_run else 'Pruned'} {pruned}")
+    except Exception:
+        db.rollback()
+        logger.exception(f"{args.command} failed")
+        return 1
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,10 @@ from .user import User
 from .subscription import Plan, Subscription, SubscriptionStatus
 from .invoice import Invoice
 from .code_execution import CodeExecution
-from .transpiler_job import TranspilerJob, JobStatus
+from .transpiler_job import TranspilerJob, JobStatus, JobIdempotencyKey
+from .usage_counter import UsageCounter
+from .usage_rollup import UsageRollup
+from .payload_blob import PayloadBlob
 
 __all__ = [
     "User",
@@ -14,4 +17,8 @@ __all__ = [
     "CodeExecution",
     "TranspilerJob",
     "JobStatus",
+    "JobIdempotencyKey",
+    "UsageCounter",
+    "UsageRollup",
+    "PayloadBlob",
 ]
@@ -1,16 +1,31 @@
 # app/models/code_execution.py
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import (
+    Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Index, Sequence, UniqueConstraint, DDL, event
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
 
 
 class CodeExecution(Base):
+    """Partitioned by month of created_at on Postgres, like transpiler_jobs.
+
+    A unique constraint on a partitioned table must include the partition
+    key, so execution_id is unique together with created_at: recording the
+    same execution twice conflicts, and lookups by execution_id should pass
+    created_at too so they read one partition.
+    """
     __tablename__ = "code_executions"
+    __table_args__ = (
+        Index("ix_code_executions_user_created_id", "user_id", "created_at", "id"),
+        UniqueConstraint("execution_id", "created_at", name="uq_code_executions_execution_id_created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
-    execution_id = Column(String, unique=True, index=True)
+    # A sequence rather than SERIAL: the partition key has to be part of the primary key
+    id = Column(Integer, Sequence("code_executions_id_seq"), primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    execution_id = Column(String)
     language = Column(String, nullable=False)
     code_hash = Column(String, index=True)
     input_data = Column(Text, nullable=True)
@@ -22,7 +37,14 @@ class CodeExecution(Base):
     quota_used = Column(Integer, default=1)
     ip_address = Column(String, nullable=True)
     user_agent = Column(String, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
 
     # Relationship
-    user = relationship("User", back_populates="executions")
\ No newline at end of file
+    user = relationship("User", back_populates="executions")
+
+    __mapper_args__ = {"primary_key": [id]}
+
+
+event.listen(CodeExecution.__table__, "after_create", DDL(
+    "CREATE TABLE IF NOT EXISTS code_executions_default PARTITION OF code_executions DEFAULT"
+).execute_if(dialect="postgresql"))
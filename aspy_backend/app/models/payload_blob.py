@@ -0,0 +1,17 @@
+# app/models/payload_blob.py
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class PayloadBlob(Base):
+    """Compressed job text (code, output, logs), addressed by the sha256 of its content"""
+    __tablename__ = "payload_blobs"
+
+    hash = Column(String(64), primary_key=True)
+    codec = Column(String(8), nullable=False)  # "raw", "zlib" or "zstd"
+    size = Column(Integer, nullable=False)  # uncompressed bytes
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Refreshed (at most daily) whenever the content is stored again; archival collects stale blobs
+    used_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -1,5 +1,5 @@
 # app/models/transpiler_job.py - CREATE THIS FILE
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Boolean, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Boolean, Enum as SQLEnum, Index, DDL, event
 from sqlalchemy.sql import func
 from app.db.base import Base
 import enum
@@ -14,27 +14,42 @@ class JobStatus(str, enum.Enum):
 
 
 class TranspilerJob(Base):
+    """A submitted program and its result.
+
+    On Postgres the table is range-partitioned by month of submitted_at (see
+    partition_service), so its primary key there is (id, submitted_at); the
+    mapper still identifies jobs by id alone.
+    """
     __tablename__ = "transpiler_jobs"
+    __table_args__ = (
+        # Job history (newest first, keyset-paginated on (submitted_at, id)) and the monthly usage count
+        Index("ix_transpiler_jobs_user_submitted_id", "user_id", "submitted_at", "id"),
+        # Job history filtered by status
+        Index("ix_transpiler_jobs_user_status_submitted_id", "user_id", "status", "submitted_at", "id"),
+        {"postgresql_partition_by": "RANGE (submitted_at)"},
+    )
 
     id = Column(String(50), primary_key=True)
-    user_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, nullable=False)
     language = Column(String(50), nullable=False)
     target = Column(String(50), default="python")
-    code = Column(Text, nullable=False)
+    # Code, results and logs live in payload_blobs; these hold their hashes (see payload_service)
+    code_ref = Column(String(64), nullable=False)
     code_hash = Column(String(64), index=True)
     input_data = Column(Text, nullable=True)
     status = Column(SQLEnum(JobStatus), default=JobStatus.QUEUED)
 
     # Timing
-    submitted_at = Column(DateTime(timezone=True), server_default=func.now())
+    submitted_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
     started_at = Column(DateTime(timezone=True), nullable=True)
     completed_at = Column(DateTime(timezone=True), nullable=True)
 
     # Results
-    transpiled_code = Column(Text, nullable=True)
-    execution_output = Column(Text, nullable=True)
-    errors = Column(Text, nullable=True)
-    logs = Column(Text, nullable=True)
+    transpiled_code_ref = Column(String(64), nullable=True)
+    output_ref = Column(String(64), nullable=True)
+    errors_ref = Column(String(64), nullable=True)
+    logs_ref = Column(String(64), nullable=True)
+    output_preview = Column(String(103), nullable=True)  # for listings, which never load payloads
 
     # Metadata
     success = Column(Boolean, default=False)
@@ -45,9 +60,31 @@ class TranspilerJob(Base):
     # For async system
     ip_address = Column(String(100), nullable=True)
     user_agent = Column(String(500), nullable=True)
-    idempotency_key = Column(String(100), nullable=True, index=True)
+    idempotency_key = Column(String(100), nullable=True)  # claimed in job_idempotency_keys
     meta = Column(JSON, nullable=True, default=dict)
 
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __mapper_args__ = {"primary_key": [id]}
+
+
+class JobIdempotencyKey(Base):
+    """Claims an idempotency key for one job.
+
+    Unique indexes on a partitioned table must include the partition key,
+    which would only make keys unique per month, so the claim lives here.
+    """
+    __tablename__ = "job_idempotency_keys"
+
+    user_id = Column(Integer, primary_key=True)
+    idempotency_key = Column(String(100), primary_key=True)
+    job_id = Column(String(50), nullable=False)
+    submitted_at = Column(DateTime(timezone=True), nullable=False)  # locates the job's partition
+
+
+# Rows outside the monthly partitions created ahead of time land here instead of failing
+event.listen(TranspilerJob.__table__, "after_create", DDL(
+    "CREATE TABLE IF NOT EXISTS transpiler_jobs_default PARTITION OF transpiler_jobs DEFAULT"
+).execute_if(dialect="postgresql"))
@@ -0,0 +1,14 @@
+# app/models/usage_counter.py
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class UsageCounter(Base):
+    """Executions charged to a user in one quota period (a UTC month, "YYYY-MM")"""
+    __tablename__ = "usage_counters"
+
+    user_id = Column(Integer, primary_key=True)
+    period = Column(String(7), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
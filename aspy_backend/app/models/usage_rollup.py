@@ -0,0 +1,18 @@
+# app/models/usage_rollup.py
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class UsageRollup(Base):
+    """Finished jobs of one user, on one UTC day (of submission), in one language"""
+    __tablename__ = "usage_rollups"
+
+    # The primary key doubles as the index for per-user date ranges
+    user_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    language = Column(String(50), primary_key=True)
+    executions = Column(Integer, nullable=False, default=0)
+    successes = Column(Integer, nullable=False, default=0)
+    execution_ms = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
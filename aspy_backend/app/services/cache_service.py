@@ -0,0 +1,159 @@
+# app/services/cache_service.py In-process caches
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+import logging
+
+from .redis_client import get_redis
+from .transpiler_engine import TRANSPILER_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry and hit/miss counters"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entries"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        """Drop a single entry"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the metrics endpoint"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0,
+        }
+
+
+class TieredCache:
+    """In-process LRU in front of an optional shared Redis tier.
+
+    Values must be JSON-serialisable so the Redis tier can share them between
+    the API and worker processes. Redis errors degrade to memory-only.
+    """
+
+    def __init__(self, namespace: str, maxsize: int, ttl: float, use_redis: bool = False):
+        self.namespace = namespace
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.use_redis = use_redis
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None or not self.use_redis:
+            return value
+
+        client = get_redis()
+        if not client:
+            return None
+        try:
+            raw = client.get(f"{self.namespace}:{key}")
+        except Exception as e:
+            logger.warning(f"{self.namespace} cache lookup failed: {e}")
+            return None
+
+        if raw is None:
+            self.redis_misses += 1
+            return None
+        self.redis_hits += 1
+        value = json.loads(raw)
+        self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any):
+        self.memory.set(key, value)
+        if not self.use_redis:
+            return
+
+        client = get_redis()
+        if client:
+            try:
+                client.set(f"{self.namespace}:{key}", json.dumps(value), ex=int(self.memory.ttl))
+            except Exception as e:
+                logger.warning(f"{self.namespace} cache store failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.memory.stats()
+        stats["redis_enabled"] = self.use_redis
+        stats["redis_hits"] = self.redis_hits
+        stats["redis_misses"] = self.redis_misses
+        return stats
+
+
+def transpile_cache_key(language: str, code_hash: str) -> str:
+    """Transpiled code depends only on the source and the transpiler version"""
+    return f"{language}:{code_hash}:{TRANSPILER_VERSION}"
+
+
+def execution_cache_key(language: str, code_hash: str, input_data: Optional[str], timeout: int) -> str:
+    """A deterministic program's output depends on its source, stdin and time limit"""
+    input_hash = hashlib.sha256((input_data or "").encode()).hexdigest()
+    return f"{language}:{code_hash}:{input_hash}:{timeout}:{TRANSPILER_VERSION}"
+
+
+# Global instances
+transpile_cache = TieredCache(
+    "transpile",
+    maxsize=int(os.getenv("TRANSPILE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("TRANSPILE_CACHE_TTL", "3600")),
+    use_redis=os.getenv("TRANSPILE_CACHE_REDIS", "false").lower() == "true"
+)
+
+# Opt-in: only programs the transpiler marks deterministic are stored
+execution_cache_enabled = os.getenv("EXECUTION_CACHE_ENABLED", "false").lower() == "true"
+execution_cache = TieredCache(
+    "execution",
+    maxsize=int(os.getenv("EXECUTION_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("EXECUTION_CACHE_TTL", "600")),
+    use_redis=os.getenv("EXECUTION_CACHE_REDIS", "false").lower() == "true"
+)
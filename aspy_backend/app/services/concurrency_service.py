@@ -0,0 +1,150 @@
+# app/services/concurrency_service.py Per-account execution slots
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+import logging
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# The key lives until the latest lease ends, so it only ever outlasts every
+# live slot: a short lease (sync requests) never cuts a long one short.
+KEEP_UNTIL_LAST_LEASE = """
+local last = redis.call('ZRANGE', KEYS[1], -1, -1, 'WITHSCORES')
+if last[2] then
+    redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(last[2]) - now) + 1)
+end
+"""
+
+# Counting semaphore on a sorted set of slot tokens scored by lease expiry.
+# Expired leases (holder crashed) are dropped before counting.
+# KEYS: semaphore  ARGV: now, lease_seconds, limit, token
+ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[4])
+""" + KEEP_UNTIL_LAST_LEASE + """
+return 1
+"""
+
+# Extends a held slot's lease; a released or expired slot is not re-added.
+# KEYS: semaphore  ARGV: now, lease_seconds, token
+REFRESH_SCRIPT = """
+local now = tonumber(ARGV[1])
+if not redis.call('ZSCORE', KEYS[1], ARGV[3]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[3])
+""" + KEEP_UNTIL_LAST_LEASE + """
+return 1
+"""
+
+
+class ConcurrencyLimiter:
+    """Distributed counting semaphore limiting running executions per account.
+
+    Slots are leases: a holder that dies without releasing frees its slot
+    once the lease expires. Falls back to an in-process semaphore when Redis
+    is unavailable (then limits are per process).
+    """
+
+    def __init__(self, lease_seconds: float = 60):
+        self.lease_seconds = lease_seconds
+        self._local: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._acquire_script = None
+        self._refresh_script = None
+        self.acquired = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _key(user_id) -> str:
+        return f"concurrency:user:{user_id}"
+
+    def acquire(self, user_id, limit: int, lease_seconds: Optional[float] = None) -> Optional[str]:
+        """Take a slot; returns its token, or None if ``limit`` slots are in use"""
+        lease = lease_seconds or self.lease_seconds
+        token = uuid.uuid4().hex
+        client = get_redis()
+        if client:
+            try:
+                if self._acquire_script is None:
+                    self._acquire_script = client.register_script(ACQUIRE_SCRIPT)
+                granted = self._acquire_script(keys=[self._key(user_id)], args=[time.time(), lease, limit, token])
+                return self._count(token if granted else None)
+            except Exception as e:
+                logger.warning(f"Concurrency limiter falling back to local slots: {e}")
+
+        now = time.monotonic()
+        with self._lock:
+            slots = self._local.setdefault(self._key(user_id), {})
+            for held, expires_at in list(slots.items()):
+                if expires_at <= now:
+                    del slots[held]
+            if len(slots) >= limit:
+                return self._count(None)
+            slots[token] = now + lease
+        return self._count(token)
+
+    def _count(self, token: Optional[str]) -> Optional[str]:
+        if token:
+            self.acquired += 1
+        else:
+            self.rejected += 1
+        return token
+
+    def refresh(self, user_id, token: str, lease_seconds: Optional[float] = None):
+        """Extend a held slot's lease"""
+        lease = lease_seconds or self.lease_seconds
+        client = get_redis()
+        if client:
+            try:
+                if self._refresh_script is None:
+                    self._refresh_script = client.register_script(REFRESH_SCRIPT)
+                self._refresh_script(keys=[self._key(user_id)], args=[time.time(), lease, token])
+                return
+            except Exception as e:
+                logger.warning(f"Failed to refresh concurrency slot: {e}")
+        with self._lock:
+            slots = self._local.get(self._key(user_id), {})
+            if token in slots:
+                slots[token] = time.monotonic() + lease
+
+    def release(self, user_id, token: str):
+        """Give a slot back"""
+        client = get_redis()
+        if client:
+            try:
+                client.zrem(self._key(user_id), token)
+                return
+            except Exception as e:
+                logger.warning(f"Failed to release concurrency slot: {e}")
+        with self._lock:
+            self._local.get(self._key(user_id), {}).pop(token, None)
+
+    def in_use(self, user_id) -> int:
+        """Slots currently held by an account"""
+        client = get_redis()
+        if client:
+            try:
+                return client.zcount(self._key(user_id), time.time(), "+inf")
+            except Exception as e:
+                logger.warning(f"Failed to count concurrency slots: {e}")
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for expires_at in self._local.get(self._key(user_id), {}).values() if expires_at > now)
+
+    def stats(self):
+        return {"acquired": self.acquired, "rejected": self.rejected}
+
+
+# Global instance
+concurrency_limiter = ConcurrencyLimiter(
+    lease_seconds=float(os.getenv("CONCURRENCY_LEASE_SECONDS", "60"))
+)
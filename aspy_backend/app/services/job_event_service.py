@@ -0,0 +1,124 @@
+# app/services/job_event_service.py Job status notifications
+import asyncio
+import contextlib
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Set, Tuple
+import logging
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "job_events:"
+TERMINAL_STATUSES = {"completed", "failed", "cancelled"}
+
+
+class JobEventBroker:
+    """Pushes job state changes to the requests waiting on them.
+
+    Workers and the API ``publish`` after committing a transition. With Redis
+    the event goes out on ``job_events:<job_id>`` and every API process
+    listens with one pattern subscription; without Redis it is delivered
+    in-process only. Subscribers get an asyncio queue on their own loop; when
+    a slow one falls ``queue_size`` events behind, its oldest are dropped.
+    Events are wake-ups, not the record: pub/sub is fire-and-forget, so
+    subscribers re-read the job when woken and periodically when not.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._pubsub_thread = None
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def publish(self, job_id: str, status: str, **fields: Any):
+        """Announce a job's new ``status``; safe to call from any thread"""
+        event = {"job_id": job_id, "status": status, "at": datetime.utcnow().isoformat(), **fields}
+        self.published += 1
+        client = get_redis()
+        if client:
+            try:
+                client.publish(CHANNEL_PREFIX + job_id, json.dumps(event, default=str))
+                return
+            except Exception as e:
+                logger.warning(f"Failed to publish job event, delivering locally only: {e}")
+        self._deliver(job_id, event)
+
+    def _deliver(self, job_id: str, event: Dict[str, Any]):
+        with self._lock:
+            subscribers = list(self._subscribers.get(job_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, event)
+            except RuntimeError:
+                pass  # The subscriber's loop has closed
+
+    def _put(self, queue: asyncio.Queue, event: Dict[str, Any]):
+        if queue.full():
+            queue.get_nowait()
+            self.dropped += 1
+        queue.put_nowait(event)
+        self.delivered += 1
+
+    def _on_message(self, message):
+        try:
+            event = json.loads(message["data"])
+        except (TypeError, ValueError):
+            return
+        self._deliver(message["channel"][len(CHANNEL_PREFIX):], event)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, job_id: str) -> AsyncIterator[asyncio.Queue]:
+        """Queue of ``job_id``'s events published while the context is open"""
+        self.start()
+        entry = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.queue_size))
+        with self._lock:
+            self._subscribers[job_id].add(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                self._subscribers[job_id].discard(entry)
+                if not self._subscribers[job_id]:
+                    del self._subscribers[job_id]
+
+    def start(self):
+        """Listen for events published by other processes"""
+        client = get_redis()
+        if client and self._pubsub_thread is None:
+            with self._lock:
+                if self._pubsub_thread is not None:
+                    return
+                try:
+                    pubsub = client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.psubscribe(**{CHANNEL_PREFIX + "*": self._on_message})
+                    self._pubsub_thread = pubsub.run_in_thread(sleep_time=1, daemon=True)
+                except Exception as e:
+                    logger.warning(f"Job events from workers will not be received: {e}")
+
+    def stop(self):
+        if self._pubsub_thread is not None:
+            self._pubsub_thread.stop()
+            self._pubsub_thread = None
+
+    def stats(self):
+        with self._lock:
+            subscribers = sum(len(entries) for entries in self._subscribers.values())
+        return {
+            "subscribers": subscribers,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "listening": self._pubsub_thread is not None,
+        }
+
+
+# Global instance
+job_events = JobEventBroker(queue_size=int(os.getenv("JOB_EVENTS_QUEUE_SIZE", "100")))
@@ -0,0 +1,95 @@
+# app/services/job_output_service.py Live output of running jobs
+import itertools
+import json
+import os
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List
+import logging
+
+from .job_event_service import job_events
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "job_output:"
+
+
+class JobOutputStreams:
+    """stdout/stderr of running jobs, for the job event streams.
+
+    The process running a job gets a ``writer`` for it from the sandbox and
+    hands each chunk to subscribers as a job event (``seq``, ``stream``,
+    ``data``). The last ``buffer_chunks`` chunks are also kept in a ring
+    buffer, in Redis when available, so a stream opened mid-run starts with
+    recent output. The ring is only for live viewing: the complete output is
+    stored once with the job's result, and the ring is cleared then.
+    """
+
+    def __init__(self, buffer_chunks: int = 64, ttl_seconds: int = 3600):
+        self.buffer_chunks = buffer_chunks
+        self.ttl_seconds = ttl_seconds
+        self._local: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.chunks = 0
+
+    def writer(self, job_id: str) -> Callable[[str, str], None]:
+        """``write(stream, text)`` for one run of ``job_id``; safe to call from any thread"""
+        self.clear(job_id)
+        seq = itertools.count(1)
+
+        def write(stream: str, data: str):
+            chunk = {"seq": next(seq), "stream": stream, "data": data}
+            self._append(job_id, chunk)
+            job_events.publish(job_id, "processing", **chunk)
+            self.chunks += 1
+
+        return write
+
+    def _append(self, job_id: str, chunk: Dict[str, Any]):
+        client = get_redis()
+        if client:
+            try:
+                pipe = client.pipeline()
+                pipe.rpush(KEY_PREFIX + job_id, json.dumps(chunk))
+                pipe.ltrim(KEY_PREFIX + job_id, -self.buffer_chunks, -1)
+                pipe.expire(KEY_PREFIX + job_id, self.ttl_seconds)
+                pipe.execute()
+                return
+            except Exception as e:
+                logger.warning(f"Failed to buffer job output, buffering locally: {e}")
+        with self._lock:
+            self._local.setdefault(job_id, deque(maxlen=self.buffer_chunks)).append(chunk)
+
+    def backlog(self, job_id: str) -> List[Dict[str, Any]]:
+        """Buffered chunks of the job's current run, oldest first"""
+        client = get_redis()
+        if client:
+            try:
+                return [json.loads(chunk) for chunk in client.lrange(KEY_PREFIX + job_id, 0, -1)]
+            except Exception as e:
+                logger.warning(f"Failed to read buffered job output: {e}")
+        with self._lock:
+            return list(self._local.get(job_id, ()))
+
+    def clear(self, job_id: str):
+        client = get_redis()
+        if client:
+            try:
+                client.delete(KEY_PREFIX + job_id)
+            except Exception as e:
+                logger.warning(f"Failed to clear buffered job output: {e}")
+        with self._lock:
+            self._local.pop(job_id, None)
+
+    def stats(self):
+        with self._lock:
+            buffered = len(self._local)
+        return {"chunks": self.chunks, "buffer_chunks": self.buffer_chunks, "local_jobs": buffered}
+
+
+# Global instance
+job_output = JobOutputStreams(
+    buffer_chunks=int(os.getenv("JOB_OUTPUT_BUFFER_CHUNKS", "64")),
+    ttl_seconds=int(os.getenv("JOB_OUTPUT_TTL", "3600"))
+)
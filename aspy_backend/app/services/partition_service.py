@@ -0,0 +1,342 @@
+# app/services/partition_service.py Monthly partitions and archival of job history
+import gzip
+import io
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from sqlalchemy import and_, delete, func, select, text
+from sqlalchemy.orm import Session
+
+from ..models.payload_blob import PayloadBlob
+from ..models.transpiler_job import JobIdempotencyKey, TranspilerJob
+from .payload_service import JOB_PAYLOADS, PayloadStore
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Partitioned table -> its partition key
+PARTITIONED_TABLES = {
+    "transpiler_jobs": "submitted_at",
+    "code_executions": "created_at",
+}
+ARCHIVE_BATCH = 1000
+# Covers PayloadStore refreshing used_at at most daily
+BLOB_GRACE = timedelta(days=2)
+
+
+def month_start(at: Optional[datetime] = None) -> datetime:
+    """First instant of ``at``'s month, in UTC"""
+    at = at or datetime.now(timezone.utc)
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    return at.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def partition_month(table: str, name: str) -> Optional[datetime]:
+    """The month a partition holds, or None for the default partition and other tables"""
+    prefix = f"{table}_p"
+    if not name.startswith(prefix):
+        return None
+    try:
+        return datetime.strptime(name[len(prefix):], "%Y_%m").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def new_job_id(submitted_at: datetime) -> str:
+    """A job id naming its submission month (``job_YYYYMM_<hex>``), so lookups by id can be pruned"""
+    return f"job_{month_start(submitted_at):%Y%m}_{uuid.uuid4().hex[:12]}"
+
+
+def job_month(job_id: str, submitted_at: Union[datetime, str, None] = None) -> Optional[datetime]:
+    """Month holding the job's row: of ``submitted_at`` if given, else the one its id names"""
+    if isinstance(submitted_at, str):
+        submitted_at = datetime.fromisoformat(submitted_at)
+    if submitted_at is not None:
+        return month_start(submitted_at)
+    parts = job_id.split("_")
+    if len(parts) == 3 and len(parts[1]) == 6 and parts[1].isdigit():
+        try:
+            return datetime.strptime(parts[1], "%Y%m").replace(tzinfo=timezone.utc)
+        except ValueError:
+            return None
+    return None
+
+
+def job_filter(job_id: str, submitted_at: Union[datetime, str, None] = None):
+    """WHERE clause for one job, bounded to its month's partition when that is known.
+
+    Ids issued before they named a month, without ``submitted_at``, still
+    match but probe every partition.
+    """
+    month = job_month(job_id, submitted_at)
+    if month is None:
+        return TranspilerJob.id == job_id
+    return and_(
+        TranspilerJob.id == job_id,
+        TranspilerJob.submitted_at >= month,
+        TranspilerJob.submitted_at < add_months(month, 1)
+    )
+
+
+def archive_path(archive_dir: str, table: str, name: str) -> str:
+    suffix = ".jsonl.zst" if zstandard is not None else ".jsonl.gz"
+    return os.path.join(archive_dir, table, name + suffix)
+
+
+def open_archive(path: str, mode: str = "r"):
+    """Text stream over a .jsonl.zst or .jsonl.gz archive"""
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed; install zstandard to open it")
+        raw = open(path, mode + "b")
+        if mode == "w":
+            stream = zstandard.ZstdCompressor(level=10).stream_writer(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return gzip.open(path, mode + "t", encoding="utf-8")
+
+
+def write_archive(path: str, rows: Iterable[dict]) -> int:
+    """Write rows as JSON lines; the file only appears under ``path`` once complete"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    count = 0
+    with open_archive(tmp, "w") as out:
+        for row in rows:
+            out.write(json.dumps(row, default=str, ensure_ascii=False) + "\n")
+            count += 1
+    os.replace(tmp, path)
+    return count
+
+
+def read_archive(path: str) -> Iterator[dict]:
+    with open_archive(path) as lines:
+        for line in lines:
+            yield json.loads(line)
+
+
+class PartitionManager:
+    """Monthly range partitions of job history, and their archival.
+
+    ``ensure`` creates the partitions for the current month and the next
+    ``months_ahead``, so quota and usage queries for a month touch a single
+    partition. ``archive`` detaches partitions older than ``retention_months``,
+    writes their rows (with job payloads inlined) to compressed JSON lines
+    under ``archive_dir`` and drops them, which keeps vacuum and index sizes
+    flat however much history accumulates. Postgres only; elsewhere the tables
+    are not partitioned and these are no-ops.
+    """
+
+    def __init__(self, months_ahead: int = 3, retention_months: int = 12, archive_dir: str = "archive"):
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+        self.archive_dir = archive_dir
+        self.partitions_created = 0
+        self.rows_moved = 0
+        self.partitions_archived = 0
+        self.rows_archived = 0
+
+    @staticmethod
+    def _supported(db: Session) -> bool:
+        return db.get_bind().dialect.name == "postgresql"
+
+    def cutoff(self, now: Optional[datetime] = None) -> datetime:
+        """Partitions of months before this are archived"""
+        return add_months(month_start(now), -self.retention_months)
+
+    def wanted(self, now: Optional[datetime] = None) -> List[datetime]:
+        first = month_start(now)
+        return [add_months(first, n) for n in range(self.months_ahead + 1)]
+
+    def due(self, table: str, names: Iterable[str], now: Optional[datetime] = None) -> List[str]:
+        """Monthly partitions among ``names`` that are past retention, oldest first"""
+        cutoff = self.cutoff(now)
+        months = {name: partition_month(table, name) for name in names}
+        return sorted(name for name, month in months.items() if month is not None and month < cutoff)
+
+    @staticmethod
+    def attached(db: Session, table: str) -> List[str]:
+        return list(db.execute(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "WHERE parent.relname = :table"
+        ), {"table": table}).scalars())
+
+    @staticmethod
+    def detached(db: Session, table: str) -> List[str]:
+        """Monthly tables left detached by an archive run that did not finish"""
+        names = db.execute(text(
+            "SELECT tablename FROM pg_tables WHERE schemaname = current_schema() "
+            "AND tablename LIKE :pattern AND NOT tablename IN ("
+            "SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid)"
+        ), {"pattern": table + "_p%"}).scalars()
+        return [name for name in names if partition_month(table, name)]
+
+    def ensure(self, db: Session, now: Optional[datetime] = None, dry_run: bool = False) -> List[str]:
+        """Create missing partitions for this month and the ones ahead; returns their names"""
+        if not self._supported(db):
+            logger.info("Partitioning needs Postgres; nothing to do")
+            return []
+        created = []
+        for table, column in PARTITIONED_TABLES.items():
+            existing = set(self.attached(db, table))
+            for month in self.wanted(now):
+                name = partition_name(table, month)
+                if name in existing:
+                    continue
+                created.append(name)
+                if not dry_run:
+                    self._create(db, table, column, name, month)
+                    db.commit()
+        return created
+
+    def _create(self, db: Session, table: str, column: str, name: str, month: datetime):
+        bounds = f"FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{add_months(month, 1):%Y-%m-%d} 00:00:00+00')"
+        default = f"{table}_default"
+        in_range = f"{column} >= :start AND {column} < :end"
+        params = {"start": month, "end": add_months(month, 1)}
+        has_default = db.execute(text("SELECT to_regclass(:name)"), {"name": default}).scalar()
+        stranded = has_default and db.execute(
+            text(f"SELECT 1 FROM {default} WHERE {in_range} LIMIT 1"), params
+        ).first()
+        if not stranded:
+            db.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES {bounds}"))
+        else:
+            # Rows for this month already went to the default partition, which
+            # would make a plain CREATE ... PARTITION OF fail; move them first
+            db.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+            moved = db.execute(text(
+                f"WITH moved AS (DELETE FROM {default} WHERE {in_range} RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved"
+            ), params).rowcount
+            db.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+            self.rows_moved += moved
+            logger.info(f"Moved {moved} rows from {default} into {name}")
+        self.partitions_created += 1
+        logger.info(f"Created partition {name}")
+
+    def archive(self, db: Session, now: Optional[datetime] = None, dry_run: bool = False) -> Dict[str, int]:
+        """Archive and drop partitions past retention; returns rows archived per partition"""
+        if not self._supported(db):
+            logger.info("Partitioning needs Postgres; nothing to archive")
+            return {}
+        archived = {}
+        for table in PARTITIONED_TABLES:
+            attached = self.attached(db, table)
+            for name in self.due(table, attached + self.detached(db, table), now):
+                if dry_run:
+                    archived[name] = db.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+                    continue
+                if name in attached:
+                    # Plain DETACH: CONCURRENTLY is not allowed next to a default partition
+                    db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                    db.commit()
+                archived[name] = self._archive_table(db, table, name)
+        return archived
+
+    def _archive_table(self, db: Session, table: str, name: str) -> int:
+        expected = db.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+        path = archive_path(self.archive_dir, table, name)
+        written = write_archive(path, self._rows(db, table, name))
+        if written != expected:
+            # Keep the detached table so the next run retries
+            raise RuntimeError(f"Archived {written} of {expected} rows of {name}; table kept")
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+        self.partitions_archived += 1
+        self.rows_archived += written
+        logger.info(f"Archived {written} rows of {name} to {path}")
+        return written
+
+    def _rows(self, db: Session, table: str, name: str) -> Iterator[dict]:
+        result = db.execute(
+            text(f"SELECT * FROM {name} ORDER BY id"),
+            execution_options={"stream_results": True, "yield_per": ARCHIVE_BATCH}
+        ).mappings()
+        for batch in result.partitions():
+            rows = [dict(row) for row in batch]
+            if table == "transpiler_jobs":
+                self._inline_payloads(db, rows)
+            yield from rows
+
+    @staticmethod
+    def _inline_payloads(db: Session, rows: List[dict]):
+        # Blobs are shared with live jobs and collected separately, so archives carry the text
+        refs = {row[ref] for row in rows for ref in JOB_PAYLOADS.values() if row.get(ref)}
+        texts = {
+            blob.hash: PayloadStore.decode(blob)
+            for blob in db.execute(select(PayloadBlob).where(PayloadBlob.hash.in_(refs))).scalars()
+        } if refs else {}
+        for row in rows:
+            for name, ref in JOB_PAYLOADS.items():
+                row[name] = texts.get(row.get(ref))
+
+    def prune(self, db: Session, now: Optional[datetime] = None, dry_run: bool = False) -> Dict[str, int]:
+        """Drop idempotency keys and payload blobs that only archived jobs used"""
+        cutoff = self.cutoff(now)
+        conditions = {
+            "idempotency_keys": (JobIdempotencyKey, JobIdempotencyKey.submitted_at < cutoff),
+            # A live job stores (and so refreshes) its blobs no earlier than a
+            # day before it was submitted, so older blobs serve archived jobs only
+            "payload_blobs": (PayloadBlob, PayloadBlob.used_at < cutoff - BLOB_GRACE),
+        }
+        if self._supported(db) and self._unarchived(db, now):
+            logger.warning("Jobs older than the retention window are not archived yet; keeping payload blobs")
+            del conditions["payload_blobs"]
+        if dry_run:
+            return {
+                name: db.scalar(select(func.count()).select_from(model).where(condition))
+                for name, (model, condition) in conditions.items()
+            }
+        pruned = {name: db.execute(delete(model).where(condition)).rowcount
+                  for name, (model, condition) in conditions.items()}
+        db.commit()
+        return pruned
+
+    def _unarchived(self, db: Session, now: Optional[datetime]) -> bool:
+        for table, column in PARTITIONED_TABLES.items():
+            if self.due(table, self.attached(db, table) + self.detached(db, table), now):
+                return True
+        # Jobs that landed in the default partition are never archived
+        return db.execute(
+            text("SELECT 1 FROM transpiler_jobs_default WHERE submitted_at < :cutoff LIMIT 1"),
+            {"cutoff": self.cutoff(now)}
+        ).first() is not None
+
+    def stats(self):
+        return {
+            "months_ahead": self.months_ahead,
+            "retention_months": self.retention_months,
+            "partitions_created": self.partitions_created,
+            "rows_moved": self.rows_moved,
+            "partitions_archived": self.partitions_archived,
+            "rows_archived": self.rows_archived,
+        }
+
+
+# Global instance
+partition_manager = PartitionManager(
+    months_ahead=int(os.getenv("PARTITION_MONTHS_AHEAD", "3")),
+    retention_months=int(os.getenv("ARCHIVE_RETENTION_MONTHS", "12")),
+    archive_dir=os.getenv("ARCHIVE_DIR", "archive")
+)
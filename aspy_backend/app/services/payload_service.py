@@ -0,0 +1,169 @@
+# app/services/payload_service.py Content-addressed store for job text
+import hashlib
+import os
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models.payload_blob import PayloadBlob
+from ..models.transpiler_job import TranspilerJob
+from .cache_service import TTLCache
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# TranspilerJob payload name -> column holding its blob hash
+JOB_PAYLOADS = {
+    "code": "code_ref",
+    "transpiled_code": "transpiled_code_ref",
+    "execution_output": "output_ref",
+    "errors": "errors_ref",
+    "logs": "logs_ref",
+}
+PREVIEW_CHARS = 100
+# Larger payloads are decompressed per request rather than held in memory
+CACHE_MAX_CHARS = 64 * 1024
+
+
+def output_preview(output: Optional[str]) -> Optional[str]:
+    if output is None:
+        return None
+    return output[:PREVIEW_CHARS] + ("..." if len(output) > PREVIEW_CHARS else "")
+
+
+class PayloadStore:
+    """Job code, output and logs, compressed and stored once per distinct content.
+
+    ``transpiler_jobs`` rows keep only the sha256 of each payload, so status
+    polls and listings read small rows, and identical submissions and
+    results (common for course exercises) share one blob. Blobs never change
+    once written, which lets decompressed text be cached without invalidation.
+    """
+
+    def __init__(self, codec: str = "zlib", min_compress_bytes: int = 256, cache_size: int = 1000):
+        if codec == "zstd" and zstandard is None:
+            logger.warning("PAYLOAD_CODEC=zstd needs the zstandard package; using zlib")
+            codec = "zlib"
+        self.codec = codec
+        self.min_compress_bytes = min_compress_bytes
+        self.cache = TTLCache(maxsize=cache_size, ttl=3600)
+        self.bytes_in = 0
+        self.bytes_stored = 0
+
+    @staticmethod
+    def _insert(db: Session):
+        return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+    def encode(self, text: str) -> PayloadBlob:
+        raw = text.encode("utf-8")
+        codec, data = "raw", raw
+        if len(raw) >= self.min_compress_bytes:
+            if self.codec == "zstd":
+                compressed = zstandard.ZstdCompressor(level=3).compress(raw)
+            else:
+                compressed = zlib.compress(raw, 6)
+            # Already-dense output (random or binary-ish) is kept as is
+            if len(compressed) < len(raw):
+                codec, data = self.codec, compressed
+        return PayloadBlob(hash=hashlib.sha256(raw).hexdigest(), codec=codec, size=len(raw), data=data)
+
+    @staticmethod
+    def decode(blob: PayloadBlob) -> str:
+        data = blob.data
+        if blob.codec == "zlib":
+            data = zlib.decompress(data)
+        elif blob.codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError(f"Payload {blob.hash} is zstd-compressed; install zstandard to read it")
+            data = zstandard.ZstdDecompressor().decompress(data, max_output_size=blob.size)
+        return data.decode("utf-8")
+
+    def _remember(self, ref: str, text: str):
+        if len(text) <= CACHE_MAX_CHARS:
+            self.cache.set(ref, text)
+
+    def put_many(self, db: Session, texts: Iterable[Optional[str]]) -> list:
+        """Store texts (in ``db``'s transaction) and return their hashes; None stays None"""
+        blobs, refs = {}, []
+        for text in texts:
+            if text is None:
+                refs.append(None)
+                continue
+            blob = self.encode(text)
+            blobs.setdefault(blob.hash, blob)
+            refs.append(blob.hash)
+            self._remember(blob.hash, text)
+        if blobs:
+            now = datetime.now(timezone.utc)
+            stmt = self._insert(db)(PayloadBlob).values([
+                {"hash": b.hash, "codec": b.codec, "size": b.size, "data": b.data, "used_at": now}
+                for b in blobs.values()
+            ])
+            # Reuse keeps a blob out of the archiver's garbage collection; once a day is enough
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["hash"], set_={"used_at": now},
+                where=PayloadBlob.used_at < now - timedelta(days=1)
+            )
+            db.execute(stmt)
+            self.bytes_in += sum(b.size for b in blobs.values())
+            self.bytes_stored += sum(len(b.data) for b in blobs.values())
+        return refs
+
+    def get_many(self, db: Session, refs: Iterable[Optional[str]]) -> Dict[str, str]:
+        """Text for each hash, from the cache where possible and one query for the rest"""
+        found, missing = {}, set()
+        for ref in refs:
+            if ref is None or ref in found:
+                continue
+            text = self.cache.get(ref)
+            if text is None:
+                missing.add(ref)
+            else:
+                found[ref] = text
+        if missing:
+            for blob in db.execute(select(PayloadBlob).where(PayloadBlob.hash.in_(missing))).scalars():
+                text = self.decode(blob)
+                self._remember(blob.hash, text)
+                found[blob.hash] = text
+        return found
+
+    def save_job(self, db: Session, job: TranspilerJob, **payloads: Optional[str]):
+        """Store payloads (code=..., execution_output=..., ...) and point ``job`` at them"""
+        refs = self.put_many(db, payloads.values())
+        for name, ref in zip(payloads, refs):
+            setattr(job, JOB_PAYLOADS[name], ref)
+        if "execution_output" in payloads:
+            job.output_preview = output_preview(payloads["execution_output"])
+
+    def load_job(self, db: Session, job: TranspilerJob, *names: str) -> Dict[str, Optional[str]]:
+        """The job's payloads by name (all of them by default)"""
+        names = names or tuple(JOB_PAYLOADS)
+        refs = {name: getattr(job, JOB_PAYLOADS[name]) for name in names}
+        texts = self.get_many(db, refs.values())
+        return {name: texts.get(ref) if ref else None for name, ref in refs.items()}
+
+    def stats(self):
+        return {
+            "codec": self.codec,
+            "bytes_in": self.bytes_in,
+            "bytes_stored": self.bytes_stored,
+            "compression_ratio": round(self.bytes_in / self.bytes_stored, 2) if self.bytes_stored else 0,
+            "cache": self.cache.stats(),
+        }
+
+
+# Global instance
+payload_store = PayloadStore(
+    codec=os.getenv("PAYLOAD_CODEC", "zlib"),
+    min_compress_bytes=int(os.getenv("PAYLOAD_COMPRESS_MIN_BYTES", "256")),
+    cache_size=int(os.getenv("PAYLOAD_CACHE_SIZE", "1000"))
+)
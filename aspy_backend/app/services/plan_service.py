@@ -0,0 +1,209 @@
+# app/services/plan_service.py In-process plan catalog
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from ..models.subscription import Plan, PlanType
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+INVALIDATE_CHANNEL = "plans:invalidate"
+MISS_RELOAD_INTERVAL = 5.0
+MAX_REMEMBERED_MISSES = 1024
+
+
+class PlanCatalog:
+    """All plans, cached in memory and indexed by id, name and type.
+
+    There are a handful of plans and they rarely change, so every request
+    reads them from here instead of the database. Entries are detached
+    ``Plan`` rows: read them, but never add them to a session. The catalog
+    reloads after ``ttl`` seconds, and immediately when any node commits a
+    plan change (broadcast over Redis pub/sub).
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._by_id: Dict[int, Plan] = {}
+        self._by_name: Dict[str, Plan] = {}
+        self._by_type: Dict[PlanType, Plan] = {}
+        self._listing: List[Dict[str, Any]] = []
+        self._missing: Set[int] = set()
+        self._miss_reload_at = 0.0
+        self.etag: Optional[str] = None
+        self._loaded_at = 0.0
+        self._pubsub_thread = None
+        self.hits = 0
+        self.loads = 0
+        self.invalidations = 0
+
+    def load(self):
+        """(Re)load every plan from the database"""
+        from ..db.session import SessionLocal
+        from ..schemas.subscription import Plan as PlanSchema
+
+        db = SessionLocal()
+        try:
+            plans = db.query(Plan).order_by(Plan.id).all()
+            db.expunge_all()
+        finally:
+            db.close()
+
+        listing = [PlanSchema.model_validate(plan).model_dump(mode="json") for plan in plans]
+        body = json.dumps(listing, sort_keys=True, ensure_ascii=False).encode()
+        with self._lock:
+            self._by_id = {plan.id: plan for plan in plans}
+            self._by_name = {plan.name.lower(): plan for plan in plans if plan.name}
+            self._by_type = {plan.type: plan for plan in plans if plan.type}
+            self._listing = listing
+            self._missing = set()
+            self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+        logger.info(f"Plan catalog loaded {len(plans)} plans")
+
+    def _fresh(self):
+        if time.monotonic() - self._loaded_at < self.ttl:
+            self.hits += 1
+            return
+        try:
+            self.load()
+        except Exception:
+            if not self._by_id:
+                raise
+            # Keep serving the previous catalog until the database is back
+            logger.exception("Plan catalog reload failed; serving cached plans")
+
+    def get(self, plan_id) -> Optional[Plan]:
+        """Plan by id; ids from payment metadata may arrive as strings"""
+        try:
+            plan_id = int(plan_id)
+        except (TypeError, ValueError):
+            return None
+        self._fresh()
+        plan = self._by_id.get(plan_id)
+        if plan is None and plan_id not in self._missing:
+            plan = self._reload_for_miss(plan_id)
+        return plan
+
+    def _reload_for_miss(self, plan_id: int) -> Optional[Plan]:
+        """Reload once for an id that may have been created on another node
+        before its invalidation arrived.
+
+        Ids are client-supplied, so reloads triggered by misses are limited to
+        one per MISS_RELOAD_INTERVAL, and ids still missing after a reload are
+        remembered until the next load.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - max(self._loaded_at, self._miss_reload_at) < MISS_RELOAD_INTERVAL:
+                reload = False
+            else:
+                reload = True
+                self._miss_reload_at = now
+        if reload:
+            try:
+                self.load()
+            except Exception:
+                reload = False
+                logger.exception("Plan catalog reload failed; serving cached plans")
+        plan = self._by_id.get(plan_id)
+        if plan is None and reload:
+            with self._lock:
+                if len(self._missing) < MAX_REMEMBERED_MISSES:
+                    self._missing.add(plan_id)
+        return plan
+
+    def by_name(self, name: str) -> Optional[Plan]:
+        self._fresh()
+        return self._by_name.get(name.lower())
+
+    def by_type(self, plan_type) -> Optional[Plan]:
+        self._fresh()
+        return self._by_type.get(PlanType(plan_type))
+
+    def all(self) -> List[Plan]:
+        self._fresh()
+        return list(self._by_id.values())
+
+    def listing(self) -> Tuple[List[Dict[str, Any]], str]:
+        """Serialized plans for GET /plans and their ETag"""
+        self._fresh()
+        with self._lock:
+            return self._listing, self.etag
+
+    def invalidate(self, broadcast: bool = True):
+        """Drop the cached plans here and, with ``broadcast``, on every other node"""
+        with self._lock:
+            self._loaded_at = 0.0
+            self.invalidations += 1
+        if broadcast:
+            client = get_redis()
+            if client:
+                try:
+                    client.publish(INVALIDATE_CHANNEL, "1")
+                except Exception as e:
+                    logger.warning(f"Failed to broadcast plan invalidation: {e}")
+
+    def start(self):
+        """Load the catalog and listen for invalidations from other nodes"""
+        try:
+            self.load()
+        except Exception as e:
+            logger.warning(f"Plan catalog not loaded at startup: {e}")
+        client = get_redis()
+        if client and self._pubsub_thread is None:
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{INVALIDATE_CHANNEL: lambda _: self.invalidate(broadcast=False)})
+                self._pubsub_thread = pubsub.run_in_thread(sleep_time=1, daemon=True)
+            except Exception as e:
+                logger.warning(f"Plan invalidations will not be received: {e}")
+
+    def stop(self):
+        if self._pubsub_thread is not None:
+            self._pubsub_thread.stop()
+            self._pubsub_thread = None
+
+    def stats(self):
+        return {
+            "plans": len(self._by_id),
+            "missing": len(self._missing),
+            "hits": self.hits,
+            "loads": self.loads,
+            "invalidations": self.invalidations,
+        }
+
+
+# Global instance
+plan_catalog = PlanCatalog(ttl=float(os.getenv("PLAN_CACHE_TTL", "300")))
+
+
+# Invalidate the catalog whenever a transaction that changed a plan commits
+@event.listens_for(Plan, "after_insert")
+@event.listens_for(Plan, "after_update")
+@event.listens_for(Plan, "after_delete")
+def _plan_changed(_mapper, _connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info["plans_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("plans_changed", False):
+        plan_catalog.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("plans_changed", None)
@@ -1,18 +1,100 @@
 # app/services/queue_service.py - CREATE THIS FILE
+import asyncio
 import json
+import math
 import os
-from typing import Optional, Dict, Any
+import socket
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from typing import Optional, Dict, Any, List
 import logging
 
 # Lazy import for redis to avoid syntax errors
 redis = None
 try:
     import redis
+    import redis.asyncio as redis_asyncio
 except ImportError:
     redis = None
+    redis_asyncio = None
 
 logger = logging.getLogger(__name__)
 
+# Requeue in-flight jobs whose lease expired. A job that is in the processing
+# list but has no lease yet (worker died between BLMOVE and ZADD) is given one
+# visibility timeout from the first time the reaper sees it.
+# KEYS: queue, processing, leases, orphans, attempts, dead
+# ARGV: now, visibility_timeout, max_deliveries
+REAP_SCRIPT = """
+local now = tonumber(ARGV[1])
+local visibility = tonumber(ARGV[2])
+local max_deliveries = tonumber(ARGV[3])
+local requeued = 0
+local dead = {}
+for _, raw in ipairs(redis.call('LRANGE', KEYS[2], 0, -1)) do
+    local ok, job = pcall(cjson.decode, raw)
+    local receipt = raw
+    if ok and type(job) == 'table' and job['_receipt'] then
+        receipt = job['_receipt']
+    end
+    local expired = false
+    local deadline = redis.call('ZSCORE', KEYS[3], receipt)
+    if deadline then
+        expired = tonumber(deadline) <= now
+    else
+        local seen = redis.call('HGET', KEYS[4], receipt)
+        if not seen then
+            redis.call('HSET', KEYS[4], receipt, now)
+        elseif now - tonumber(seen) >= visibility then
+            expired = true
+        end
+    end
+    if expired then
+        redis.call('LREM', KEYS[2], 1, raw)
+        redis.call('ZREM', KEYS[3], receipt)
+        redis.call('HDEL', KEYS[4], receipt)
+        if redis.call('HINCRBY', KEYS[5], receipt, 1) >= max_deliveries then
+            redis.call('HDEL', KEYS[5], receipt)
+            redis.call('LPUSH', KEYS[6], raw)
+            table.insert(dead, raw)
+        else
+            -- Consumers pop from the right: redelivered jobs go first
+            redis.call('RPUSH', KEYS[1], raw)
+            requeued = requeued + 1
+        end
+    end
+end
+return {requeued, dead}
+"""
+
+# Move deferred jobs that are due back onto their lane. Every key touched is
+# passed in: KEYS: delayed, doorbell, un-laned target, then one target per
+# lane (the list, or its stream)  ARGV: now, "streams" or "list", lane names
+# in the order of their KEYS
+PROMOTE_SCRIPT = """
+local targets = {}
+for i = 3, #ARGV do
+    targets[ARGV[i]] = KEYS[i + 1]
+end
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 100)
+for _, raw in ipairs(due) do
+    redis.call('ZREM', KEYS[1], raw)
+    local job = cjson.decode(raw)
+    local target = (job['_lane'] and targets[job['_lane']]) or KEYS[3]
+    if ARGV[2] == 'streams' then
+        redis.call('XADD', target, '*', 'data', raw)
+    else
+        redis.call('LPUSH', target, raw)
+        redis.call('LPUSH', KEYS[2], 1)
+        redis.call('LTRIM', KEYS[2], 0, 99)
+    end
+end
+local next_due = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {#due, next_due[2] or false}
+"""
+
 
 class QueueService:
     _instance = None
@@ -25,57 +107,662 @@ class QueueService:
 
     def _init_queue(self):
         """Initialize Redis connection or use in-memory queue"""
-        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        # Reliable mode: dequeued jobs stay leased until ack() and are
+        # redelivered if the worker dies or stops heartbeating
+        self.reliable = os.getenv("QUEUE_RELIABLE", "true").lower() == "true"
+        self.visibility_timeout = float(os.getenv("QUEUE_VISIBILITY_TIMEOUT", "60"))
+        self.max_deliveries = int(os.getenv("QUEUE_MAX_DELIVERIES", "3"))
+        # "list" (LPUSH/BLMOVE) or "streams" (consumer group on <queue>:stream)
+        self.backend = os.getenv("QUEUE_BACKEND", "list").lower()
+        self.stream_group = os.getenv("QUEUE_STREAM_GROUP", "workers")
+        self.stream_consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = int(os.getenv("QUEUE_BATCH_SIZE", "10"))
+        self._stream_groups = set()
+        # Entries read in a batch but not yet handed to the worker
+        self._stream_buffers: Dict[str, deque] = defaultdict(deque)
+        # Priority lanes in plan order with their weighted-fair shares
+        self.lane_weights = self._parse_lane_weights(
+            os.getenv("QUEUE_LANE_WEIGHTS", "campus=8,team=6,pro=4,free=1")
+        )
+        self.default_lane = list(self.lane_weights)[-1]
+        self._lane_credit: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(self.lane_weights, 0))
+        # Recent queue wait samples (seconds) per lane queue
+        self._wait_samples: Dict[str, deque] = defaultdict(lambda: deque(maxlen=1000))
+        # Async client is bound to the event loop that created it
+        self._async_redis = None
+        self._async_loop = None
+        # receipt -> raw payload of jobs leased by this process
+        self._inflight: Dict[str, tuple] = {}
         try:
-            self.redis = redis.Redis.from_url(redis_url, decode_responses=True, socket_connect_timeout=1)
+            self.redis = redis.Redis.from_url(self.redis_url, decode_responses=True, socket_connect_timeout=1)
             self.redis.ping()
+            self._reap = self.redis.register_script(REAP_SCRIPT)
+            self._promote = self.redis.register_script(PROMOTE_SCRIPT)
             logger.info("✅ Redis connected successfully")
             self.use_redis = True
         except Exception as e:
             logger.warning(f"Redis not available, using in-memory queue: {e}")
             self.redis = None
-            self.memory_queue = []
             self.use_redis = False
+        self.use_streams = self.use_redis and self.backend == "streams"
+        # One asyncio.Queue per queue name so blocked consumers wake on enqueue
+        self.memory_queues: Dict[str, asyncio.Queue] = defaultdict(asyncio.Queue)
+        self._memory_loop = None
+        self._memory_lock = threading.Lock()
+        # receipt -> (queue_name, job_data, lease deadline) for the memory backend
+        self._memory_leases: Dict[str, tuple] = {}
+        self.memory_dead: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+
+    @staticmethod
+    def _parse_lane_weights(spec: str) -> Dict[str, int]:
+        weights = {}
+        for item in spec.split(","):
+            lane, _, weight = item.strip().partition("=")
+            if lane:
+                weights[lane.strip().lower()] = max(1, int(weight or 1))
+        return weights
+
+    def lane_for(self, plan_type: Optional[str]) -> str:
+        """Lane a plan's jobs are queued on; unknown plans share the lowest lane"""
+        plan_type = (plan_type or "").lower()
+        return plan_type if plan_type in self.lane_weights else self.default_lane
+
+    @staticmethod
+    def lane_queue(queue_name: str, lane: str) -> str:
+        return f"{queue_name}:{lane}"
+
+    def lane_queues(self, queue_name: str) -> List[str]:
+        return [self.lane_queue(queue_name, lane) for lane in self.lane_weights]
 
-    def enqueue(self, queue_name: str, job_data: Dict[str, Any]) -> bool:
-        """Add job to queue"""
+    @staticmethod
+    def _key(queue_name: str) -> str:
+        """
+        Redis key of a queue: the base name is a hash tag, so on Redis Cluster
+        a queue, its lanes and all their keys share one slot and the multi-key
+        scripts and transactions work ("jobs:pro" -> "{jobs}:pro")
+        """
+        if "{" in queue_name:
+            return queue_name
+        base, sep, rest = queue_name.partition(":")
+        return f"{{{base}}}{sep}{rest}"
+
+    @classmethod
+    def _keys(cls, queue_name: str) -> Dict[str, str]:
+        key = cls._key(queue_name)
+        return {
+            "queue": key,
+            "processing": f"{key}:processing",
+            "leases": f"{key}:leases",
+            "orphans": f"{key}:orphans",
+            "attempts": f"{key}:attempts",
+            "dead": f"{key}:dead",
+            "stream": f"{key}:stream",
+            "doorbell": f"{key}:doorbell",
+            "waits": f"{key}:waits",
+            "delayed": f"{key}:delayed",
+        }
+
+    def enqueue(self, queue_name: str, job_data: Dict[str, Any], lane: Optional[str] = None) -> bool:
+        """Add job to queue, or to one of its priority lanes"""
+        if lane is not None:
+            lane = self.lane_for(lane)
+            job_data = {"_enqueued_at": time.time(), **job_data, "_lane": lane}
+            if not self.enqueue(self.lane_queue(queue_name, lane), job_data):
+                return False
+            self._ring_doorbell(queue_name)
+            return True
         try:
+            if self.use_streams:
+                self.redis.xadd(self._keys(queue_name)["stream"], {"data": json.dumps(job_data)})
+                logger.debug(f"Job added to stream {queue_name}: {job_data.get('job_id')}")
+                return True
+            job_data = {**job_data, "_receipt": uuid.uuid4().hex}
             if self.use_redis and self.redis:
-                self.redis.lpush(queue_name, json.dumps(job_data))
+                self.redis.lpush(self._key(queue_name), json.dumps(job_data))
                 logger.debug(f"Job enqueued to Redis {queue_name}: {job_data.get('job_id')}")
             else:
-                self.memory_queue.append(job_data)
+                self._memory_put(queue_name, job_data)
                 logger.debug(f"Job added to memory queue: {job_data.get('job_id')}")
             return True
         except Exception as e:
             logger.error(f"Failed to enqueue job: {e}")
             return False
 
+    def _memory_put(self, queue_name: str, job_data: Dict[str, Any]):
+        """asyncio.Queue is not thread-safe; hop onto the consumer's loop if needed"""
+        loop = self._memory_loop
+        if loop is not None and not loop.is_closed():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is not loop:
+                loop.call_soon_threadsafe(self.memory_queues[queue_name].put_nowait, job_data)
+                return
+        with self._memory_lock:
+            self.memory_queues[queue_name].put_nowait(job_data)
+
     def dequeue(self, queue_name: str) -> Optional[Dict[str, Any]]:
-        """Get next job from queue"""
+        """Get next job from queue without waiting"""
         try:
+            if self.use_streams:
+                if not self._stream_buffers[queue_name]:
+                    self._ensure_group(queue_name)
+                    self._stream_buffers[queue_name].extend(
+                        self._parse_stream_reply(queue_name, self._stream_read(self.redis, queue_name, None))
+                    )
+                buffer = self._stream_buffers[queue_name]
+                return buffer.popleft() if buffer else None
             if self.use_redis and self.redis:
-                job_data = self.redis.rpop(queue_name)
+                if self.reliable:
+                    keys = self._keys(queue_name)
+                    raw = self.redis.lmove(keys["queue"], keys["processing"], "RIGHT", "LEFT")
+                    return self._lease_redis(queue_name, raw) if raw else None
+                job_data = self.redis.rpop(self._key(queue_name))
                 if job_data:
                     return json.loads(job_data)
-            elif self.memory_queue:
-                return self.memory_queue.pop(0) if self.memory_queue else None
+            elif not self.memory_queues[queue_name].empty():
+                return self._lease_memory(queue_name, self.memory_queues[queue_name].get_nowait())
             return None
         except Exception as e:
             logger.error(f"Failed to dequeue job: {e}")
             return None
 
+    async def dequeue_async(self, queue_name: str, timeout: int = 5) -> Optional[Dict[str, Any]]:
+        """
+        Wait up to ``timeout`` seconds for the next job
+
+        Uses BRPOP (BLMOVE in reliable mode) on Redis and asyncio.Queue in
+        memory, so an idle worker makes no calls and a new job is picked up as
+        soon as it is enqueued. Returns None on timeout so callers can check
+        for shutdown.
+        """
+        try:
+            if self.use_streams:
+                buffer = self._stream_buffers[queue_name]
+                if not buffer:
+                    await asyncio.to_thread(self._ensure_group, queue_name)
+                    reply = await self._stream_read(self._get_async_redis(), queue_name, int(timeout * 1000))
+                    buffer.extend(self._parse_stream_reply(queue_name, reply))
+                return buffer.popleft() if buffer else None
+            if self.use_redis and self.redis:
+                client = self._get_async_redis()
+                if self.reliable:
+                    keys = self._keys(queue_name)
+                    raw = await client.blmove(keys["queue"], keys["processing"], timeout, "RIGHT", "LEFT")
+                    return self._lease_redis(queue_name, raw) if raw else None
+                item = await client.brpop(self._key(queue_name), timeout=timeout)
+                return json.loads(item[1]) if item else None
+
+            self._memory_loop = asyncio.get_running_loop()
+            job_data = await asyncio.wait_for(self.memory_queues[queue_name].get(), timeout)
+            return self._lease_memory(queue_name, job_data)
+        except asyncio.TimeoutError:
+            return None
+        except Exception as e:
+            logger.error(f"Failed to dequeue job: {e}")
+            await asyncio.sleep(1)
+            return None
+
+    def _ensure_group(self, queue_name: str):
+        stream = self._keys(queue_name)["stream"]
+        if stream in self._stream_groups:
+            return
+        try:
+            self.redis.xgroup_create(stream, self.stream_group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._stream_groups.add(stream)
+
+    def _stream_read(self, client, queue_name: str, block_ms: Optional[int]):
+        """XREADGROUP up to batch_size new entries (awaitable for async clients); the group must exist"""
+        return client.xreadgroup(
+            self.stream_group, self.stream_consumer,
+            {self._keys(queue_name)["stream"]: ">"},
+            count=self.batch_size, block=block_ms
+        )
+
+    def _parse_stream_reply(self, queue_name: str, reply) -> List[Dict[str, Any]]:
+        jobs = []
+        for _, entries in reply or []:
+            for entry_id, fields in entries:
+                jobs.append(self._lease_stream(queue_name, entry_id, fields))
+        return jobs
+
+    def _ring_doorbell(self, queue_name: str):
+        """Wake one consumer blocked on any lane of ``queue_name``"""
+        try:
+            if self.use_streams:
+                return  # XREADGROUP blocks on every lane stream directly
+            doorbell = self._keys(queue_name)["doorbell"]
+            if self.use_redis and self.redis:
+                pipe = self.redis.pipeline()
+                pipe.lpush(doorbell, 1)
+                # Tokens pile up while every worker is busy; a few spurious wakeups are harmless
+                pipe.ltrim(doorbell, 0, 99)
+                pipe.execute()
+            elif self.memory_queues[doorbell].qsize() < 100:
+                self._memory_put(doorbell, 1)
+        except Exception as e:
+            logger.error(f"Failed to ring doorbell: {e}")
+
+    async def _wait_doorbell(self, queue_name: str, timeout: float):
+        doorbell = self._keys(queue_name)["doorbell"]
+        try:
+            if self.use_streams:
+                client = self._get_async_redis()
+                streams = {self._keys(lane_queue)["stream"]: lane_queue for lane_queue in self.lane_queues(queue_name)}
+                for lane_queue in streams.values():
+                    await asyncio.to_thread(self._ensure_group, lane_queue)
+                reply = await client.xreadgroup(
+                    self.stream_group, self.stream_consumer, dict.fromkeys(streams, ">"),
+                    count=self.batch_size, block=int(timeout * 1000)
+                )
+                for stream, entries in reply or []:
+                    lane_queue = streams[stream]
+                    self._stream_buffers[lane_queue].extend(self._parse_stream_reply(lane_queue, [(stream, entries)]))
+            elif self.use_redis and self.redis:
+                await self._get_async_redis().brpop(doorbell, timeout=max(1, math.ceil(timeout)))
+            else:
+                self._memory_loop = asyncio.get_running_loop()
+                await asyncio.wait_for(self.memory_queues[doorbell].get(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def dequeue_fair(self, queue_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Take the next job across the priority lanes without waiting
+
+        Smooth weighted round robin: every lane earns its weight in credit per
+        pick and the richest non-empty lane is served, so with the default
+        weights campus:team:pro:free get 8:6:4:1 of the throughput while all
+        are busy, and any lane alone gets all of it. Empty lanes do not bank
+        credit. Jobs on the un-laned queue are drained last.
+        """
+        credit = self._lane_credit[queue_name]
+        total = sum(self.lane_weights.values())
+        for lane, weight in self.lane_weights.items():
+            credit[lane] += weight
+        for lane in sorted(self.lane_weights, key=lambda name: credit[name], reverse=True):
+            lane_queue = self.lane_queue(queue_name, lane)
+            job_data = self.dequeue(lane_queue)
+            if job_data:
+                credit[lane] -= total
+                if "_enqueued_at" in job_data:
+                    self._record_wait(lane_queue, time.time() - job_data["_enqueued_at"])
+                return job_data
+            credit[lane] = 0
+        return self.dequeue(queue_name)
+
+    async def dequeue_fair_async(self, queue_name: str, timeout: int = 5) -> Optional[Dict[str, Any]]:
+        """Wait up to ``timeout`` seconds for the next job across the priority lanes
+
+        Each pass over the lanes is several Redis round trips, so it runs in a
+        thread; the in-memory queues are not thread-safe and stay on the loop.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.use_redis and self.redis:
+                job_data = await asyncio.to_thread(self.dequeue_fair, queue_name)
+            else:
+                job_data = self.dequeue_fair(queue_name)
+            if job_data:
+                return job_data
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            await self._wait_doorbell(queue_name, remaining)
+
+    def _record_wait(self, lane_queue: str, seconds: float):
+        self._wait_samples[lane_queue].append(seconds)
+        if self.use_redis and self.redis:
+            # Shared so the API process can report waits seen by the workers
+            try:
+                waits = self._keys(lane_queue)["waits"]
+                pipe = self.redis.pipeline()
+                pipe.lpush(waits, round(seconds, 4))
+                pipe.ltrim(waits, 0, 999)
+                pipe.execute()
+            except Exception as e:
+                logger.error(f"Failed to record queue wait: {e}")
+
+    def _lease_stream(self, queue_name: str, entry_id: str, fields: Dict[str, str]) -> Dict[str, Any]:
+        # The entry id is the receipt; the consumer group's pending list is the lease
+        job_data = json.loads(fields["data"])
+        job_data["_receipt"] = entry_id
+        self._inflight[entry_id] = (queue_name, fields["data"])
+        return job_data
+
+    def _lease_redis(self, queue_name: str, raw: str) -> Dict[str, Any]:
+        job_data = json.loads(raw)
+        # Jobs enqueued before reliable mode carry no receipt; the payload is unique enough
+        receipt = job_data.setdefault("_receipt", raw)
+        keys = self._keys(queue_name)
+        pipe = self.redis.pipeline()
+        pipe.zadd(keys["leases"], {receipt: time.time() + self.visibility_timeout})
+        pipe.hdel(keys["orphans"], receipt)
+        pipe.execute()
+        self._inflight[receipt] = (queue_name, raw)
+        return job_data
+
+    def _lease_memory(self, queue_name: str, job_data: Dict[str, Any]) -> Dict[str, Any]:
+        if self.reliable:
+            receipt = job_data.setdefault("_receipt", uuid.uuid4().hex)
+            with self._memory_lock:
+                self._memory_leases[receipt] = (queue_name, job_data, time.monotonic() + self.visibility_timeout)
+        return job_data
+
+    def extend_lease(self, job_data: Dict[str, Any]) -> bool:
+        """Heartbeat: push the lease deadline out; False if the lease was lost"""
+        receipt = job_data.get("_receipt")
+        if self.use_streams and receipt:
+            entry = self._inflight.get(receipt)
+            if not entry:
+                return False
+            try:
+                # False once another consumer has reclaimed the entry
+                return bool(self._stream_touch(entry[0], [receipt]))
+            except Exception as e:
+                logger.error(f"Failed to extend lease: {e}")
+                return False
+        if not self.reliable or not receipt:
+            return True
+        try:
+            if self.use_redis and self.redis:
+                entry = self._inflight.get(receipt)
+                if not entry:
+                    return False
+                # XX: never resurrect a lease the reaper already took back
+                self.redis.zadd(
+                    self._keys(entry[0])["leases"],
+                    {receipt: time.time() + self.visibility_timeout}, xx=True
+                )
+                return self.redis.zscore(self._keys(entry[0])["leases"], receipt) is not None
+            with self._memory_lock:
+                entry = self._memory_leases.get(receipt)
+                if not entry:
+                    return False
+                self._memory_leases[receipt] = (entry[0], entry[1], time.monotonic() + self.visibility_timeout)
+                return True
+        except Exception as e:
+            logger.error(f"Failed to extend lease: {e}")
+            return False
+
+    def _ack_commands(self, pipe, receipt: str, queue_name: str, raw: str):
+        """Queue the commands that retire a leased job on ``pipe``"""
+        keys = self._keys(queue_name)
+        if self.use_streams:
+            pipe.xack(keys["stream"], self.stream_group, receipt)
+            pipe.xdel(keys["stream"], receipt)
+            return
+        pipe.lrem(keys["processing"], 1, raw)
+        pipe.zrem(keys["leases"], receipt)
+        pipe.hdel(keys["orphans"], receipt)
+        pipe.hdel(keys["attempts"], receipt)
+
+    def ack(self, job_data: Dict[str, Any]) -> bool:
+        """Mark a dequeued job as done so it is never redelivered"""
+        receipt = job_data.get("_receipt")
+        if not receipt or not (self.reliable or self.use_streams):
+            return True
+        try:
+            if self.use_redis and self.redis:
+                entry = self._inflight.pop(receipt, None)
+                if not entry:
+                    return False
+                pipe = self.redis.pipeline()
+                self._ack_commands(pipe, receipt, *entry)
+                pipe.execute()
+                return True
+            with self._memory_lock:
+                return self._memory_leases.pop(receipt, None) is not None
+        except Exception as e:
+            logger.error(f"Failed to ack job: {e}")
+            return False
+
+    def requeue_expired(self, queue_name: str) -> Dict[str, Any]:
+        """
+        Reaper: put jobs whose lease expired back on the queue
+
+        Jobs redelivered ``max_deliveries`` times are moved to the dead-letter
+        list instead and returned so the caller can fail them. On the streams
+        backend expired entries are claimed by this consumer with XAUTOCLAIM.
+        """
+        if self.use_streams:
+            return self._stream_reclaim(queue_name)
+        if not self.reliable:
+            return {"requeued": 0, "dead": []}
+        try:
+            if self.use_redis and self.redis:
+                keys = self._keys(queue_name)
+                requeued, dead = self._reap(
+                    keys=[keys["queue"], keys["processing"], keys["leases"], keys["orphans"],
+                          keys["attempts"], keys["dead"]],
+                    args=[time.time(), self.visibility_timeout, self.max_deliveries]
+                )
+                return {"requeued": int(requeued), "dead": [json.loads(raw) for raw in dead]}
+
+            now = time.monotonic()
+            with self._memory_lock:
+                expired = [
+                    receipt for receipt, (name, _, deadline) in self._memory_leases.items()
+                    if name == queue_name and deadline <= now
+                ]
+                jobs = [self._memory_leases.pop(receipt)[1] for receipt in expired]
+            requeued, dead = 0, []
+            for job_data in jobs:
+                job_data["_deliveries"] = job_data.get("_deliveries", 0) + 1
+                if job_data["_deliveries"] >= self.max_deliveries:
+                    self.memory_dead[queue_name].append(job_data)
+                    dead.append(job_data)
+                else:
+                    self._memory_put(queue_name, job_data)
+                    requeued += 1
+            return {"requeued": requeued, "dead": dead}
+        except Exception as e:
+            logger.error(f"Failed to requeue expired jobs: {e}")
+            return {"requeued": 0, "dead": []}
+
+    def _stream_touch(self, queue_name: str, entry_ids: List[str]) -> List[str]:
+        """Reset the idle time of entries this consumer still owns; return those ids"""
+        if not entry_ids:
+            return []
+        stream = self._keys(queue_name)["stream"]
+        owned = {
+            item["message_id"] for item in self.redis.xpending_range(
+                stream, self.stream_group, min=min(entry_ids), max=max(entry_ids),
+                count=len(entry_ids) * 10, consumername=self.stream_consumer
+            )
+        }
+        ids = [entry_id for entry_id in entry_ids if entry_id in owned]
+        if ids:
+            # Claiming our own entries resets their idle time
+            self.redis.xclaim(stream, self.stream_group, self.stream_consumer,
+                              min_idle_time=0, message_ids=ids, justid=True)
+        return ids
+
+    def _stream_reclaim(self, queue_name: str) -> Dict[str, Any]:
+        try:
+            self._ensure_group(queue_name)
+            keys = self._keys(queue_name)
+            # Batched entries waiting in our buffer count as in progress
+            buffer = self._stream_buffers[queue_name]
+            owned = set(self._stream_touch(queue_name, [job["_receipt"] for job in buffer]))
+            for job_data in [job for job in buffer if job["_receipt"] not in owned]:
+                buffer.remove(job_data)
+                self._inflight.pop(job_data["_receipt"], None)
+
+            reply = self.redis.xautoclaim(
+                keys["stream"], self.stream_group, self.stream_consumer,
+                min_idle_time=int(self.visibility_timeout * 1000), start_id="0-0", count=self.batch_size
+            )
+            claimed = [(entry_id, fields) for entry_id, fields in reply[1] if fields]
+            if not claimed:
+                return {"requeued": 0, "dead": []}
+            entry_ids = [entry_id for entry_id, _ in claimed]
+            deliveries = {
+                item["message_id"]: item["times_delivered"] for item in self.redis.xpending_range(
+                    keys["stream"], self.stream_group, min=min(entry_ids), max=max(entry_ids),
+                    count=len(entry_ids) * 10, consumername=self.stream_consumer
+                )
+            }
+
+            requeued, dead = 0, []
+            for entry_id, fields in claimed:
+                job_data = self._lease_stream(queue_name, entry_id, fields)
+                # The claim itself counts as a delivery
+                if deliveries.get(entry_id, 0) > self.max_deliveries:
+                    self.ack(job_data)
+                    self.redis.lpush(keys["dead"], fields["data"])
+                    dead.append(job_data)
+                else:
+                    buffer.append(job_data)
+                    requeued += 1
+            return {"requeued": requeued, "dead": dead}
+        except Exception as e:
+            logger.error(f"Failed to reclaim expired stream entries: {e}")
+            return {"requeued": 0, "dead": []}
+
+    def defer(self, queue_name: str, job_data: Dict[str, Any], delay: float) -> bool:
+        """
+        Acknowledge a dequeued job and put it back on its lane after ``delay``
+
+        Used when a job cannot start yet (e.g. its account is at its
+        concurrency limit). Deferrals do not count as delivery attempts.
+        """
+        receipt = job_data.get("_receipt")
+        job_data = {**job_data, "_receipt": uuid.uuid4().hex,
+                    "_deferrals": job_data.get("_deferrals", 0) + 1}
+        lane = job_data.get("_lane")
+        try:
+            if self.use_redis and self.redis:
+                # Ack and deferral in one MULTI: a crash in between must not lose the job
+                entry = self._inflight.pop(receipt, None) if receipt else None
+                try:
+                    pipe = self.redis.pipeline(transaction=True)
+                    if entry:
+                        self._ack_commands(pipe, receipt, *entry)
+                    pipe.zadd(self._keys(queue_name)["delayed"], {json.dumps(job_data): time.time() + delay})
+                    pipe.execute()
+                except Exception:
+                    if entry:
+                        self._inflight[receipt] = entry
+                    raise
+                return True
+
+            self.ack({"_receipt": receipt})
+
+            def requeue():
+                if lane:
+                    self._memory_put(self.lane_queue(queue_name, lane), job_data)
+                    self._ring_doorbell(queue_name)
+                else:
+                    self._memory_put(queue_name, job_data)
+
+            timer = threading.Timer(delay, requeue)
+            timer.daemon = True
+            timer.start()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to defer job: {e}")
+            return False
+
+    def promote_delayed(self, queue_name: str) -> Optional[float]:
+        """Requeue deferred jobs that are due; returns when the next one is due"""
+        if not (self.use_redis and self.redis):
+            return None  # In memory, deferred jobs are requeued by timers
+        try:
+            keys = self._keys(queue_name)
+
+            def target(name):
+                return self._keys(name)["stream" if self.use_streams else "queue"]
+
+            lanes = list(self.lane_weights)
+            _, next_due = self._promote(
+                keys=[keys["delayed"], keys["doorbell"], target(queue_name)]
+                + [target(self.lane_queue(queue_name, lane)) for lane in lanes],
+                args=[time.time(), "streams" if self.use_streams else "list"] + lanes
+            )
+            return float(next_due) if next_due else None
+        except Exception as e:
+            logger.error(f"Failed to promote deferred jobs: {e}")
+            return None
+
+    def _get_async_redis(self):
+        loop = asyncio.get_running_loop()
+        if self._async_redis is None or self._async_loop is not loop:
+            # No socket_timeout: BRPOP holds the connection for its own timeout
+            self._async_redis = redis_asyncio.Redis.from_url(
+                self.redis_url, decode_responses=True, socket_connect_timeout=1
+            )
+            self._async_loop = loop
+        return self._async_redis
+
     def get_queue_length(self, queue_name: str) -> int:
         """Get queue length"""
         try:
+            if self.use_streams:
+                # Acked entries are deleted, so the stream holds queued + in-flight
+                return max(0, self.redis.xlen(self._keys(queue_name)["stream"]) - self.get_inflight_count(queue_name))
             if self.use_redis and self.redis:
-                return self.redis.llen(queue_name)
+                return self.redis.llen(self._key(queue_name))
             else:
-                return len(self.memory_queue)
+                return self.memory_queues[queue_name].qsize()
         except Exception as e:
             logger.error(f"Failed to get queue length: {e}")
             return 0
 
+    def get_inflight_count(self, queue_name: str) -> int:
+        """Jobs dequeued but not yet acknowledged"""
+        try:
+            if self.use_streams:
+                self._ensure_group(queue_name)
+                return self.redis.xpending(self._keys(queue_name)["stream"], self.stream_group)["pending"]
+            if self.use_redis and self.redis:
+                return self.redis.llen(self._keys(queue_name)["processing"])
+            return sum(1 for name, _, _ in self._memory_leases.values() if name == queue_name)
+        except Exception as e:
+            logger.error(f"Failed to get in-flight count: {e}")
+            return 0
+
+    def lane_stats(self, queue_name: str) -> Dict[str, Any]:
+        """Per-lane depth and recent queue wait percentiles"""
+        stats = {}
+        for lane, weight in self.lane_weights.items():
+            lane_queue = self.lane_queue(queue_name, lane)
+            samples = list(self._wait_samples[lane_queue])
+            if self.use_redis and self.redis:
+                try:
+                    samples = [float(value) for value in self.redis.lrange(self._keys(lane_queue)["waits"], 0, -1)]
+                except Exception as e:
+                    logger.error(f"Failed to read queue waits: {e}")
+            samples.sort()
+            stats[lane] = {
+                "weight": weight,
+                "pending": self.get_queue_length(lane_queue),
+                "in_flight": self.get_inflight_count(lane_queue),
+                "wait_samples": len(samples),
+                "wait_p50_ms": round(samples[len(samples) // 2] * 1000, 1) if samples else None,
+                "wait_p99_ms": round(samples[min(len(samples) - 1, len(samples) * 99 // 100)] * 1000, 1)
+                if samples else None,
+            }
+        return stats
+
+    def stats(self, queue_name: str) -> Dict[str, Any]:
+        """Counters for the metrics endpoint"""
+        dead = (self.redis.llen(self._keys(queue_name)["dead"]) if self.use_redis and self.redis
+                else len(self.memory_dead[queue_name]))
+        return {
+            "backend": ("redis-streams" if self.use_streams else "redis") if self.use_redis else "memory",
+            "reliable": self.reliable,
+            "visibility_timeout": self.visibility_timeout,
+            "pending": self.get_queue_length(queue_name),
+            "in_flight": self.get_inflight_count(queue_name),
+            "dead_lettered": dead,
+        }
+
 
 # Global instance
-queue_service = QueueService()
\ No newline at end of file
+queue_service = QueueService()
@@ -0,0 +1,126 @@
+# app/services/quota_service.py Execution quota counters
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+import logging
+
+from sqlalchemy import and_, func, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models.transpiler_job import TranspilerJob
+from ..models.usage_counter import UsageCounter
+
+logger = logging.getLogger(__name__)
+
+
+def quota_period(now: Optional[datetime] = None) -> Tuple[str, datetime, datetime]:
+    """Return the quota period containing ``now`` as (key, start, end), in UTC months"""
+    now = now or datetime.now(timezone.utc)
+    start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start.strftime("%Y-%m"), start, end
+
+
+class QuotaService:
+    """Per-user, per-period execution counters in ``usage_counters``.
+
+    Checks read one row by primary key instead of counting the month's jobs,
+    and ``consume`` increments with a conditional UPDATE, so concurrent
+    submits cannot overshoot the limit. The increment joins the caller's
+    transaction and commits together with the job row it pays for.
+    """
+
+    def __init__(self):
+        self.consumed = 0
+        self.rejected = 0
+        self.seeded = 0
+
+    @staticmethod
+    def _insert(db: Session):
+        return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+    @staticmethod
+    def _key(user_id: int, period: str):
+        return and_(UsageCounter.user_id == user_id, UsageCounter.period == period)
+
+    @staticmethod
+    def _count_jobs(start: datetime, end: datetime):
+        return select(TranspilerJob.user_id, func.count(TranspilerJob.id)).where(
+            TranspilerJob.submitted_at >= start,
+            TranspilerJob.submitted_at < end
+        )
+
+    def usage(self, db: Session, user_id: int, now: Optional[datetime] = None) -> int:
+        """Executions charged to a user this period.
+
+        Seeds the period's counter on first use; like ``consume`` it does not
+        commit, so the seed row joins the caller's transaction.
+        """
+        period, start, end = quota_period(now)
+        used = db.execute(select(UsageCounter.count).where(self._key(user_id, period))).scalar()
+        if used is not None:
+            return used
+
+        # First use this period: start from the jobs already submitted
+        jobs = db.execute(
+            self._count_jobs(start, end).where(TranspilerJob.user_id == user_id)
+            .group_by(TranspilerJob.user_id)
+        ).first()
+        db.execute(
+            self._insert(db)(UsageCounter)
+            .values(user_id=user_id, period=period, count=jobs[1] if jobs else 0)
+            .on_conflict_do_nothing(index_elements=["user_id", "period"])
+        )
+        self.seeded += 1
+        return db.execute(select(UsageCounter.count).where(self._key(user_id, period))).scalar()
+
+    def consume(self, db: Session, user_id: int, limit: int, amount: int = 1,
+                now: Optional[datetime] = None) -> Optional[int]:
+        """Charge ``amount`` executions if that stays within ``limit``.
+
+        Returns the new usage, or None when the quota is exhausted. Does not
+        commit: the charge is rolled back if the caller's transaction is.
+        """
+        period, _, _ = quota_period(now)
+        self.usage(db, user_id, now)
+        used = db.execute(
+            update(UsageCounter)
+            .where(self._key(user_id, period), UsageCounter.count + amount <= limit)
+            .values(count=UsageCounter.count + amount, updated_at=func.now())
+            .returning(UsageCounter.count)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        if used is None:
+            self.rejected += 1
+        else:
+            self.consumed += 1
+        return used
+
+    def reconcile(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Raise this period's counters to at least the number of jobs actually submitted.
+
+        Counters are never lowered: the job counts come from this statement's
+        snapshot, and a charge committed while it waits on a counter's row
+        lock would otherwise be overwritten. Every charge commits with its
+        job, so a counter only exceeds the jobs when jobs are deleted.
+        """
+        period, start, end = quota_period(now)
+        counts = self._count_jobs(start, end).add_columns(literal(period)).group_by(TranspilerJob.user_id)
+        stmt = self._insert(db)(UsageCounter).from_select(["user_id", "count", "period"], counts)
+        # GREATEST on Postgres; SQLite's two-argument max() is the same scalar function
+        greatest = func.greatest if db.get_bind().dialect.name == "postgresql" else func.max
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "period"],
+            set_={"count": greatest(UsageCounter.count, stmt.excluded.count), "updated_at": func.now()}
+        )
+        updated = db.execute(stmt).rowcount
+        db.commit()
+        logger.info(f"Reconciled {updated} usage counters for {period}")
+        return updated
+
+    def stats(self):
+        return {"consumed": self.consumed, "rejected": self.rejected, "seeded": self.seeded}
+
+
+# Global instance
+quota_service = QuotaService()
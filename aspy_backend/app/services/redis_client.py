@@ -0,0 +1,48 @@
+# app/services/redis_client.py Shared Redis connection
+import os
+import threading
+from typing import Optional
+import logging
+
+# Lazy import for redis to avoid syntax errors
+redis = None
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_checked = False
+_lock = threading.Lock()
+
+
+def get_redis():
+    """Return a connected Redis client, or None when Redis is unavailable.
+
+    The connection is attempted once per process; callers fall back to their
+    in-process implementation when this returns None.
+    """
+    global _client, _checked
+    if _checked:
+        return _client
+
+    with _lock:
+        if _checked:
+            return _client
+        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        try:
+            client = redis.Redis.from_url(redis_url, decode_responses=True, socket_connect_timeout=1)
+            client.ping()
+            _client = client
+        except Exception as e:
+            logger.warning(f"Redis not available: {e}")
+            _client = None
+        _checked = True
+        return _client
+
+
+def get_redis_url() -> Optional[str]:
+    """Redis URL for clients that need their own connection (async, pub/sub)"""
+    return os.getenv("REDIS_URL", "redis://localhost:6379/0") if get_redis() else None
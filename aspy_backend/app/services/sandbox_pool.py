@@ -0,0 +1,307 @@
+# app/services/sandbox_pool.py Warm sandbox pool
+import asyncio
+import os
+import queue
+import select
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+from . import sandbox_runner
+
+logger = logging.getLogger(__name__)
+
+RUNNER_PATH = sandbox_runner.__file__
+# Failed spawns are retried after SPAWN_BACKOFF seconds, doubling up to SPAWN_BACKOFF_MAX
+SPAWN_BACKOFF = 0.5
+SPAWN_BACKOFF_MAX = 30.0
+
+
+class SandboxError(Exception):
+    """A sandbox worker crashed or stopped answering"""
+
+
+class SandboxWorker:
+    """One warm runner process (see sandbox_runner) and its protocol pipes"""
+
+    def __init__(self, command: List[str], env: Dict[str, str]):
+        self.command = command
+        self.env = env
+        self.process: Optional[subprocess.Popen] = None
+        # Unbuffered view of the runner's stdout: with several frames in flight
+        # a buffered reader could hold one that select() would never report
+        self.replies = None
+        self.runs = 0
+
+    def start(self):
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            close_fds=True,
+            cwd="/",
+            env=self.env,
+        )
+        self.replies = open(self.process.stdout.fileno(), "rb", buffering=0, closefd=False)
+        hello = sandbox_runner.read_frame(self.replies)
+        if not hello or not hello.get("ready"):
+            self.kill()
+            raise SandboxError((hello or {}).get("error") or "Sandbox runner failed to start")
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def run(self, request: Dict[str, Any], timeout: float,
+            on_output: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+        """Send one job and wait for the runner's reply.
+
+        The runner enforces ``timeout`` itself; the extra grace period here
+        only catches a runner that has hung or died. With ``on_output`` the
+        program's output is passed on as ``on_output(stream, text)`` while it runs.
+        """
+        self.runs += 1
+        deadline = time.monotonic() + timeout + 5
+        try:
+            sandbox_runner.write_frame(self.process.stdin, {**request, "stream": on_output is not None})
+            while True:
+                ready, _, _ = select.select([self.replies], [], [], max(0, deadline - time.monotonic()))
+                if not ready:
+                    raise SandboxError("Sandbox runner did not reply")
+                reply = sandbox_runner.read_frame(self.replies)
+                if reply is None or "output" not in reply:
+                    break
+                try:
+                    on_output(reply["output"], reply["data"])
+                except Exception as e:
+                    # Keep reading: the runner's reply must still be collected
+                    logger.warning(f"Failed to pass on sandbox output: {e}")
+        except (OSError, ValueError) as e:
+            raise SandboxError(f"Sandbox runner failed: {e}")
+        if reply is None:
+            raise SandboxError("Sandbox runner exited")
+        return reply
+
+    def kill(self):
+        if self.process is None:
+            return
+        try:
+            self.process.kill()
+            self.process.wait(timeout=5)
+        except Exception:
+            pass
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+
+class SandboxPool:
+    """Pool of warm, resource-limited Python sandboxes.
+
+    Each worker keeps a pre-forked child ready, so a job pays for a pipe write
+    instead of interpreter startup. Workers are replaced after ``max_runs``
+    jobs or after any limit violation. ``isolation``, ``uid``/``gid`` and
+    ``wrapper`` choose how children are confined (see sandbox_runner).
+    """
+
+    def __init__(self, size: int, max_runs: int = 100, memory_mb: int = 256,
+                 max_output_bytes: int = 1024 * 1024, isolation: str = "namespaces",
+                 uid: int = 65534, gid: int = 65534, wrapper: Optional[str] = None):
+        self.size = size
+        self.max_runs = max_runs
+        self.memory_mb = memory_mb
+        self.max_output_bytes = max_output_bytes
+        self.isolation = isolation
+        # -s: no user site; -S: skip site-packages. Not -I, which would ignore
+        # PYTHONHASHSEED: the environment below is complete, so no other
+        # PYTHON* variable reaches the runner, and the runner drops its own
+        # directory from sys.path itself.
+        self.command = shlex.split(wrapper or "") + [sys.executable, "-s", "-S", RUNNER_PATH]
+        self.env = {
+            "PATH": "/usr/bin:/bin",
+            "LANG": "C.UTF-8",
+            # A fixed hash seed keeps set and dict-of-str iteration order the
+            # same across runs, so cached results match what a rerun prints
+            "PYTHONHASHSEED": "0",
+            "SANDBOX_ISOLATION": isolation,
+            "SANDBOX_UID": str(uid),
+            "SANDBOX_GID": str(gid),
+        }
+        self._idle: "queue.Queue[SandboxWorker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._live_lock = threading.Lock()
+        self._started = False
+        self._stopped = False
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.runs = 0
+        self.violations: Dict[str, int] = {}
+        self.recycled = 0
+        self.crashes = 0
+        # Workers running or booting; 0 means no request can be served
+        self.live = 0
+        self.spawn_failures = 0
+
+    def start(self):
+        """Spawn the workers; called on app startup and lazily on first use"""
+        with self._lock:
+            if self._started:
+                return
+            self._stopped = False
+            self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="sandbox")
+            # Runners boot in parallel so startup costs one interpreter launch
+            spawners = [threading.Thread(target=self._spawn) for _ in range(self.size)]
+            for spawner in spawners:
+                spawner.start()
+            for spawner in spawners:
+                spawner.join()
+            self._started = True
+            logger.info(f"Sandbox pool started with {self.size} workers ({self.isolation} isolation)")
+            if self.isolation == "none":
+                logger.warning("Sandbox children are not isolated by the kernel (SANDBOX_ISOLATION=none)")
+
+    def stop(self):
+        """Kill every worker"""
+        with self._lock:
+            self._stopped = True
+            self._started = False
+            while True:
+                try:
+                    self._idle.get_nowait().kill()
+                except queue.Empty:
+                    break
+                self._count(-1)
+            if self._executor:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _count(self, delta: int):
+        with self._live_lock:
+            self.live += delta
+
+    def _spawn(self, attempt: int = 0):
+        """Boot a worker into the idle queue; on failure retry with backoff so the pool never shrinks"""
+        if self._stopped:
+            return
+        self._count(1)
+        worker = SandboxWorker(self.command, self.env)
+        try:
+            worker.start()
+        except Exception as e:
+            self._count(-1)
+            self.spawn_failures += 1
+            delay = min(SPAWN_BACKOFF_MAX, SPAWN_BACKOFF * 2 ** attempt)
+            logger.error(f"Failed to start sandbox worker, retrying in {delay:.1f}s: {e}")
+            retry = threading.Timer(delay, self._spawn, args=(attempt + 1,))
+            retry.daemon = True
+            retry.start()
+            return
+        self._idle.put(worker)
+
+    def _replace(self, worker: SandboxWorker):
+        """Kill a worker and start its replacement off the request path"""
+        worker.kill()
+        self._count(-1)
+        self.recycled += 1
+        if not self._stopped:
+            threading.Thread(target=self._spawn, name="sandbox-respawn", daemon=True).start()
+
+    def _take(self, wait: float) -> SandboxWorker:
+        """An idle worker, waiting up to ``wait`` seconds while any is running or booting"""
+        deadline = time.monotonic() + wait
+        while True:
+            try:
+                return self._idle.get(timeout=min(0.5, max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                # With every worker dead and the rest waiting on a spawn backoff, fail fast
+                if self.live == 0 or time.monotonic() >= deadline:
+                    raise SandboxError("no sandbox worker available")
+
+    def run_sync(self, code: str, input_data: Optional[str], timeout: float,
+                 on_output: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+        """Execute ``code`` in a sandbox, blocking until it finishes.
+
+        ``on_output(stream, text)`` is called from this thread with output as it is printed.
+        """
+        if not self._started:
+            self.start()
+
+        worker = self._take(timeout + 5)
+        if not worker.alive:
+            self._replace(worker)
+            worker = self._take(timeout + 5)
+
+        request = {
+            "code": code,
+            "input": input_data or "",
+            "timeout": timeout,
+            "memory_bytes": self.memory_mb * 1024 * 1024,
+            "max_output_bytes": self.max_output_bytes,
+        }
+        try:
+            result = worker.run(request, timeout, on_output)
+        except SandboxError:
+            self.crashes += 1
+            self._replace(worker)
+            raise
+
+        self.runs += 1
+        violation = result.get("violation")
+        if violation:
+            self.violations[violation] = self.violations.get(violation, 0) + 1
+            if violation == "isolation":
+                logger.error(f"Sandbox child could not isolate itself: {result.get('stderr', '').strip()}")
+        if violation or worker.runs >= self.max_runs:
+            self._replace(worker)
+        else:
+            self._idle.put(worker)
+        return result
+
+    async def run(self, code: str, input_data: Optional[str], timeout: float,
+                  on_output: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+        """Execute ``code`` without blocking the event loop; ``on_output`` runs on a pool thread"""
+        loop = asyncio.get_running_loop()
+        if not self._started:
+            await loop.run_in_executor(None, self.start)
+        return await loop.run_in_executor(self._executor, self.run_sync, code, input_data, timeout, on_output)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the metrics endpoint"""
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "live": self.live,
+            "spawn_failures": self.spawn_failures,
+            "max_runs": self.max_runs,
+            "memory_mb": self.memory_mb,
+            "isolation": self.isolation,
+            "runs": self.runs,
+            "recycled": self.recycled,
+            "crashes": self.crashes,
+            "violations": dict(self.violations),
+        }
+
+
+# Fork, rlimits and seccomp are POSIX-only; elsewhere execution stays simulated
+sandbox_supported = os.name == "posix" and sandbox_runner.resource is not None
+# Off unless asked for: runs real programs, so deploy with SANDBOX_ISOLATION in mind
+sandbox_enabled = sandbox_supported and os.getenv("SANDBOX_ENABLED", "false").lower() == "true"
+
+# Global instance
+sandbox_pool = SandboxPool(
+    size=int(os.getenv("SANDBOX_POOL_SIZE", str(os.cpu_count() or 2))),
+    max_runs=int(os.getenv("SANDBOX_MAX_RUNS", "100")),
+    memory_mb=int(os.getenv("SANDBOX_MEMORY_MB", "256")),
+    max_output_bytes=int(os.getenv("SANDBOX_MAX_OUTPUT_BYTES", str(1024 * 1024))),
+    isolation=os.getenv("SANDBOX_ISOLATION", "namespaces"),
+    uid=int(os.getenv("SANDBOX_UID", "65534")),
+    gid=int(os.getenv("SANDBOX_GID", "65534")),
+    wrapper=os.getenv("SANDBOX_WRAPPER")
+)
@@ -0,0 +1,501 @@
+# app/services/sandbox_runner.py Warm sandbox process
+"""
+Sandbox runner started by SandboxPool with a bare interpreter (``-s -S``) and
+kept warm between jobs. The runner never executes user code itself: it keeps a
+pre-forked child waiting on a pipe, hands it the next job, and forks a fresh
+spare afterwards. Each child exits after one program, so nothing one
+submission does can be observed by the next.
+
+Confinement is the kernel's job. Before it is handed a job, every child
+isolates itself (SANDBOX_ISOLATION):
+
+  namespaces  the runner runs as root; the child moves to new network, IPC and
+              UTS namespaces (no network at all) and drops to SANDBOX_UID/GID
+  wrapper     the runner was started under SANDBOX_WRAPPER (nsjail, bwrap, ...),
+              which provides the namespaces and unprivileged user
+  none        development only: nothing beyond the steps below
+
+then allows itself no new processes or threads (RLIMIT_NPROC 0) and installs
+a seccomp filter refusing process creation, exec, sockets, signals to other
+processes, ptrace and namespace/mount/module syscalls. The audit hook on top
+only produces readable errors for what a student program is not allowed to
+do; its state is immutable and out of the program's reach, but it is not
+what keeps the program contained.
+
+This module only uses the standard library; the API process imports it for the
+frame helpers.
+
+Frames: 4-byte big-endian length followed by UTF-8 JSON. A request with
+``stream`` set is answered with ``{"output": "stdout"|"stderr", "data": ...}``
+frames while the program runs, then the usual result frame.
+"""
+import codecs
+import io
+import json
+import os
+import platform
+import select
+import signal
+import struct
+import sys
+import time
+import types
+
+try:
+    import ctypes
+    import resource
+except ImportError:  # Not available on Windows; SandboxPool is disabled there
+    ctypes = resource = None
+
+HEADER = struct.Struct(">I")
+
+# Streamed output is batched into one frame per interval (seconds) or per this many bytes
+STREAM_INTERVAL = 0.1
+STREAM_CHUNK_BYTES = 16 * 1024
+TRUNCATION_MARKER = "\n[output truncated: limit of {limit} bytes reached]\n"
+
+# Audit events a submitted program may never trigger. Frame, code and gc
+# introspection are refused so the program cannot reach the runner's state.
+BLOCKED_EVENTS = frozenset({
+    "subprocess.Popen", "os.system", "os.exec", "os.posix_spawn", "os.spawn",
+    "os.fork", "os.forkpty", "os.kill", "os.killpg", "os.remove", "os.rename",
+    "os.rmdir", "os.mkdir", "os.chmod", "os.chown", "os.symlink", "os.link",
+    "os.truncate", "os.utime", "os.putenv", "os.unsetenv", "os.chdir",
+    "shutil.rmtree", "resource.setrlimit", "resource.prlimit", "sys.setprofile",
+    "sys.settrace", "sys._getframe", "sys._current_frames", "sys._current_exceptions",
+    "object.__getattr__", "gc.get_objects", "gc.get_referrers", "gc.get_referents",
+})
+BLOCKED_MODULES = frozenset({
+    "ctypes", "_ctypes", "socket", "_socket", "ssl", "_ssl", "subprocess",
+    "_posixsubprocess", "multiprocessing", "_multiprocessing", "pty", "fcntl", "gc",
+})
+_WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_APPEND | os.O_TRUNC
+_READ_ROOTS = tuple(
+    os.path.realpath(prefix) + os.sep
+    for prefix in {sys.prefix, sys.base_prefix, sys.exec_prefix, sys.base_exec_prefix}
+)
+
+# Imported by the runner before forking: children start with them loaded, and
+# they stay importable where the unprivileged user cannot read the interpreter's files
+PRELOADED_MODULES = (
+    "math", "cmath", "random", "string", "re", "itertools", "functools", "operator",
+    "collections", "heapq", "bisect", "array", "copy", "fractions", "decimal",
+    "statistics", "textwrap", "enum", "dataclasses", "typing", "datetime", "time",
+)
+
+ISOLATION_FAILED = "Sandbox isolation failed"
+_CLONE_NEWUTS = 0x04000000
+_CLONE_NEWIPC = 0x08000000
+_CLONE_NEWNET = 0x40000000
+
+# Syscalls refused with EPERM by the seccomp filter: (audit arch, numbers) per machine
+_SECCOMP_SYSCALLS = {
+    "x86_64": (0xC000003E, {
+        "socket": 41, "connect": 42, "accept": 43, "sendto": 44, "bind": 49, "listen": 50,
+        "socketpair": 53, "clone": 56, "fork": 57, "vfork": 58, "execve": 59, "kill": 62,
+        "ptrace": 101, "rt_sigqueueinfo": 129, "personality": 135, "pivot_root": 155,
+        "chroot": 161, "mount": 165, "umount2": 166, "reboot": 169, "init_module": 175,
+        "delete_module": 176, "tkill": 200, "tgkill": 234, "kexec_load": 246, "add_key": 248,
+        "request_key": 249, "keyctl": 250, "unshare": 272, "accept4": 288,
+        "rt_tgsigqueueinfo": 297, "perf_event_open": 298, "name_to_handle_at": 303,
+        "open_by_handle_at": 304, "setns": 308, "process_vm_readv": 310,
+        "process_vm_writev": 311, "finit_module": 313, "bpf": 321, "execveat": 322,
+        "userfaultfd": 323, "pidfd_send_signal": 424, "io_uring_setup": 425,
+        "pidfd_open": 434, "clone3": 435,
+    }),
+    "aarch64": (0xC00000B7, {
+        "umount2": 39, "mount": 40, "pivot_root": 41, "chroot": 51, "personality": 92,
+        "unshare": 97, "kexec_load": 104, "init_module": 105, "delete_module": 106,
+        "ptrace": 117, "kill": 129, "tkill": 130, "tgkill": 131, "rt_sigqueueinfo": 138,
+        "reboot": 142, "socket": 198, "socketpair": 199, "bind": 200, "listen": 201,
+        "accept": 202, "connect": 203, "sendto": 206, "add_key": 217, "request_key": 218,
+        "keyctl": 219, "clone": 220, "execve": 221, "rt_tgsigqueueinfo": 240,
+        "perf_event_open": 241, "accept4": 242, "name_to_handle_at": 264,
+        "open_by_handle_at": 265, "setns": 268, "process_vm_readv": 270,
+        "process_vm_writev": 271, "finit_module": 273, "bpf": 280, "execveat": 281,
+        "userfaultfd": 282, "pidfd_send_signal": 424, "io_uring_setup": 425,
+        "pidfd_open": 434, "clone3": 435,
+    }),
+}
+
+
+def read_frame(stream):
+    """Read one frame from a binary stream; None on EOF"""
+    header = _read_exact(stream, HEADER.size)
+    if header is None:
+        return None
+    (length,) = HEADER.unpack(header)
+    body = _read_exact(stream, length)
+    if body is None:
+        return None
+    return json.loads(body.decode("utf-8"))
+
+
+def write_frame(stream, payload):
+    """Write one frame to a binary stream"""
+    body = json.dumps(payload).encode("utf-8")
+    stream.write(HEADER.pack(len(body)) + body)
+    stream.flush()
+
+
+def _read_exact(stream, size):
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = stream.read(remaining)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def _make_audit_hook(blocked_events, blocked_modules, read_roots):
+    """Audit hook over immutable policy; nothing the program can reach refers to it"""
+    def allowed_open(path, mode, flags):
+        # Programs may only read the standard library (needed for imports)
+        if isinstance(path, int):
+            return False
+        if mode is not None:
+            if any(char in mode for char in "wax+"):
+                return False
+        elif flags & _WRITE_FLAGS:
+            return False
+        try:
+            real_path = os.path.realpath(os.fsdecode(path))
+        except Exception:
+            return False
+        return real_path.startswith(read_roots)
+
+    def audit(event, args):
+        if event == "open":
+            if not allowed_open(*args):
+                raise PermissionError(f"File access is not permitted in the sandbox: {args[0]!r}")
+        elif event == "import":
+            if args[0].split(".")[0] in blocked_modules:
+                raise ImportError(f"Module '{args[0]}' is not available in the sandbox")
+        elif event in blocked_events or event.startswith(("socket.", "ctypes.")):
+            raise PermissionError(f"Operation not permitted in the sandbox: {event}")
+
+    return audit
+
+
+def _seccomp_program():
+    """BPF program for the seccomp filter, or None on an unsupported machine"""
+    arch = _SECCOMP_SYSCALLS.get(platform.machine())
+    if arch is None:
+        return None
+    audit_arch, numbers = arch
+    load, jeq, jge, ret = 0x20, 0x15, 0x35, 0x06
+    refuse = 0x00050000 | 1  # SECCOMP_RET_ERRNO | EPERM
+    instructions = [
+        (load, 0, 0, 4),  # seccomp_data.arch
+        (jeq, 1, 0, audit_arch),
+        (ret, 0, 0, 0x80000000),  # SECCOMP_RET_KILL_PROCESS
+        (load, 0, 0, 0),  # seccomp_data.nr
+        # x32 syscall numbers would slip past the checks below
+        (jge, 0, 1, 0x40000000),
+        (ret, 0, 0, refuse),
+    ]
+    for number in sorted(numbers.values()):
+        instructions += [(jeq, 0, 1, number), (ret, 0, 0, refuse)]
+    instructions.append((ret, 0, 0, 0x7FFF0000))  # SECCOMP_RET_ALLOW
+    return b"".join(struct.pack("HBBI", *instruction) for instruction in instructions)
+
+
+def _isolate():
+    """Confine the calling child as SANDBOX_ISOLATION asks; raises if it cannot"""
+    mode = os.environ.get("SANDBOX_ISOLATION", "namespaces")
+    libc = ctypes.CDLL(None, use_errno=True)
+    if mode == "namespaces":
+        if libc.unshare(_CLONE_NEWNET | _CLONE_NEWIPC | _CLONE_NEWUTS) != 0:
+            raise OSError(ctypes.get_errno(), "unshare failed; SANDBOX_ISOLATION=namespaces needs root")
+        os.setgroups([])
+        os.setgid(int(os.environ.get("SANDBOX_GID", "65534")))
+        os.setuid(int(os.environ.get("SANDBOX_UID", "65534")))
+    elif mode == "wrapper":
+        if os.geteuid() == 0:
+            raise PermissionError("SANDBOX_WRAPPER left the runner as root")
+    elif mode != "none":
+        raise ValueError(f"Unknown SANDBOX_ISOLATION: {mode}")
+
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+    program = _seccomp_program()
+    if program is None:
+        if mode != "none":
+            raise OSError(f"No seccomp filter for {platform.machine()}")
+        return
+
+    class SockFprog(ctypes.Structure):
+        _fields_ = [("len", ctypes.c_ushort), ("filter", ctypes.c_char_p)]
+
+    fprog = SockFprog(len(program) // 8, program)
+    # PR_SET_NO_NEW_PRIVS, then PR_SET_SECCOMP with SECCOMP_MODE_FILTER
+    if libc.prctl(38, 1, 0, 0, 0) != 0 or libc.prctl(22, 2, ctypes.byref(fprog), 0, 0) != 0:
+        raise OSError(ctypes.get_errno(), "installing the seccomp filter failed")
+
+
+def _run_child(request_fd, stdout_fd, stderr_fd):
+    """Body of a pre-forked child: isolate, wait for one job, run it, exit"""
+    os.dup2(stderr_fd, 2)
+    try:
+        _isolate()
+    except Exception as e:
+        os.write(2, f"{ISOLATION_FAILED}: {e}\n".encode())
+        os._exit(70)
+
+    request = read_frame(os.fdopen(request_fd, "rb", buffering=0))
+    if request is None:
+        os._exit(0)
+    # Forked children would otherwise share the runner's random state
+    sys.modules["random"].seed()
+
+    # Per-run limits. CPU time is cumulative for the process, so the budget
+    # is added to what the warm child has already consumed.
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_limit = int(usage.ru_utime + usage.ru_stime) + max(1, int(request["timeout"]))
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit + 1))
+    if request.get("memory_bytes"):
+        resource.setrlimit(resource.RLIMIT_AS, (request["memory_bytes"], request["memory_bytes"]))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(stdout_fd, 1)
+    sys.stdin = io.StringIO(request.get("input") or "")
+    # Streamed runs flush every line so progress output shows up as it is printed
+    buffering = 1 if request.get("stream") else -1
+    sys.stdout = open(1, "w", buffering, encoding="utf-8", errors="replace", closefd=False)
+    sys.stderr = open(2, "w", buffering, encoding="utf-8", errors="replace", closefd=False)
+
+    # The program gets its own __main__; the runner module and ctypes are not
+    # left where it could look them up
+    program = types.ModuleType("__main__")
+    sys.modules["__main__"] = program
+    for name in [name for name in sys.modules if name.split(".")[0] in ("ctypes", "_ctypes")]:
+        del sys.modules[name]
+    # The C hook prints tracebacks without the (refused) frame introspection
+    print_exception = sys.__excepthook__
+    code = request["code"]
+    del request
+
+    sys.addaudithook(_make_audit_hook(BLOCKED_EVENTS, BLOCKED_MODULES, _READ_ROOTS))
+
+    exit_code = 0
+    try:
+        exec(compile(code, "<program>", "exec"), program.__dict__)
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            exit_code = e.code
+        elif e.code is not None:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException as e:
+        # Drop the runner's own frame so the traceback starts at the program
+        print_exception(type(e), e, e.with_traceback(e.__traceback__.tb_next).__traceback__)
+        exit_code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            pass
+    os._exit(exit_code)
+
+
+def _fork_child():
+    """Fork a child that blocks until it is handed a job"""
+    request_r, request_w = os.pipe()
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(request_w)
+            os.close(stdout_r)
+            os.close(stderr_r)
+            _run_child(request_r, stdout_w, stderr_w)
+        finally:
+            os._exit(70)
+    os.close(request_r)
+    os.close(stdout_w)
+    os.close(stderr_w)
+    return pid, request_w, stdout_r, stderr_r
+
+
+def _describe_exit(status, timed_out, output_exceeded, stderr):
+    """Map a wait status to (exit_code, violation)"""
+    if os.WIFSIGNALED(status):
+        sig = os.WTERMSIG(status)
+        if output_exceeded:
+            violation = "output_limit"
+        elif timed_out:
+            violation = "timeout"
+        elif sig == signal.SIGXCPU:
+            violation = "cpu_limit"
+        elif sig == signal.SIGXFSZ:
+            violation = "file_size_limit"
+        else:
+            violation = f"signal_{sig}"
+        return -sig, violation
+
+    exit_code = os.WEXITSTATUS(status)
+    if exit_code == 70 and stderr.startswith(ISOLATION_FAILED):
+        return exit_code, "isolation"
+    if exit_code and stderr.rstrip().endswith("MemoryError"):
+        return exit_code, "memory_limit"
+    return exit_code, None
+
+
+def run_job(child, request, on_output=None):
+    """Hand a job to the pre-forked child and collect its output.
+
+    Output past ``max_output_bytes`` (stdout and stderr together) is dropped,
+    the program is killed and a truncation marker is appended to stdout. With
+    ``on_output``, output is also passed on as ``on_output(stream, text)``
+    every STREAM_INTERVAL while the program runs.
+    """
+    pid, request_w, stdout_r, stderr_r = child
+    started = time.monotonic()
+    deadline = started + float(request["timeout"])
+    max_output = int(request.get("max_output_bytes") or 1024 * 1024)
+
+    try:
+        with os.fdopen(request_w, "wb") as stream:
+            write_frame(stream, request)
+    except BrokenPipeError:
+        pass  # The child died before the job; its exit status says why
+
+    names = {stdout_r: "stdout", stderr_r: "stderr"}
+    buffers = {stdout_r: bytearray(), stderr_r: bytearray()}
+    # Pending streamed bytes; incremental decoders keep split UTF-8 sequences intact
+    pending = {stdout_r: bytearray(), stderr_r: bytearray()}
+    decoders = {fd: codecs.getincrementaldecoder("utf-8")(errors="replace") for fd in buffers}
+    last_flush = started
+    kept = 0
+
+    def flush(final=False):
+        for fd, data in pending.items():
+            text = decoders[fd].decode(bytes(data), final=final)
+            data.clear()
+            if text:
+                on_output(names[fd], text)
+
+    open_fds = [stdout_r, stderr_r]
+    timed_out = output_exceeded = False
+    while open_fds:
+        now = time.monotonic()
+        remaining = deadline - now
+        if remaining <= 0:
+            timed_out = True
+            break
+        if on_output and any(pending.values()):
+            remaining = max(0, min(remaining, last_flush + STREAM_INTERVAL - now))
+        readable, _, _ = select.select(open_fds, [], [], remaining)
+        for fd in readable:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                open_fds.remove(fd)
+                continue
+            if kept + len(chunk) > max_output:
+                chunk = chunk[:max_output - kept]
+                output_exceeded = True
+            kept += len(chunk)
+            buffers[fd] += chunk
+            if on_output:
+                pending[fd] += chunk
+        if output_exceeded:
+            break
+        if on_output and any(pending.values()) and (
+                time.monotonic() - last_flush >= STREAM_INTERVAL
+                or sum(len(data) for data in pending.values()) >= STREAM_CHUNK_BYTES):
+            flush()
+            last_flush = time.monotonic()
+
+    if open_fds:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    _, status = os.waitpid(pid, 0)
+    os.close(stdout_r)
+    os.close(stderr_r)
+
+    stdout = bytes(buffers[stdout_r]).decode("utf-8", errors="replace")
+    stderr = bytes(buffers[stderr_r]).decode("utf-8", errors="replace")
+    if output_exceeded:
+        stdout += TRUNCATION_MARKER.format(limit=max_output)
+    if on_output:
+        flush(final=True)
+        if output_exceeded:
+            on_output("stdout", TRUNCATION_MARKER.format(limit=max_output))
+    exit_code, violation = _describe_exit(status, timed_out, output_exceeded, stderr)
+    return {
+        "stdout": stdout,
+        "stderr": stderr,
+        "exit_code": exit_code,
+        "violation": violation,
+        "duration_ms": int((time.monotonic() - started) * 1000),
+    }
+
+
+def _check_isolation():
+    """Isolate a throwaway child; returns why that failed, or None"""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_fd)
+            _isolate()
+            os._exit(0)
+        except BaseException as e:
+            os.write(write_fd, str(e).encode())
+        finally:
+            os._exit(70)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as stream:
+        error = stream.read().decode(errors="replace")
+    _, status = os.waitpid(pid, 0)
+    if os.WIFSIGNALED(status) or os.WEXITSTATUS(status):
+        return error or f"isolated child exited with status {status}"
+    return None
+
+
+def main():
+    # Submitted programs must not import the API's modules next to this file
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path[:] = [path for path in sys.path if os.path.abspath(path or ".") != here]
+    protocol_in = sys.stdin.buffer
+    protocol_out = sys.stdout.buffer
+    for name in PRELOADED_MODULES:
+        __import__(name)
+    # A runner that cannot confine programs never reports ready
+    error = _check_isolation()
+    if error:
+        write_frame(protocol_out, {"ready": False, "error": f"{ISOLATION_FAILED}: {error}"})
+        return
+    child = _fork_child()
+    write_frame(protocol_out, {"ready": True, "pid": os.getpid()})
+
+    while True:
+        request = read_frame(protocol_in)
+        if request is None:
+            break
+        on_output = None
+        if request.get("stream"):
+            def on_output(stream, text):
+                write_frame(protocol_out, {"output": stream, "data": text})
+        write_frame(protocol_out, run_job(child, request, on_output))
+        # Fork the next spare after replying so it stays off the critical path
+        child = _fork_child()
+
+    pid, request_w, stdout_r, stderr_r = child
+    for fd in (request_w, stdout_r, stderr_r):
+        os.close(fd)
+    os.waitpid(pid, 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+# app/services/transpiler_engine.py Table-driven transpiler engine
+import re
+import unicodedata
+from typing import Dict, List
+
+TRANSPILER_VERSION = "1.0.0"
+
+# Characters that can appear inside an identifier in any supported script:
+# ASCII/Latin letters, Devanagari (Bodo), Bengali-Assamese (Assamese, Bengali,
+# Manipuri) and Meetei Mayek. Combining marks such as virama are included so
+# a keyword never matches inside a longer word.
+IDENTIFIER_CHARS = "0-9A-Za-z_À-ɏऀ-ॿঀ-৿ꯀ-꯿"
+
+# String literals (triple-quoted first) and comments are copied verbatim.
+_LITERAL_RE = re.compile(
+    r'("""(?:[^"\\]|\\.|"(?!""))*"""'
+    r"|'''(?:[^'\\]|\\.|'(?!''))*'''"
+    r'|"[^"\\\n]*(?:\\.[^"\\\n]*)*"'
+    r"|'[^'\\\n]*(?:\\.[^'\\\n]*)*'"
+    r"|#[^\n]*)"
+)
+_IDENTIFIER_RE = re.compile("[%s]+" % IDENTIFIER_CHARS)
+_IDENTIFIER_CHAR_SET = frozenset(
+    chr(cp)
+    for first, last in re.findall("(.)-(.)", IDENTIFIER_CHARS)
+    for cp in range(ord(first), ord(last) + 1)
+) | {"_"}
+
+# Names whose results differ between runs of the same program: randomness and
+# clock modules, OS entropy, object addresses, and the ways a module can be
+# reached without naming it. A program that mentions any of them is never
+# served from the execution cache. (hash() is listed too although the sandbox
+# pins PYTHONHASHSEED, so that cached results do not depend on that setting.)
+NONDETERMINISTIC_NAMES = (
+    "random", "secrets", "time", "datetime", "uuid", "urandom", "hash", "id",
+    "__import__", "importlib", "__builtins__", "eval", "exec", "compile",
+    "getattr", "globals", "vars", "sys", "os",
+)
+_NONDETERMINISTIC_RE = re.compile(
+    "(?<![%s])(?:%s)(?![%s])" % (IDENTIFIER_CHARS, "|".join(NONDETERMINISTIC_NAMES), IDENTIFIER_CHARS)
+)
+# Only programs importing nothing but these are cached
+DETERMINISTIC_MODULES = frozenset({
+    "math", "cmath", "string", "re", "json", "itertools", "functools", "operator",
+    "collections", "heapq", "bisect", "array", "copy", "fractions", "decimal",
+    "statistics", "textwrap", "enum", "dataclasses", "typing", "abc",
+})
+_IMPORT_RE = re.compile(r"^[ \t]*(?:from[ \t]+([\w.]+)[ \t]+import\b|import[ \t]+([^\n;#]+))", re.MULTILINE)
+
+# Precomposed letters excluded from Unicode composition, so the same word can
+# reach us in two spellings depending on the keyboard that typed it.
+_COMPOSITION_EXCLUSIONS = {
+    unicodedata.normalize("NFD", chr(cp)): chr(cp)
+    for cp in list(range(0x0958, 0x0960)) + [0x09DC, 0x09DD, 0x09DF]
+}
+
+# Per-language keyword and builtin tables: native spelling -> Python name.
+LANGUAGE_TABLES: Dict[str, Dict[str, Dict[str, str]]] = {
+    "assamese": {
+        "keywords": {
+            "যদি": "if",
+            "নহলেযদি": "elif",
+            "নহলে": "else",
+            "প্ৰতিটো": "for",
+            "যেতিয়ালৈকে": "while",
+            "ভিতৰত": "in",
+            "কাৰ্য": "def",
+            "ঘূৰাই_দিয়া": "return",
+            "সঁচা": "True",
+            "মিছা": "False",
+            "একোনাই": "None",
+            "আৰু": "and",
+            "অথবা": "or",
+            "নহয়": "not",
+            "ৰখা": "break",
+            "আগবাঢ়া": "continue",
+            "এৰি_দিয়া": "pass",
+            "শ্ৰেণী": "class",
+            "আমদানি": "import",
+            "পৰা": "from",
+        },
+        "builtins": {
+            "প্ৰিন্ট": "print",
+            "দেখুৱাও": "print",
+            "ইনপুট": "input",
+            "পৰিসৰ": "range",
+            "দৈৰ্ঘ্য": "len",
+            "পূৰ্ণসংখ্যা": "int",
+            "দশমিক": "float",
+            "পাঠ": "str",
+            "তালিকা": "list",
+            "অভিধান": "dict",
+        },
+    },
+    "bengali": {
+        "keywords": {
+            "যদি": "if",
+            "নাহলেযদি": "elif",
+            "নাহলে": "else",
+            "প্রতিটি": "for",
+            "যতক্ষণ": "while",
+            "মধ্যে": "in",
+            "ফাংশন": "def",
+            "ফেরত": "return",
+            "সত্য": "True",
+            "মিথ্যা": "False",
+            "কিছুনা": "None",
+            "এবং": "and",
+            "অথবা": "or",
+            "নয়": "not",
+            "থামো": "break",
+            "চালিয়ে_যাও": "continue",
+            "পাস": "pass",
+            "শ্রেণী": "class",
+            "আমদানি": "import",
+            "থেকে": "from",
+        },
+        "builtins": {
+            "প্রিন্ট": "print",
+            "দেখাও": "print",
+            "ইনপুট": "input",
+            "পরিসর": "range",
+            "দৈর্ঘ্য": "len",
+            "পূর্ণসংখ্যা": "int",
+            "দশমিক": "float",
+            "লেখা": "str",
+            "তালিকা": "list",
+            "অভিধান": "dict",
+        },
+    },
+    "bodo": {
+        "keywords": {
+            "जुदि": "if",
+            "एबा_जुदि": "elif",
+            "नाथाय": "else",
+            "फर": "for",
+            "ह्वाइल": "while",
+            "इन": "in",
+            "फांसन": "def",
+            "रिटार्न": "return",
+            "थार": "True",
+            "थारनङा": "False",
+            "नान": "None",
+            "आरो": "and",
+            "एबा": "or",
+            "नट": "not",
+            "ब्रेक": "break",
+            "कन्टिन्यु": "continue",
+            "पास": "pass",
+            "क्लास": "class",
+            "इम्पर्ट": "import",
+            "फ्रम": "from",
+        },
+        "builtins": {
+            "प्रिन्ट": "print",
+            "दिन्थि": "print",
+            "इनपुट": "input",
+            "रेन्ज": "range",
+            "लेन": "len",
+        },
+    },
+    "manipuri": {
+        "keywords": {
+            "করিগুম্বা": "if",
+            "নত্রগা_করিগুম্বা": "elif",
+            "নত্রগা": "else",
+            "ফর": "for",
+            "ৱাইল": "while",
+            "ইন": "in",
+            "ফঙ্কশন": "def",
+            "রিটর্ন": "return",
+            "অচুম্বা": "True",
+            "অরানবা": "False",
+            "নন": "None",
+            "অমসুং": "and",
+            "ওর": "or",
+            "নট": "not",
+            "ব্রেক": "break",
+            "কন্টিনিউ": "continue",
+            "পাস": "pass",
+            "ক্লাস": "class",
+            "ইম্পোর্ট": "import",
+            "ফ্রম": "from",
+        },
+        "builtins": {
+            "প্রিন্ট": "print",
+            "ইনপুট": "input",
+            "রেঞ্জ": "range",
+            "লেন": "len",
+        },
+    },
+    "khasi": {
+        "keywords": {
+            "lada": "if",
+            "lymda": "else",
+            "haba": "while",
+            "shisha": "True",
+            "bymshisha": "False",
+        },
+        "builtins": {
+            "pynpaw": "print",
+            "kylli": "input",
+        },
+    },
+    "garo": {
+        "keywords": {
+            "aro": "and",
+        },
+        "builtins": {
+            "nikatbo": "print",
+        },
+    },
+    "mizo": {
+        "keywords": {
+            "dik": "True",
+            "diklo": "False",
+            "leh": "and",
+            "emaw": "or",
+        },
+        "builtins": {
+            "tilang": "print",
+            "zawt": "input",
+        },
+    },
+}
+
+
+def _spellings(word: str) -> List[str]:
+    """Return the encodings of ``word`` a user may type"""
+    nfc = unicodedata.normalize("NFC", word)
+    composed = nfc
+    for decomposed, precomposed in _COMPOSITION_EXCLUSIONS.items():
+        composed = composed.replace(decomposed, precomposed)
+    return list(dict.fromkeys([word, nfc, composed]))
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """Build a regex from a character trie so alternatives share prefixes"""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        terminal = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not terminal:
+            return branches[0]
+        pattern = "(?:" + "|".join(branches) + ")"
+        return pattern + "?" if terminal else pattern
+
+    return build(trie)
+
+
+class KeywordTranspiler:
+    """Single-pass keyword translator for one language.
+
+    The keyword table is compiled once into a trie-shaped regex, so each
+    position of the source is examined a bounded number of times no matter
+    how many keywords the language defines.
+    """
+
+    def __init__(self, language: str, keywords: Dict[str, str], builtins: Dict[str, str]):
+        self.language = language
+        self.table: Dict[str, str] = {}
+        for source in (keywords, builtins):
+            for native, python_name in source.items():
+                if not _IDENTIFIER_RE.fullmatch(native):
+                    raise ValueError(f"Invalid {language} keyword: {native!r}")
+                for spelling in _spellings(native):
+                    self.table[spelling] = python_name
+
+        # Longest-match is implicit in the trie; the lookahead rejects matches
+        # that run into a longer identifier (e.g. a variable named ``যদিও``).
+        self._keyword_re = re.compile(
+            "(%s)(?![%s])" % (_trie_pattern(list(self.table)), IDENTIFIER_CHARS)
+        )
+
+    def _translate_segment(self, segment: str) -> str:
+        parts = self._keyword_re.split(segment)
+        if len(parts) == 1:
+            return segment
+        # parts alternates plain text and matched keywords. A keyword preceded
+        # by an identifier character is the tail of a longer name; keep it.
+        for i in range(1, len(parts), 2):
+            before = parts[i - 1]
+            if before and before[-1] in _IDENTIFIER_CHAR_SET:
+                continue
+            parts[i] = self.table[parts[i]]
+        return "".join(parts)
+
+    def transpile(self, code: str) -> str:
+        """Translate keywords outside string literals and comments"""
+        segments = _LITERAL_RE.split(code)
+        # Even indices are code, odd indices are literals/comments
+        segments[0::2] = map(self._translate_segment, segments[0::2])
+        return "".join(segments)
+
+
+def uses_nondeterminism(python_code: str) -> bool:
+    """True if transpiled code may print something different on another run.
+
+    Flags references to NONDETERMINISTIC_NAMES outside string literals and
+    imports of modules outside DETERMINISTIC_MODULES.
+    """
+    segments = _LITERAL_RE.split(python_code)
+    code = '""'.join(segments[0::2])
+    if _NONDETERMINISTIC_RE.search(code):
+        return True
+    for from_module, modules in _IMPORT_RE.findall(code):
+        names = [from_module] if from_module else [name.split()[0] for name in modules.split(",") if name.strip()]
+        if any(name.split(".")[0] not in DETERMINISTIC_MODULES for name in names):
+            return True
+    return False
+
+
+def build_transpilers() -> Dict[str, KeywordTranspiler]:
+    """Compile the keyword matcher of every supported language"""
+    return {
+        language: KeywordTranspiler(language, tables["keywords"], tables["builtins"])
+        for language, tables in LANGUAGE_TABLES.items()
+    }
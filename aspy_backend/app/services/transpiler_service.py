@@ -1,13 +1,22 @@
 # app/services/transpiler_service.py - CREATE THIS FILE
-import subprocess
-import tempfile
+import asyncio
 import os
-import sys
 import hashlib
-from datetime import datetime
-from typing import Dict, Any, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Optional
 import logging
 
+from .cache_service import (
+    execution_cache,
+    execution_cache_enabled,
+    execution_cache_key,
+    transpile_cache,
+    transpile_cache_key,
+)
+from .sandbox_pool import sandbox_enabled, sandbox_pool
+from .transpiler_engine import build_transpilers, uses_nondeterminism
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,107 +24,120 @@ class TranspilerService:
     def __init__(self):
         self.max_execution_time = int(os.getenv("MAX_EXECUTION_TIME", "30"))
         self.max_code_length = int(os.getenv("MAX_CODE_LENGTH", "10000"))
+        # Keyword matchers are compiled once per process, not per request
+        self.transpilers = build_transpilers()
+        # Bounded pool for the CPU stage so a burst of submissions cannot
+        # spawn unbounded threads or stall the event loop
+        self.cpu_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("TRANSPILER_CPU_WORKERS", str(os.cpu_count() or 4))),
+            thread_name_prefix="transpiler"
+        )
 
     def generate_code_hash(self, code: str) -> str:
         """Generate hash for code deduplication"""
         return hashlib.md5(code.encode()).hexdigest()
 
+    def transpile(self, code: str, language: str) -> str:
+        """Translate source written in a supported language to Python"""
+        language = getattr(language, "value", language)
+        transpiler = self.transpilers.get(language)
+        if transpiler is None:
+            raise ValueError(f"Unsupported language: {language}")
+        return f"# Transpiled from {language}\n" + transpiler.transpile(code)
+
+    def transpile_cached(self, code: str, language: str, code_hash: str) -> tuple:
+        """Transpile through the content-addressed cache, returning (code, hit)"""
+        key = transpile_cache_key(language, code_hash)
+        transpiled_code = transpile_cache.get(key)
+        if transpiled_code is not None:
+            return transpiled_code, True
+
+        transpiled_code = self.transpile(code, language)
+        transpile_cache.set(key, transpiled_code)
+        return transpiled_code, False
+
     async def transpile_and_execute(
             self,
             code: str,
             language: str,
             input_data: Optional[str] = None,
-            timeout: int = 30
+            timeout: int = 30,
+            code_hash: Optional[str] = None,
+            on_output: Optional[Callable[[str, str], None]] = None
     ) -> Dict[str, Any]:
         """
         Transpile and execute code
-        This is a simplified version for demonstration
+
+        Transpilation is CPU-bound and runs on the bounded thread pool so the
+        event loop keeps serving other requests; execution is awaited.
+        With EXECUTION_CACHE_ENABLED, deterministic programs that already ran
+        with the same input and timeout are answered from the execution cache.
+        ``on_output(stream, text)`` receives the program's output while it runs.
         """
         if len(code) > self.max_code_length:
+            message = f"Code exceeds maximum length of {self.max_code_length} characters"
             return {
                 "success": False,
-                "error": f"Code exceeds maximum length of {self.max_code_length} characters",
+                "error": message,
+                "errors": message,
                 "output": "",
                 "transpiled_code": None,
                 "logs": "Code too long"
             }
 
-        temp_file_path = None
-        input_file_path = None
+        language = getattr(language, "value", language)
+        code_hash = code_hash or self.generate_code_hash(code)
+        start_time = time.perf_counter()
 
         try:
-            # Determine file extension based on language
-            extensions = {
-                "assamese": ".aspy",
-                "bengali": ".bepy",
-                "bodo": ".bopy",
-                "manipuri": ".mpy",
-                "khasi": ".kpy",
-                "garo": ".gpy",
-                "mizo": ".mzpy"
+            loop = asyncio.get_running_loop()
+
+            execution_key = None
+            if execution_cache_enabled:
+                execution_key = execution_cache_key(language, code_hash, input_data, timeout)
+                cached = await loop.run_in_executor(self.cpu_executor, execution_cache.get, execution_key)
+                if cached is not None:
+                    # Streaming clients see the output a fresh run would have printed
+                    if on_output:
+                        if cached.get("output"):
+                            on_output("stdout", cached["output"])
+                        if cached.get("errors"):
+                            on_output("stderr", cached["errors"])
+                    return {
+                        **cached,
+                        "execution_time": time.perf_counter() - start_time,
+                        "transpile_cache_hit": False,
+                        "execution_cache_hit": True
+                    }
+
+            transpiled_code, cache_hit = await loop.run_in_executor(
+                self.cpu_executor, self.transpile_cached, code, language, code_hash
+            )
+
+            execution = await self.execute(transpiled_code, language, input_data, timeout, on_output)
+            success = execution["exit_code"] == 0 and not execution["violation"]
+
+            result = {
+                "success": success,
+                "transpiled_code": transpiled_code,
+                "output": execution["output"],
+                "errors": execution["errors"],
+                "exit_code": execution["exit_code"],
+                "violation": execution["violation"],
+                "logs": "Transpilation and execution completed successfully" if success
+                else f"Execution failed (exit code {execution['exit_code']})"
             }
 
-            suffix = extensions.get(language, ".txt")
-
-            # Write code to temp file
-            with tempfile.NamedTemporaryFile(
-                    delete=False,
-                    suffix=suffix,
-                    mode="w",
-                    encoding="utf-8"
-            ) as tmp:
-                tmp.write(code)
-                temp_file_path = tmp.name
-
-            # Write input data if provided
-            if input_data:
-                with tempfile.NamedTemporaryFile(
-                        delete=False,
-                        suffix=".input",
-                        mode="w",
-                        encoding="utf-8"
-                ) as input_file:
-                    input_file.write(input_data)
-                    input_file_path = input_file.name
-
-            # For demonstration, we'll simulate transpilation
-            # In production, you would call your actual transpiler module
-            logger.info(f"Simulating transpilation for {language} code")
-
-            # Simulate some processing time
-            import time
-            time.sleep(0.5)
-
-            # Simple transpilation simulation
-            transpiled_code = f"# Transpiled from {language}\n"
-            if language == "assamese":
-                # Simple Assamese to Python conversion
-                transpiled_code += code.replace("প্ৰিন্ট(", "print(").replace("দেখুৱাও(", "print(")
-            elif language == "bengali":
-                # Simple Bengali to Python conversion
-                transpiled_code += code.replace("প্রিন্ট(", "print(")
-            else:
-                transpiled_code += code
-
-            # Simulate execution
-            output = f"Execution output for {language} code\n"
-            output += f"Code length: {len(code)} characters\n"
-            output += "Transpilation successful!\n"
-
-            if input_data:
-                output += f"Input provided: {input_data[:100]}...\n"
-
-            # Simulate some output
-            output += "Hello from DesiCodes!\n"
-            output += "Code executed successfully.\n"
+            # Limit violations depend on load as much as on the program
+            if execution_key and not execution["violation"] and not await loop.run_in_executor(
+                    self.cpu_executor, uses_nondeterminism, transpiled_code):
+                await loop.run_in_executor(self.cpu_executor, execution_cache.set, execution_key, result)
 
             return {
-                "success": True,
-                "transpiled_code": transpiled_code,
-                "output": output,
-                "errors": None,
-                "execution_time": 1.5,
-                "logs": "Transpilation and execution completed successfully"
+                **result,
+                "execution_time": time.perf_counter() - start_time,
+                "transpile_cache_hit": cache_hit,
+                "execution_cache_hit": False
             }
 
         except Exception as e:
@@ -123,19 +145,50 @@ class TranspilerService:
             return {
                 "success": False,
                 "error": str(e),
+                "errors": str(e),
                 "output": "",
                 "transpiled_code": None,
                 "logs": f"Error: {str(e)}"
             }
 
-        finally:
-            # Cleanup temp files
-            for file_path in [temp_file_path, input_file_path]:
-                if file_path and os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                    except:
-                        pass
+    async def execute(
+            self,
+            transpiled_code: str,
+            language: str,
+            input_data: Optional[str] = None,
+            timeout: int = 30,
+            on_output: Optional[Callable[[str, str], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Execute transpiled code in the warm sandbox pool
+        Falls back to simulated output where the sandbox is unavailable
+        """
+        timeout = min(timeout, self.max_execution_time)
+        if sandbox_enabled:
+            run = await sandbox_pool.run(transpiled_code, input_data, timeout, on_output)
+            errors = run["stderr"] or None
+            if run["violation"]:
+                errors = (errors or "") + f"Sandbox limit exceeded: {run['violation']}"
+            return {
+                "output": run["stdout"],
+                "errors": errors,
+                "exit_code": run["exit_code"],
+                "violation": run["violation"],
+            }
+
+        output = f"Execution output for {language} code\n"
+        output += f"Code length: {len(transpiled_code)} characters\n"
+        output += "Transpilation successful!\n"
+
+        if input_data:
+            output += f"Input provided: {input_data[:100]}...\n"
+
+        # Simulate some output
+        output += "Hello from DesiCodes!\n"
+        output += "Code executed successfully.\n"
+        if on_output:
+            on_output("stdout", output)
+        return {"output": output, "errors": None, "exit_code": 0, "violation": None}
 
 
 # Global instance
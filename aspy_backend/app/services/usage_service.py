@@ -0,0 +1,149 @@
+# app/services/usage_service.py Pre-aggregated execution usage
+from datetime import date, datetime, time, timezone
+from typing import Dict, Optional
+import logging
+
+from sqlalchemy import Date, case, cast, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models.transpiler_job import JobStatus, TranspilerJob
+from ..models.usage_rollup import UsageRollup
+from .quota_service import quota_period
+
+logger = logging.getLogger(__name__)
+
+# Jobs that ran; cancelled and pending jobs are not usage
+FINISHED = (JobStatus.COMPLETED, JobStatus.FAILED)
+
+
+def usage_day(at: Optional[datetime] = None) -> date:
+    """UTC day a job is counted on; naive datetimes are taken as UTC"""
+    at = at or datetime.now(timezone.utc)
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc)
+    return at.date()
+
+
+class UsageRollupService:
+    """Per-user, per-day, per-language execution totals in ``usage_rollups``.
+
+    Jobs are added as they finish, in the same transaction as their result,
+    so billing and quota pages read a handful of rollup rows with one
+    indexed query instead of counting jobs. Rollups outlive archived job
+    partitions, which keeps all-time totals intact. ``backfill`` rebuilds
+    them from the jobs still in the database.
+    """
+
+    def __init__(self):
+        self.recorded = 0
+        self.backfilled = 0
+
+    @staticmethod
+    def _insert(db: Session):
+        return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+    def record(self, db: Session, user_id: int, language: str, success: bool,
+               execution_ms: Optional[int] = None, at: Optional[datetime] = None):
+        """Add one finished job. Does not commit."""
+        stmt = self._insert(db)(UsageRollup).values(
+            user_id=user_id, day=usage_day(at), language=language,
+            executions=1, successes=int(bool(success)), execution_ms=execution_ms or 0
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "day", "language"],
+            set_={
+                "executions": UsageRollup.executions + stmt.excluded.executions,
+                "successes": UsageRollup.successes + stmt.excluded.successes,
+                "execution_ms": UsageRollup.execution_ms + stmt.excluded.execution_ms,
+                "updated_at": func.now(),
+            }
+        )
+        db.execute(stmt)
+        self.recorded += 1
+
+    def record_job(self, db: Session, job: TranspilerJob):
+        self.record(db, job.user_id, job.language, job.success, job.execution_time_ms, job.submitted_at)
+
+    def summary(self, db: Session, user_id: int, since: Optional[date] = None) -> Dict[str, int]:
+        """All-time totals and those from ``since`` (default: this quota period) on"""
+        since = since or quota_period()[1].date()
+        in_period = UsageRollup.day >= since
+        row = db.execute(select(
+            func.coalesce(func.sum(UsageRollup.executions), 0),
+            func.coalesce(func.sum(UsageRollup.successes), 0),
+            func.coalesce(func.sum(UsageRollup.execution_ms), 0),
+            func.coalesce(func.sum(case((in_period, UsageRollup.executions), else_=0)), 0),
+            func.coalesce(func.sum(case((in_period, UsageRollup.successes), else_=0)), 0),
+        ).where(UsageRollup.user_id == user_id)).one()
+        return {
+            "executions": int(row[0]),
+            "successes": int(row[1]),
+            "execution_ms": int(row[2]),
+            "period_executions": int(row[3]),
+            "period_successes": int(row[4]),
+        }
+
+    def last_execution(self, db: Session, user_id: int) -> Optional[datetime]:
+        """When the user's latest job finished, to the rollups' precision"""
+        return db.execute(
+            select(func.max(UsageRollup.updated_at)).where(UsageRollup.user_id == user_id)
+        ).scalar()
+
+    @staticmethod
+    def _day(db: Session, column):
+        if db.get_bind().dialect.name == "postgresql":
+            return cast(func.timezone("UTC", column), Date)
+        return func.date(column)
+
+    def backfill(self, db: Session, since: Optional[datetime] = None) -> int:
+        """Recompute rollups from jobs submitted since ``since`` (default: the oldest job).
+
+        Works a month at a time, committing each, and overwrites only days
+        that still have jobs, so days whose jobs were archived keep their rollups.
+        """
+        since = since or db.execute(select(func.min(TranspilerJob.submitted_at))).scalar()
+        if since is None:
+            return 0
+        # Whole days only: a partial day would overwrite its rollup with a partial count
+        since = datetime.combine(usage_day(since), time.min, tzinfo=timezone.utc)
+        day = self._day(db, TranspilerJob.submitted_at)
+        _, start, _ = quota_period(since)
+        updated = 0
+        while start <= datetime.now(timezone.utc):
+            _, _, end = quota_period(start)
+            rows = select(
+                TranspilerJob.user_id, day, TranspilerJob.language,
+                func.count(TranspilerJob.id),
+                func.sum(case((TranspilerJob.success.is_(True), 1), else_=0)),
+                func.coalesce(func.sum(TranspilerJob.execution_time_ms), 0),
+            ).where(
+                TranspilerJob.submitted_at >= max(start, since),
+                TranspilerJob.submitted_at < end,
+                TranspilerJob.status.in_(FINISHED)
+            ).group_by(TranspilerJob.user_id, day, TranspilerJob.language)
+            stmt = self._insert(db)(UsageRollup).from_select(
+                ["user_id", "day", "language", "executions", "successes", "execution_ms"], rows
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_id", "day", "language"],
+                set_={
+                    "executions": stmt.excluded.executions,
+                    "successes": stmt.excluded.successes,
+                    "execution_ms": stmt.excluded.execution_ms,
+                    "updated_at": func.now(),
+                }
+            )
+            updated += db.execute(stmt).rowcount
+            db.commit()
+            start = end
+        self.backfilled += updated
+        logger.info(f"Backfilled {updated} usage rollups")
+        return updated
+
+    def stats(self):
+        return {"recorded": self.recorded, "backfilled": self.backfilled}
+
+
+# Global instance
+usage_rollups = UsageRollupService()
@@ -0,0 +1,128 @@
+# app/services/user_cache_service.py Authenticated-user caches
+import hashlib
+import os
+import time
+from typing import Any, Dict, Optional
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from ..models.user import User
+from .cache_service import TTLCache
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+INVALIDATE_CHANNEL = "users:invalidate"
+
+
+class UserCache:
+    """Caches that keep authentication off the database on the hot path.
+
+    ``tokens`` maps a bearer token to its verified JWT claims, so repeated
+    requests with the same token skip signature verification; ``users`` maps
+    a user id to a detached snapshot of the ``users`` row. Snapshots are
+    dropped when a transaction that changed the user commits, on this node
+    directly and on others over Redis pub/sub; the short TTL bounds staleness
+    if a broadcast is missed.
+    """
+
+    def __init__(self, user_ttl: float = 30, token_ttl: float = 300, maxsize: int = 10000):
+        self.users = TTLCache(maxsize=maxsize, ttl=user_ttl)
+        self.tokens = TTLCache(maxsize=maxsize, ttl=token_ttl)
+        self._pubsub_thread = None
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get_claims(self, token: str) -> Optional[Dict[str, Any]]:
+        """Claims of a previously verified token that has not expired since"""
+        claims = self.tokens.get(self._token_key(token))
+        if claims is not None and claims.get("exp", 0) <= time.time():
+            self.tokens.delete(self._token_key(token))
+            return None
+        return claims
+
+    def set_claims(self, token: str, claims: Dict[str, Any]):
+        # Never keep a token past its own expiry
+        ttl = min(self.tokens.ttl, claims.get("exp", 0) - time.time())
+        if ttl > 0:
+            self.tokens.set(self._token_key(token), claims, ttl=ttl)
+
+    async def get_user(self, db: AsyncSession, user_id: int) -> Optional[User]:
+        """The cached user attached to ``db`` without a query, or None on a miss"""
+        snapshot = self.users.get(user_id)
+        if snapshot is None:
+            return None
+        # merge(load=False) copies the snapshot into this session, so callers
+        # can still modify and commit the user they were given
+        return await db.merge(snapshot, load=False)
+
+    async def set_user(self, db: AsyncSession, user: User) -> User:
+        """Cache ``user`` (loaded by ``db``) and return a copy attached to ``db``"""
+        db.expunge(user)
+        self.users.set(user.id, user)
+        return await db.merge(user, load=False)
+
+    def invalidate(self, user_id: int, broadcast: bool = True):
+        """Forget a user here and, with ``broadcast``, on every other node"""
+        self.users.delete(user_id)
+        if broadcast:
+            client = get_redis()
+            if client:
+                try:
+                    client.publish(INVALIDATE_CHANNEL, str(user_id))
+                except Exception as e:
+                    logger.warning(f"Failed to broadcast user invalidation: {e}")
+
+    def start(self):
+        """Listen for invalidations from other nodes"""
+        client = get_redis()
+        if client and self._pubsub_thread is None:
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{
+                    INVALIDATE_CHANNEL: lambda message: self.invalidate(int(message["data"]), broadcast=False)
+                })
+                self._pubsub_thread = pubsub.run_in_thread(sleep_time=1, daemon=True)
+            except Exception as e:
+                logger.warning(f"User invalidations will not be received: {e}")
+
+    def stop(self):
+        if self._pubsub_thread is not None:
+            self._pubsub_thread.stop()
+            self._pubsub_thread = None
+
+    def stats(self):
+        return {"users": self.users.stats(), "tokens": self.tokens.stats()}
+
+
+# Global instance
+user_cache = UserCache(
+    user_ttl=float(os.getenv("USER_CACHE_TTL", "30")),
+    token_ttl=float(os.getenv("TOKEN_CACHE_TTL", "300")),
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "10000"))
+)
+
+
+# Drop cached users (profile updates, deactivation, deletion) once the change commits
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(_mapper, _connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("users_changed", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    for user_id in session.info.pop("users_changed", ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("users_changed", None)
@@ -1,18 +1,28 @@
 # app/services/worker_service.py Transpiler worker service
 import asyncio
 import logging
+import os
+import time
 import traceback
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Set
 import hashlib
 import httpx
 
-from ...app.db.session import SessionLocal
-from ...app.models.transpiler_job import TranspilerJob, JobStatus
-from ...app.models.user import User
-from ...app.models.subscription import Subscription
-from ...app.services.queue_services import queue_service
-from ...app.services.transpiler_service import transpiler_service
+from ..db.session import SessionLocal
+from ..models.transpiler_job import TranspilerJob, JobStatus
+from ..models.user import User
+from ..models.subscription import Subscription, SubscriptionStatus
+from .concurrency_service import concurrency_limiter
+from .job_event_service import job_events
+from .job_output_service import job_output
+from .partition_service import job_filter
+from .payload_service import payload_store
+from .queue_service import queue_service
+from .quota_service import quota_service
+from .sandbox_pool import sandbox_pool
+from .transpiler_service import transpiler_service
+from .usage_service import usage_rollups
 
 logger = logging.getLogger(__name__)
 
@@ -21,147 +31,395 @@ class WorkerService:
     def __init__(self):
         self.queue_name = "transpiler_jobs"
         self.running = False
+        # Upper bound on how long stop() waits for an idle worker to notice
+        self.dequeue_timeout = int(os.getenv("WORKER_DEQUEUE_TIMEOUT", "5"))
+        # Leases are renewed well before they expire
+        self.heartbeat_interval = queue_service.visibility_timeout / 3
+        # Jobs run at once per worker process; defaults to one per sandbox
+        self.concurrency = int(os.getenv("WORKER_CONCURRENCY", str(sandbox_pool.size)))
+        # How long stop() lets in-flight jobs finish before abandoning them
+        self.drain_timeout = float(os.getenv("WORKER_DRAIN_TIMEOUT", "60"))
+        # Backoff for jobs deferred by their plan's concurrency limit
+        self.defer_delay = float(os.getenv("WORKER_DEFER_DELAY", "0.5"))
+        self.max_defer_delay = float(os.getenv("WORKER_MAX_DEFER_DELAY", "10"))
+        # Seconds between quota counter reconciliations against transpiler_jobs (0 disables)
+        self.reconcile_interval = float(os.getenv("QUOTA_RECONCILE_INTERVAL", "3600"))
+        self.tasks: Set[asyncio.Task] = set()
+        # Throughput counters reported by the supervisor (app.worker)
+        self.jobs_processed = 0
+        self.jobs_failed = 0
+        self.jobs_deferred = 0
+        self._stopped: Optional[asyncio.Event] = None
 
     async def start(self):
         """Start the worker"""
         self.running = True
-        logger.info("Transpiler worker started")
+        self._stopped = asyncio.Event()
+        slots = asyncio.Semaphore(self.concurrency)
+        logger.info(f"Transpiler worker started with concurrency {self.concurrency}")
+        reaper = asyncio.create_task(self._reaper_loop())
+        promoter = asyncio.create_task(self._delayed_loop())
+        reconciler = asyncio.create_task(self._reconcile_loop()) if self.reconcile_interval > 0 else None
 
-        while self.running:
-            try:
-                await self.process_next_job()
-                await asyncio.sleep(0.1)  # Small delay to prevent CPU spinning
-            except Exception as e:
-                logger.error(f"Worker error: {e}")
-                await asyncio.sleep(1)
+        try:
+            while self.running:
+                # Only take a job off the queue when there is a free slot for it
+                try:
+                    await asyncio.wait_for(slots.acquire(), timeout=self.dequeue_timeout)
+                except asyncio.TimeoutError:
+                    continue
+                try:
+                    # Blocks until a job arrives on any priority lane instead of polling
+                    job_data = await queue_service.dequeue_fair_async(self.queue_name, timeout=self.dequeue_timeout)
+                except Exception as e:
+                    slots.release()
+                    logger.error(f"Worker error: {e}")
+                    await asyncio.sleep(1)
+                    continue
+                if not job_data:
+                    slots.release()
+                    continue
+
+                task = asyncio.create_task(self.process_job(job_data))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+                task.add_done_callback(lambda _: slots.release())
+        finally:
+            reaper.cancel()
+            promoter.cancel()
+            if reconciler:
+                reconciler.cancel()
+            await self._drain()
+            self._stopped.set()
+
+    async def _drain(self):
+        """Let in-flight jobs finish; cancelled ones stay leased and are redelivered"""
+        if not self.tasks:
+            return
+        logger.info(f"Draining {len(self.tasks)} in-flight jobs")
+        _, pending = await asyncio.wait(set(self.tasks), timeout=self.drain_timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Abandoned {len(pending)} jobs after {self.drain_timeout}s drain timeout")
+            await asyncio.gather(*pending, return_exceptions=True)
 
     def stop(self):
-        """Stop the worker"""
+        """Stop taking new jobs; start() returns once in-flight jobs are drained"""
         self.running = False
-        logger.info("Transpiler worker stopped")
+        logger.info("Transpiler worker stopping")
+
+    async def wait_stopped(self):
+        """Wait until start() has drained and returned"""
+        if self._stopped:
+            await self._stopped.wait()
 
     async def process_next_job(self):
-        """Process next job from queue"""
-        job_data = queue_service.dequeue(self.queue_name)
-        if not job_data:
-            return
+        """Process next job from queue, if any"""
+        job_data = await queue_service.dequeue_fair_async(self.queue_name, timeout=0)
+        if job_data:
+            await self.process_job(job_data)
 
+    async def process_job(self, job_data: Dict[str, Any]):
+        """Run one dequeued job under a renewed lease, then acknowledge it"""
+        # Hold one of the account's plan concurrency slots while running
+        slot = None
+        limit = job_data.get("concurrency_limit")
+        if limit:
+            slot = await asyncio.to_thread(concurrency_limiter.acquire, job_data.get("user_id"), int(limit))
+            if not slot:
+                await asyncio.to_thread(self.defer, job_data)
+                return
+
+        heartbeat = asyncio.create_task(self._heartbeat(job_data, slot))
+        completed = False
+        try:
+            succeeded = await self._run_job(job_data)
+            completed = True
+            self.jobs_processed += 1
+            if succeeded is False:
+                self.jobs_failed += 1
+        finally:
+            heartbeat.cancel()
+            if slot:
+                await asyncio.to_thread(concurrency_limiter.release, job_data.get("user_id"), slot)
+            # Unfinished jobs (cancelled on shutdown, unexpected errors) keep
+            # their lease and are redelivered once it expires
+            if completed:
+                await asyncio.to_thread(queue_service.ack, job_data)
+
+    def defer(self, job_data: Dict[str, Any]):
+        """Put a job back until its account has a free slot, backing off each time"""
+        delay = min(self.max_defer_delay, self.defer_delay * 2 ** job_data.get("_deferrals", 0))
+        queue_service.defer(self.queue_name, job_data, delay)
+        self.jobs_deferred += 1
+        logger.info(f"Job {job_data.get('job_id')} deferred {delay:.1f}s: account at its concurrency limit")
+
+    async def _delayed_loop(self):
+        """Requeue deferred jobs as they come due"""
+        while True:
+            try:
+                next_due = await asyncio.to_thread(queue_service.promote_delayed, self.queue_name)
+            except Exception as e:
+                logger.error(f"Delayed job promotion error: {e}")
+                next_due = None
+            # Sleep until the next deferral is due, but re-check at least every second
+            wait = 1.0 if next_due is None else min(1.0, max(0.05, next_due - time.time()))
+            await asyncio.sleep(wait)
+
+    async def _heartbeat(self, job_data: Dict[str, Any], slot: Optional[str] = None):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if slot:
+                await asyncio.to_thread(concurrency_limiter.refresh, job_data.get("user_id"), slot)
+            if not await asyncio.to_thread(queue_service.extend_lease, job_data):
+                logger.warning(f"Lost lease on job {job_data.get('job_id')}; it may be redelivered")
+                return
+
+    async def _reaper_loop(self):
+        """Redeliver jobs whose worker died; every worker runs one"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await asyncio.to_thread(self.reap_expired)
+            except Exception as e:
+                logger.error(f"Reaper error: {e}")
+
+    async def _reconcile_loop(self):
+        """Periodically correct quota counters from the jobs actually submitted"""
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await asyncio.to_thread(self._reconcile_quotas)
+            except Exception as e:
+                logger.error(f"Quota reconciliation error: {e}")
+
+    def _reconcile_quotas(self):
+        db = SessionLocal()
+        try:
+            quota_service.reconcile(db)
+        finally:
+            db.close()
+
+    def reap_expired(self) -> int:
+        """Requeue expired leases and fail jobs that exhausted their deliveries"""
+        result = {"requeued": 0, "dead": []}
+        for queue_name in [self.queue_name] + queue_service.lane_queues(self.queue_name):
+            lane_result = queue_service.requeue_expired(queue_name)
+            result["requeued"] += lane_result["requeued"]
+            result["dead"] += lane_result["dead"]
+        if result["requeued"]:
+            logger.warning(f"Requeued {result['requeued']} jobs with expired leases")
+        if not result["dead"]:
+            return result["requeued"]
+
+        db = SessionLocal()
+        failed = []
+        try:
+            for job_data in result["dead"]:
+                job = db.query(TranspilerJob).filter(
+                    job_filter(job_data.get("job_id"), job_data.get("submitted_at"))
+                ).with_for_update().first()
+                if job and job.status not in [JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED]:
+                    failed.append(job.id)
+                    job.status = JobStatus.FAILED
+                    payload_store.save_job(
+                        db, job, errors=f"Job abandoned after {queue_service.max_deliveries} delivery attempts"
+                    )
+                    job.completed_at = datetime.utcnow()
+                    usage_rollups.record_job(db, job)
+                logger.error(f"Job {job_data.get('job_id')} moved to dead-letter queue")
+            db.commit()
+            for job_id in failed:
+                job_events.publish(job_id, JobStatus.FAILED.value)
+        except Exception as e:
+            logger.error(f"Failed to mark dead-lettered jobs: {e}")
+            db.rollback()
+        finally:
+            db.close()
+        return result["requeued"]
+
+    async def _run_job(self, job_data: Dict[str, Any]) -> Optional[bool]:
+        """Run the job; returns whether it succeeded, or None if it was skipped"""
         job_id = job_data.get("job_id")
         if not job_id:
             return
 
+        # Database work runs in threads so concurrent jobs overlap their writes
+        submitted_at = job_data.get("submitted_at")
+        job = await asyncio.to_thread(self._start_job, job_id, submitted_at)
+        if not job:
+            return
+
+        try:
+            logger.info(f"Processing job {job_id} for user {job['user_id']}")
+
+            # Process the job
+            start_time = datetime.now()
+
+            result = await transpiler_service.transpile_and_execute(
+                code=job["code"],
+                language=job["language"],
+                input_data=job["input_data"],
+                timeout=job["timeout_seconds"],
+                code_hash=job["code_hash"],
+                on_output=job_output.writer(job_id)
+            )
+
+            # Calculate execution time
+            end_time = datetime.now()
+            execution_time = (end_time - start_time).total_seconds()
+
+            webhook = await asyncio.to_thread(self._finish_job, job_id, result, execution_time, submitted_at)
+            if webhook:
+                await self._send_webhook(*webhook)
+            return bool(result.get("success"))
+        except Exception as e:
+            logger.error(f"Failed to process job {job_id}: {e}")
+            logger.error(traceback.format_exc())
+            await asyncio.to_thread(self._fail_job, job_id, str(e), submitted_at)
+            return False
+
+    def _start_job(self, job_id: str, submitted_at: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Mark the job PROCESSING and return the fields needed to run it"""
         db = SessionLocal()
         try:
             # Get job from database
-            job = db.query(TranspilerJob).filter(TranspilerJob.id == job_id).first()
+            job = db.query(TranspilerJob).filter(job_filter(job_id, submitted_at)).first()
             if not job:
                 logger.warning(f"Job {job_id} not found in database")
-                return
+                return None
 
             # Skip if already completed or cancelled
             if job.status in [JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED]:
                 logger.info(f"Job {job_id} already in final state: {job.status}")
-                return
+                return None
+
+            code = payload_store.load_job(db, job, "code")["code"]
 
             # Update job status to processing
             job.status = JobStatus.PROCESSING
             job.started_at = datetime.utcnow()
             db.commit()
+            job_events.publish(job_id, JobStatus.PROCESSING.value)
 
-            logger.info(f"Processing job {job_id} for user {job.user_id}")
-
-            # Process the job
-            start_time = datetime.now()
-
-            result = await transpiler_service.transpile_and_execute(
-                code=job.code,
-                language=job.language,
-                input_data=job.input_data,
-                timeout=job.timeout_seconds
-            )
+            return {
+                "user_id": job.user_id,
+                "code": code,
+                "language": job.language,
+                "input_data": job.input_data,
+                "timeout_seconds": job.timeout_seconds,
+                "code_hash": job.code_hash,
+            }
+        finally:
+            db.close()
 
-            # Calculate execution time
-            end_time = datetime.now()
-            execution_time = (end_time - start_time).total_seconds()
+    def _finish_job(self, job_id: str, result: Dict[str, Any], execution_time: float,
+                    submitted_at: Optional[str] = None):
+        """Store the result, update billing and return (webhook_url, payload) if one is set"""
+        db = SessionLocal()
+        try:
+            # A job redelivered while it was already running finishes twice; the
+            # row lock makes the second finish see the first and count it once
+            job = db.query(TranspilerJob).filter(job_filter(job_id, submitted_at)).with_for_update().first()
+            counted = job.status in [JobStatus.COMPLETED, JobStatus.FAILED]
 
             # Update job with results
-            job.transpiled_code = result.get("transpiled_code")
-            job.execution_output = result.get("output")
-            job.errors = result.get("errors")
+            payload_store.save_job(
+                db, job,
+                transpiled_code=result.get("transpiled_code"),
+                execution_output=result.get("output"),
+                errors=result.get("errors"),
+                logs=result.get("logs", "")
+            )
             job.success = result.get("success", False)
             job.execution_time_ms = int(execution_time * 1000)
             job.status = JobStatus.COMPLETED if job.success else JobStatus.FAILED
             job.completed_at = datetime.utcnow()
-            job.logs = result.get("logs", "")
+            # Cache hits are still charged: the job row counts toward quota
+            job.meta = {**(job.meta or {}), "execution_cache_hit": result.get("execution_cache_hit", False)}
+            if not counted:
+                usage_rollups.record_job(db, job)
+                if job.success:
+                    self._bill_execution(db, job.user_id)
 
             db.commit()
+            # The stored output supersedes the live buffer
+            job_output.clear(job_id)
+            job_events.publish(job_id, job.status.value)
 
             logger.info(f"Job {job_id} completed with status: {job.status}")
 
-            # Update billing metrics if job was successful
-            if job.success:
-                try:
-                    user = db.query(User).filter(User.id == job.user_id).first()
-                    if user:
-                        user.total_code_executions += 1
-                        user.last_execution_at = datetime.utcnow()
-
-                        # Update active subscription metrics
-                        active_subscription = db.query(Subscription).filter(
-                            Subscription.user_id == job.user_id,
-                            Subscription.status == "active"
-                        ).first()
-                        if active_subscription:
-                            active_subscription.executions_this_month += 1
-                            active_subscription.total_executions += 1
-
-                        db.commit()
-                        logger.info(f"Updated billing metrics for user {job.user_id}")
-                except Exception as e:
-                    logger.error(f"Failed to update billing metrics: {e}")
-                    db.rollback()
+            user = db.query(User).filter(User.id == job.user_id).first()
+            if not user or not user.webhook_url:
+                return None
+            return user.webhook_url, {
+                "job_id": job.id,
+                "user_id": job.user_id,
+                "status": job.status.value,
+                "success": job.success,
+                "language": job.language,
+                "execution_time_ms": job.execution_time_ms,
+                "completed_at": job.completed_at.isoformat() if job.completed_at else None,
+                "output": result.get("output"),
+                "errors": result.get("errors"),
+                "transpiled_code": result.get("transpiled_code")
+            }
+        finally:
+            db.close()
 
-            # Trigger webhook if configured
-            try:
-                user = db.query(User).filter(User.id == job.user_id).first()
-                if user and user.webhook_url:
-                    webhook_data = {
-                        "job_id": job.id,
-                        "user_id": job.user_id,
-                        "status": job.status.value,
-                        "success": job.success,
-                        "language": job.language,
-                        "execution_time_ms": job.execution_time_ms,
-                        "completed_at": job.completed_at.isoformat() if job.completed_at else None,
-                        "output": job.execution_output,
-                        "errors": job.errors,
-                        "transpiled_code": job.transpiled_code
-                    }
-
-                    async with httpx.AsyncClient(timeout=10.0) as client:
-                        response = await client.post(user.webhook_url, json=webhook_data)
-                        if response.status_code == 200:
-                            logger.info(f"Webhook sent successfully to {user.webhook_url}")
-                        else:
-                            logger.warning(f"Webhook failed with status {response.status_code}: {response.text}")
-            except Exception as e:
-                logger.error(f"Failed to send webhook: {e}")
+    def _bill_execution(self, db, user_id: int):
+        """Count a successful execution on the active subscription; failures only log.
+
+        Runs in the finishing job's transaction, inside a savepoint so a
+        billing error does not lose the job's result.
+        """
+        try:
+            with db.begin_nested():
+                # Per-user totals are in the usage rollups
+                active_subscription = db.query(Subscription).filter(
+                    Subscription.user_id == user_id,
+                    Subscription.status == SubscriptionStatus.ACTIVE
+                ).with_for_update().first()
+                if active_subscription:
+                    active_subscription.executions_this_month += 1
+                    active_subscription.total_executions += 1
+                    logger.info(f"Updated billing metrics for user {user_id}")
         except Exception as e:
-            logger.error(f"Failed to process job {job_id}: {e}")
-            logger.error(traceback.format_exc())
+            logger.error(f"Failed to update billing metrics: {e}")
 
-            # Mark job as failed
-            try:
+    def _fail_job(self, job_id: str, error: str, submitted_at: Optional[str] = None):
+        """Mark job as failed"""
+        db = SessionLocal()
+        try:
+            job = db.query(TranspilerJob).filter(job_filter(job_id, submitted_at)).with_for_update().first()
+            if job:
+                counted = job.status in [JobStatus.COMPLETED, JobStatus.FAILED]
                 job.status = JobStatus.FAILED
-                job.errors = str(e)
+                payload_store.save_job(db, job, errors=error)
                 job.completed_at = datetime.utcnow()
+                if not counted:
+                    usage_rollups.record_job(db, job)
                 db.commit()
-            except:
-                db.rollback()
-
+                job_output.clear(job_id)
+                job_events.publish(job_id, JobStatus.FAILED.value)
+        except Exception:
+            db.rollback()
         finally:
             db.close()
 
+    async def _send_webhook(self, webhook_url: str, webhook_data: Dict[str, Any]):
+        """Trigger webhook if configured"""
+        try:
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                response = await client.post(webhook_url, json=webhook_data)
+                if response.status_code == 200:
+                    logger.info(f"Webhook sent successfully to {webhook_url}")
+                else:
+                    logger.warning(f"Webhook failed with status {response.status_code}: {response.text}")
+        except Exception as e:
+            logger.error(f"Failed to send webhook: {e}")
+
 
 # Global worker instance
 worker_service = WorkerService()
\ No newline at end of file
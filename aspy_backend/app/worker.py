@@ -0,0 +1,210 @@
+# app/worker.py Worker supervisor
+"""
+Run transpiler workers: python -m app.worker [--processes N]
+
+The supervisor starts N WorkerService processes (default: CPU count),
+restarts any that crash, and on SIGTERM/SIGINT tells them to drain their
+in-flight jobs before exiting. Per-child throughput is logged periodically.
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from typing import List, Optional
+
+logger = logging.getLogger("app.worker")
+
+# Restarts of a child within this many seconds count as a crash loop
+CRASH_WINDOW = 30
+MAX_RESTART_DELAY = 30
+
+
+def run_child(index: int, processed, failed, sandbox_size: int, concurrency: int):
+    """Entry point of one worker process"""
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format=f"%(asctime)s [worker-{index}] %(levelname)s %(name)s: %(message)s"
+    )
+    # Imported here so each child opens its own DB, Redis and sandbox handles
+    from .services.sandbox_pool import sandbox_enabled, sandbox_pool
+    from .services.worker_services import worker_service
+
+    sandbox_pool.size = sandbox_size
+    worker_service.concurrency = concurrency
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, worker_service.stop)
+
+        async def publish_counters():
+            while True:
+                processed.value = worker_service.jobs_processed
+                failed.value = worker_service.jobs_failed
+                await asyncio.sleep(1)
+
+        publisher = asyncio.create_task(publish_counters())
+        try:
+            await worker_service.start()
+        finally:
+            publisher.cancel()
+            processed.value = worker_service.jobs_processed
+            failed.value = worker_service.jobs_failed
+
+    if sandbox_enabled:
+        sandbox_pool.start()
+    try:
+        asyncio.run(main())
+    finally:
+        if sandbox_enabled:
+            sandbox_pool.stop()
+
+
+class Child:
+    """Supervisor-side handle of one worker process"""
+
+    def __init__(self, index: int, ctx):
+        self.index = index
+        self.ctx = ctx
+        self.process: Optional[multiprocessing.Process] = None
+        self.processed = ctx.Value("Q", 0, lock=False)
+        self.failed = ctx.Value("Q", 0, lock=False)
+        self.started_at = 0.0
+        self.restarts = 0
+        self.restart_at = 0.0
+        # Jobs done by earlier incarnations, so throughput survives restarts
+        self.total_before = 0
+        self.failed_before = 0
+        self.last_reported = 0
+
+    def start(self, sandbox_size: int, concurrency: int):
+        self.processed.value = 0
+        self.failed.value = 0
+        self.process = self.ctx.Process(
+            target=run_child,
+            args=(self.index, self.processed, self.failed, sandbox_size, concurrency),
+            name=f"worker-{self.index}",
+        )
+        self.process.start()
+        self.started_at = time.monotonic()
+
+    @property
+    def total(self) -> int:
+        return self.total_before + self.processed.value
+
+
+class Supervisor:
+    def __init__(self, processes: int, report_interval: float, drain_timeout: float):
+        self.ctx = multiprocessing.get_context("spawn")
+        self.children: List[Child] = [Child(i, self.ctx) for i in range(processes)]
+        self.report_interval = report_interval
+        self.drain_timeout = drain_timeout
+        self.stopping = False
+        # Share the cores between children unless sizes are configured explicitly
+        cpus = os.cpu_count() or 1
+        self.sandbox_size = int(os.getenv("SANDBOX_POOL_SIZE", str(max(1, cpus // processes))))
+        self.concurrency = int(os.getenv("WORKER_CONCURRENCY", str(self.sandbox_size)))
+
+    def _on_signal(self, signum, _frame):
+        logger.info(f"Received {signal.Signals(signum).name}, draining workers")
+        self.stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+
+        for child in self.children:
+            child.start(self.sandbox_size, self.concurrency)
+        logger.info(
+            f"Started {len(self.children)} workers "
+            f"(sandboxes {self.sandbox_size}, concurrency {self.concurrency} each)"
+        )
+
+        last_report = time.monotonic()
+        while not self.stopping:
+            time.sleep(0.5)
+            self._restart_crashed()
+            if time.monotonic() - last_report >= self.report_interval:
+                self.report(time.monotonic() - last_report)
+                last_report = time.monotonic()
+
+        self.shutdown()
+        self.report(time.monotonic() - last_report)
+
+    def _restart_crashed(self):
+        now = time.monotonic()
+        for child in self.children:
+            if child.process.is_alive() or self.stopping:
+                continue
+            if not child.restart_at:
+                child.total_before += child.processed.value
+                child.failed_before += child.failed.value
+                # Back off when a child keeps dying right after starting
+                crash_loop = now - child.started_at < CRASH_WINDOW
+                child.restarts = child.restarts + 1 if crash_loop else 0
+                delay = min(MAX_RESTART_DELAY, 2 ** child.restarts - 1) if crash_loop else 0
+                child.restart_at = now + delay
+                logger.error(
+                    f"Worker {child.index} (pid {child.process.pid}) exited with code "
+                    f"{child.process.exitcode}; restarting in {delay}s"
+                )
+            if now >= child.restart_at:
+                child.restart_at = 0.0
+                child.start(self.sandbox_size, self.concurrency)
+                logger.info(f"Worker {child.index} restarted as pid {child.process.pid}")
+
+    def shutdown(self):
+        for child in self.children:
+            if child.process.is_alive():
+                os.kill(child.process.pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + self.drain_timeout + 5
+        for child in self.children:
+            child.process.join(max(0.0, deadline - time.monotonic()))
+            if child.process.is_alive():
+                logger.warning(f"Worker {child.index} did not drain in time; killing it")
+                child.process.kill()
+                child.process.join()
+        logger.info("All workers stopped")
+
+    def report(self, elapsed: float):
+        """Log per-child throughput since the last report"""
+        if elapsed <= 0:
+            return
+        lines = []
+        for child in self.children:
+            done = child.total - child.last_reported
+            child.last_reported = child.total
+            lines.append(
+                f"worker-{child.index} pid={child.process.pid} jobs={child.total} "
+                f"failed={child.failed_before + child.failed.value} rate={done / elapsed:.2f}/s"
+            )
+        logger.info("Throughput: " + "; ".join(lines))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run DesiCodes transpiler workers")
+    parser.add_argument("--processes", type=int,
+                        default=int(os.getenv("WORKER_PROCESSES", str(os.cpu_count() or 1))),
+                        help="worker processes to run (default: CPU count)")
+    parser.add_argument("--report-interval", type=float,
+                        default=float(os.getenv("WORKER_REPORT_INTERVAL", "60")),
+                        help="seconds between throughput reports")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format="%(asctime)s [supervisor] %(levelname)s %(name)s: %(message)s"
+    )
+    Supervisor(
+        processes=max(1, args.processes),
+        report_interval=args.report_interval,
+        drain_timeout=float(os.getenv("WORKER_DRAIN_TIMEOUT", "60")),
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# benchmarks/bench_db.py
+"""
+Job-status throughput under concurrent load: sync Session vs AsyncSession.
+
+Each request looks up one job, the way GET /api/transpiler/{job_id} does,
+behind a query that takes --latency ms (pg_sleep on Postgres, a sleeping SQL
+function on SQLite). With the sync session every query blocks the event loop,
+so requests run one at a time; with the async session they overlap.
+
+Run from aspy_backend/:  python -m benchmarks.bench_db [--requests 500] [--concurrency 50]
+Uses a temporary SQLite file unless --database-url is given.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.db.base import Base
+from app.db.session import async_database_url
+from app.models.transpiler_job import TranspilerJob
+
+
+def sleep_ms(ms):
+    time.sleep(ms / 1000)
+    return ms
+
+
+def slow_query(url: str, latency_ms: float):
+    if make_url(url).get_backend_name() == "postgresql":
+        return select(func.pg_sleep(latency_ms / 1000))
+    return select(func.sleep_ms(latency_ms))
+
+
+def build_app(database_url: str, latency_ms: float, pool_size: int, max_overflow: int):
+    # Overflow covers every in-flight request: a sync checkout that has to wait
+    # blocks the event loop, so the sessions that would free a connection never close
+    sync_engine = create_engine(database_url, poolclass=QueuePool, pool_size=pool_size, max_overflow=max_overflow)
+    async_engine = create_async_engine(
+        async_database_url(database_url), poolclass=AsyncAdaptedQueuePool,
+        pool_size=pool_size, max_overflow=max_overflow
+    )
+    if make_url(database_url).get_backend_name() == "sqlite":
+        event.listen(sync_engine, "connect", lambda conn, _: conn.create_function("sleep_ms", 1, sleep_ms))
+        event.listen(async_engine.sync_engine, "connect", lambda conn, _: conn.run_async(
+            lambda driver: driver.create_function("sleep_ms", 1, sleep_ms)
+        ))
+    SyncSession = sessionmaker(bind=sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+    query = slow_query(database_url, latency_ms)
+
+    def get_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.get("/sync/{job_id}")
+    async def sync_status(job_id: str, db: Session = Depends(get_db)):
+        db.execute(query)
+        job = db.get(TranspilerJob, job_id)
+        return {"status": job.status}
+
+    @app.get("/async/{job_id}")
+    async def async_status(job_id: str, db: AsyncSession = Depends(get_async_db)):
+        await db.execute(query)
+        job = await db.get(TranspilerJob, job_id)
+        return {"status": job.status}
+
+    return app, sync_engine, async_engine
+
+
+async def load(app: FastAPI, path: str, requests: int, concurrency: int):
+    latencies = []
+    pending = iter(range(requests))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            for _ in pending:
+                start = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+    return requests / elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=5, help="ms each request spends in the database")
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    path = None
+    database_url = args.database_url
+    if not database_url:
+        path = tempfile.mktemp(suffix=".db")
+        database_url = f"sqlite:///{path}"
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine, tables=[TranspilerJob.__table__])
+    job_id = f"bench_{os.getpid()}"
+    with engine.begin() as conn:
+        conn.execute(TranspilerJob.__table__.insert().values(
+            id=job_id, user_id=0, language="khasi", code_ref="", status="COMPLETED"
+        ))
+
+    async def run():
+        app, sync_engine, async_engine = build_app(database_url, args.latency, args.pool_size, args.concurrency)
+        try:
+            for name in ("sync", "async"):
+                throughput, latencies = await load(app, f"/{name}/{job_id}", args.requests, args.concurrency)
+                print(f"{name:<6} {throughput:8.1f} req/s   p50 {statistics.median(latencies):7.1f} ms   "
+                      f"max {max(latencies):7.1f} ms")
+        finally:
+            sync_engine.dispose()
+            await async_engine.dispose()
+
+    try:
+        print(f"{args.requests} requests, concurrency {args.concurrency}, {args.latency} ms per query")
+        asyncio.run(run())
+    finally:
+        with engine.begin() as conn:
+            conn.execute(TranspilerJob.__table__.delete().where(TranspilerJob.id == job_id))
+        engine.dispose()
+        if path:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
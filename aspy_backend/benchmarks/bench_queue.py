@@ -0,0 +1,53 @@
+# benchmarks/bench_queue.py
+"""
+Queue backend throughput: LPUSH/RPOP list, reliable list (LMOVE + ack) and
+Redis Streams consumer group (XADD / XREADGROUP COUNT N / XACK).
+
+Needs a running Redis (REDIS_URL). Run from aspy_backend/:
+    python -m benchmarks.bench_queue [jobs]
+"""
+import sys
+import time
+import uuid
+
+from app.services.queue_service import queue_service
+
+PAYLOAD = {"job_id": None, "user_id": 1, "language": "assamese", "priority": "normal"}
+
+
+def run(label, jobs, streams, reliable, batch_size=10):
+    queue_service.use_streams = streams
+    queue_service.reliable = reliable
+    queue_service.batch_size = batch_size
+    queue_name = f"bench:{uuid.uuid4().hex[:8]}"
+
+    start = time.perf_counter()
+    for i in range(jobs):
+        queue_service.enqueue(queue_name, {**PAYLOAD, "job_id": str(i)})
+    enqueued = time.perf_counter()
+
+    done = 0
+    while done < jobs:
+        job = queue_service.dequeue(queue_name)
+        if job is None:
+            break
+        queue_service.ack(job)
+        done += 1
+    finished = time.perf_counter()
+
+    keys = queue_service._keys(queue_name)
+    queue_service.redis.delete(queue_name, *keys.values())
+    print(f"{label:<22} enqueue {jobs / (enqueued - start):9.0f}/s   "
+          f"dequeue+ack {done / (finished - enqueued):9.0f}/s")
+
+
+if __name__ == "__main__":
+    if not queue_service.use_redis:
+        sys.exit("Redis is not reachable; set REDIS_URL")
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"{jobs} jobs each")
+    run("list LPUSH/RPOP", jobs, streams=False, reliable=False)
+    run("list reliable (LMOVE)", jobs, streams=False, reliable=True)
+    run("streams COUNT 1", jobs, streams=True, reliable=True, batch_size=1)
+    run("streams COUNT 10", jobs, streams=True, reliable=True, batch_size=10)
+    run("streams COUNT 100", jobs, streams=True, reliable=True, batch_size=100)
@@ -0,0 +1,54 @@
+# benchmarks/bench_sandbox.py
+"""
+Cold-spawn vs warm-pool execution latency.
+
+Run from aspy_backend/:  python -m benchmarks.bench_sandbox [runs]
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+from app.services.sandbox_pool import SandboxPool
+
+PROGRAM = "total = sum(range(1000))\nprint('Hello from DesiCodes!', total)\n"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(name, samples):
+    print(f"{name:<12} p50 {statistics.median(samples):7.2f} ms   "
+          f"p99 {percentile(samples, 99):7.2f} ms")
+
+
+def bench_cold(runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-I", "-S", "-c", PROGRAM], capture_output=True, check=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def bench_warm(runs):
+    pool = SandboxPool(size=2)
+    pool.start()
+    samples = []
+    try:
+        for _ in range(runs):
+            start = time.perf_counter()
+            pool.run_sync(PROGRAM, None, 5)
+            samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        pool.stop()
+    return samples
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{runs} runs each")
+    report("cold spawn", bench_cold(runs))
+    report("warm pool", bench_warm(runs))
@@ -8,7 +8,10 @@ from app.models.user import User
 from app.models.subscription import Plan, Subscription
 from app.models.invoice import Invoice
 from app.models.code_execution import CodeExecution
-from app.models.transpiler_job import TranspilerJob
+from app.models.transpiler_job import TranspilerJob, JobIdempotencyKey
+from app.models.usage_counter import UsageCounter
+from app.models.usage_rollup import UsageRollup
+from app.models.payload_blob import PayloadBlob
 import os
 from dotenv import load_dotenv
 
@@ -49,6 +52,9 @@ def create_tables():
             tables = [row[0] for row in result.fetchall()]
             print(f"[INFO] Created tables: {', '.join(tables)}")
 
+        # Monthly partitions of job history (Postgres only)
+        create_partitions(engine)
+
         # Create some default plans if they don't exist
         create_default_plans(engine)
 
@@ -60,6 +66,19 @@ def create_tables():
         traceback.print_exc()
         return False
 
+def create_partitions(engine):
+    """Create this month's and the upcoming months' partitions."""
+    from sqlalchemy.orm import sessionmaker
+    from app.services.partition_service import partition_manager
+
+    session = sessionmaker(bind=engine)()
+    try:
+        created = partition_manager.ensure(session)
+        if created:
+            print(f"[OK] Created partitions: {', '.join(created)}")
+    finally:
+        session.close()
+
 def create_default_plans(engine):
     """Create default subscription plans."""
     from sqlalchemy.orm import sessionmaker
@@ -11,6 +11,10 @@ import sys
 import time
 import requests
 import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
 
 # Determine port early so test modules see TEST_BASE_URL during import
 port = int(os.environ.get("TEST_PORT", 0))
@@ -142,3 +146,26 @@ def token(server):
         log = "(could not read uvicorn log)"
 
     raise RuntimeError(f"Could not obtain test token after {max_attempts} attempts. Uvicorn log:\n{log}")
+
+
+@pytest.fixture
+def sqlite_db():
+    """Factory: ``sqlite_db(Model, ...)`` returns a session on a fresh in-memory
+    database holding just those models' tables.
+
+    Use ``session.get_bind()`` for the engine, or ``sessionmaker(bind=...)``
+    for code that opens its own sessions.
+    """
+    sessions = []
+
+    def make(*models):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[model.__table__ for model in models])
+        session = sessionmaker(bind=engine)()
+        sessions.append(session)
+        return session
+
+    yield make
+    for session in sessions:
+        session.close()
+        session.get_bind().dispose()
@@ -0,0 +1,38 @@
+# test_concurrency_service.py
+import time
+
+import pytest
+
+from app.services.concurrency_service import ConcurrencyLimiter
+from app.services.redis_client import get_redis
+
+pytestmark = pytest.mark.skipif(get_redis() is not None, reason="Exercises the in-process fallback")
+
+
+def test_limit_and_release():
+    """At most ``limit`` slots are handed out until one is released"""
+    limiter = ConcurrencyLimiter()
+    first = limiter.acquire("user-1", 2)
+    second = limiter.acquire("user-1", 2)
+
+    assert first and second
+    assert limiter.acquire("user-1", 2) is None
+    assert limiter.acquire("user-2", 2)
+    assert limiter.in_use("user-1") == 2
+
+    limiter.release("user-1", first)
+    assert limiter.acquire("user-1", 2)
+    assert limiter.stats() == {"acquired": 4, "rejected": 1}
+
+
+def test_expired_lease_frees_slot():
+    """A slot whose holder stopped refreshing it is reclaimed"""
+    limiter = ConcurrencyLimiter(lease_seconds=0.1)
+    held = limiter.acquire("user-1", 1)
+    assert limiter.acquire("user-1", 1) is None
+
+    limiter.refresh("user-1", held, lease_seconds=0.2)
+    time.sleep(0.1)
+    assert limiter.acquire("user-1", 1) is None
+    time.sleep(0.15)
+    assert limiter.acquire("user-1", 1)
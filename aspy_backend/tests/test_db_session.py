@@ -0,0 +1,84 @@
+# test_db_session.py
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import event, exc, text
+
+from app.db.session import MeteredQueuePool, async_database_url, create_db_engine, pool_stats
+
+
+class Captured(Exception):
+    pass
+
+
+def capture_connect_params(engine):
+    """Keyword arguments the engine would pass to the driver's connect()"""
+    captured = {}
+
+    @event.listens_for(getattr(engine, "sync_engine", engine), "do_connect")
+    def do_connect(_dialect, _conn_rec, _cargs, cparams):
+        captured.update(cparams)
+        raise Captured()
+
+    return captured
+
+
+def test_pool_configured_from_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "2")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "7")
+    engine = create_db_engine(f"sqlite:///{tmp_path}/pool.db")
+    assert isinstance(engine.pool, MeteredQueuePool)
+    assert engine.pool.size() == 3
+    assert engine.pool._max_overflow == 2
+    assert engine.pool._timeout == 7
+    engine.dispose()
+
+
+def test_postgres_statement_timeout_and_statement_cache(monkeypatch):
+    monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "5000")
+    monkeypatch.setenv("DB_STATEMENT_CACHE_SIZE", "0")
+    url = "postgresql://u:p@localhost/db"
+
+    sync_engine = create_db_engine(url)
+    params = capture_connect_params(sync_engine)
+    with pytest.raises(Captured):
+        sync_engine.connect()
+    assert params["options"] == "-c statement_timeout=5000"
+    assert params["application_name"] == "aspy_backend"
+
+    async_engine = create_db_engine(async_database_url(url), is_async=True)
+    params = capture_connect_params(async_engine)
+    with pytest.raises(Captured):
+        asyncio.run(async_engine.connect().start())
+    assert params["server_settings"]["statement_timeout"] == "5000"
+    assert params["statement_cache_size"] == 0
+    assert params["prepared_statement_cache_size"] == 0
+
+
+def test_pool_stats_count_waits_and_timeouts(monkeypatch, tmp_path):
+    monkeypatch.setenv("DB_POOL_SIZE", "1")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "0.2")
+    engine = create_db_engine(f"sqlite:///{tmp_path}/pool.db")
+
+    held = engine.connect()
+    assert pool_stats(engine)["checked_out"] == 1
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    # A second request waits until the first returns its connection
+    threading.Timer(0.05, held.close).start()
+    with engine.connect() as conn:
+        conn.execute(text("select 1"))
+
+    stats = pool_stats(engine)
+    assert stats["checkouts"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["waits"] >= 1
+    assert stats["max_wait_ms"] >= 40
+
+    # Counters survive dispose(), which swaps in a fresh pool
+    engine.dispose()
+    assert pool_stats(engine)["checkouts"] == 2
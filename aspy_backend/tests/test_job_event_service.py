@@ -0,0 +1,97 @@
+# test_job_event_service.py
+import asyncio
+import threading
+
+import pytest
+
+from app.services import job_event_service
+from app.services.job_event_service import JobEventBroker
+
+
+@pytest.fixture(autouse=True)
+def no_redis(monkeypatch):
+    monkeypatch.setattr(job_event_service, "get_redis", lambda: None)
+
+
+def test_events_reach_subscribers_from_other_threads():
+    broker = JobEventBroker()
+
+    async def run():
+        async with broker.subscribe("job_1") as events:
+            worker = threading.Thread(target=broker.publish, args=("job_1", "processing"))
+            worker.start()
+            event = await asyncio.wait_for(events.get(), 1)
+            worker.join()
+            broker.publish("job_2", "completed")
+            await asyncio.sleep(0)
+            return event, events.qsize()
+
+    event, pending = asyncio.run(run())
+    assert (event["job_id"], event["status"]) == ("job_1", "processing")
+    assert pending == 0
+    assert broker.stats()["subscribers"] == 0
+
+
+def test_slow_subscriber_keeps_the_latest_events():
+    broker = JobEventBroker(queue_size=2)
+
+    async def run():
+        async with broker.subscribe("job_1") as events:
+            for status in ("queued", "processing", "completed"):
+                broker.publish("job_1", status)
+            await asyncio.sleep(0)
+            return [events.get_nowait()["status"] for _ in range(events.qsize())]
+
+    assert asyncio.run(run()) == ["processing", "completed"]
+    assert broker.stats()["dropped"] == 1
+
+
+def test_redis_messages_are_delivered_locally():
+    broker = JobEventBroker()
+
+    async def run():
+        async with broker.subscribe("job_1") as events:
+            broker._on_message({"channel": "job_events:job_1", "data": '{"job_id": "job_1", "status": "failed"}'})
+            broker._on_message({"channel": "job_events:job_1", "data": "not json"})
+            return await asyncio.wait_for(events.get(), 1)
+
+    assert asyncio.run(run())["status"] == "failed"
+
+
+def test_long_poll_wakes_on_completion(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine, update
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from app.core.api.v1 import transpiler
+    from app.db.base import Base
+    from app.models.transpiler_job import JobStatus, TranspilerJob
+
+    path = tmp_path / "jobs.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[TranspilerJob.__table__])
+    with engine.begin() as conn:
+        conn.execute(TranspilerJob.__table__.insert().values(
+            id="job_1", user_id=1, language="khasi", code_ref="", status=JobStatus.QUEUED
+        ))
+    broker = JobEventBroker()
+    monkeypatch.setattr(transpiler, "job_events", broker)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    async def finish_later():
+        await asyncio.sleep(0.2)
+        with engine.begin() as conn:
+            conn.execute(update(TranspilerJob.__table__).values(status=JobStatus.COMPLETED))
+        broker.publish("job_1", "completed")
+
+    async def run():
+        async with async_sessionmaker(async_engine)() as db:
+            finisher = asyncio.create_task(finish_later())
+            started = asyncio.get_running_loop().time()
+            job = await transpiler.wait_for_job(db, "job_1", 5)
+            await finisher
+            return job.status, asyncio.get_running_loop().time() - started
+
+    status, waited = asyncio.run(run())
+    asyncio.run(async_engine.dispose())
+    assert status == JobStatus.COMPLETED
+    assert waited < 2
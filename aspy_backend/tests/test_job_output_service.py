@@ -0,0 +1,90 @@
+# test_job_output_service.py
+import asyncio
+
+import pytest
+
+from app.services import job_event_service, job_output_service
+from app.services.job_event_service import JobEventBroker
+from app.services.job_output_service import JobOutputStreams
+
+
+@pytest.fixture(autouse=True)
+def broker(monkeypatch):
+    monkeypatch.setattr(job_event_service, "get_redis", lambda: None)
+    monkeypatch.setattr(job_output_service, "get_redis", lambda: None)
+    broker = JobEventBroker()
+    monkeypatch.setattr(job_output_service, "job_events", broker)
+    return broker
+
+
+def test_ring_keeps_the_latest_chunks_of_the_current_run(broker):
+    output = JobOutputStreams(buffer_chunks=2)
+
+    async def run():
+        async with broker.subscribe("job_1") as events:
+            write = output.writer("job_1")
+            for text in ("a\n", "b\n", "c\n"):
+                write("stdout", text)
+            await asyncio.sleep(0)
+            return [events.get_nowait() for _ in range(events.qsize())]
+
+    events = asyncio.run(run())
+    assert [(event["seq"], event["data"]) for event in events] == [(1, "a\n"), (2, "b\n"), (3, "c\n")]
+    assert [chunk["data"] for chunk in output.backlog("job_1")] == ["b\n", "c\n"]
+
+    # A new run starts from an empty buffer
+    output.writer("job_1")("stderr", "x\n")
+    assert output.backlog("job_1") == [{"seq": 1, "stream": "stderr", "data": "x\n"}]
+    output.clear("job_1")
+    assert output.backlog("job_1") == []
+
+
+def test_watch_sends_backlog_then_live_output_once(tmp_path, monkeypatch, broker):
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from app.core.api.v1 import transpiler
+    from app.db.base import Base
+    from app.models.transpiler_job import JobStatus, TranspilerJob
+
+    path = tmp_path / "jobs.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[TranspilerJob.__table__])
+    with engine.begin() as conn:
+        conn.execute(TranspilerJob.__table__.insert().values(
+            id="job_1", user_id=1, language="khasi", code_ref="", status=JobStatus.PROCESSING
+        ))
+    output = JobOutputStreams()
+    monkeypatch.setattr(transpiler, "job_events", broker)
+    monkeypatch.setattr(transpiler, "job_output", output)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    write = output.writer("job_1")
+    write("stdout", "one\n")
+    read_backlog = output.backlog
+
+    def backlog(job_id):
+        # Published between subscribing and reading the buffer: arrives both ways
+        write("stdout", "two\n")
+        return read_backlog(job_id)
+
+    monkeypatch.setattr(output, "backlog", backlog)
+
+    async def run():
+        received = []
+        async with async_sessionmaker(async_engine)() as db:
+            async for name, data in transpiler.watch_job(db, "job_1"):
+                received.append((name, getattr(data, "data", None)))
+                if name == "output" and data.seq == 2:
+                    write("stderr", "three\n")
+                if name == "output" and data.seq == 3:
+                    broker.publish("job_1", "completed")
+                    with engine.begin() as conn:
+                        conn.execute(TranspilerJob.__table__.update().values(status=JobStatus.COMPLETED))
+        return received
+
+    received = asyncio.run(asyncio.wait_for(run(), 5))
+    asyncio.run(async_engine.dispose())
+    assert received == [
+        ("status", None), ("output", "one\n"), ("output", "two\n"), ("output", "three\n"), ("status", None), ("result", None)
+    ]
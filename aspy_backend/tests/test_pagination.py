@@ -0,0 +1,75 @@
+# test_pagination.py
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import select
+
+from app.core import pagination
+from app.core.pagination import count_query, decode_cursor, encode_cursor, paginate, split_page, total_info
+from app.models.transpiler_job import TranspilerJob
+
+START = datetime(2026, 3, 1, 12, 0)
+
+
+@pytest.fixture
+def db(sqlite_db):
+    session = sqlite_db(TranspilerJob)
+    # Pairs of jobs share a timestamp, so pages must break ties on id
+    session.add_all([
+        TranspilerJob(id=f"job_{n:02d}", user_id=1, language="khasi", code_ref="",
+                      submitted_at=START + timedelta(minutes=n // 2))
+        for n in range(25)
+    ] + [TranspilerJob(id="job_other", user_id=2, language="khasi", code_ref="", submitted_at=START)])
+    session.commit()
+    return session
+
+
+def list_page(db, cursor, limit, response=None):
+    query = select(TranspilerJob).where(TranspilerJob.user_id == 1)
+    rows = db.execute(paginate(query, TranspilerJob.submitted_at, TranspilerJob.id, cursor, limit)).scalars().all()
+    return split_page(rows, limit, "submitted_at", response=response)
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(START, "job_01")
+    assert "job_01" not in cursor  # opaque to clients
+    assert decode_cursor(cursor) == (START, "job_01")
+    assert decode_cursor(encode_cursor(START, 42)) == (START, 42)
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", encode_cursor(START, 1)[:-3], "W10"])
+def test_invalid_cursor_is_a_client_error(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_pages_cover_every_row_once_newest_first(db):
+    seen, cursor, pages = [], None, 0
+    while True:
+        response = Response()
+        rows, cursor = list_page(db, cursor, 7, response)
+        seen += [row.id for row in rows]
+        pages += 1
+        assert response.headers.get("X-Next-Cursor") == cursor
+        if cursor is None:
+            break
+
+    assert pages == 4
+    assert seen == [f"job_{n:02d}" for n in reversed(range(25))]
+
+
+def test_rows_inserted_meanwhile_do_not_shift_later_pages(db):
+    first, cursor = list_page(db, None, 5)
+    db.add(TranspilerJob(id="job_new", user_id=1, language="khasi", code_ref="", submitted_at=START + timedelta(days=1)))
+    db.commit()
+    second, _ = list_page(db, cursor, 5)
+    assert [row.id for row in second] == [f"job_{n:02d}" for n in range(19, 14, -1)]
+
+
+def test_total_is_capped(db, monkeypatch):
+    query = select(TranspilerJob).where(TranspilerJob.user_id == 1)
+    assert total_info(db.scalar(count_query(query))) == {"total": 25, "total_is_exact": True}
+    monkeypatch.setattr(pagination, "COUNT_LIMIT", 10)
+    assert total_info(db.scalar(count_query(query))) == {"total": 10, "total_is_exact": False}
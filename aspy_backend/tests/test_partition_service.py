@@ -0,0 +1,88 @@
+# test_partition_service.py
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.payload_blob import PayloadBlob
+from app.models.transpiler_job import JobIdempotencyKey
+from app.services.partition_service import (
+    PartitionManager, add_months, job_filter, job_month, month_start, new_job_id, partition_month, partition_name,
+    read_archive, write_archive
+)
+from app.services.payload_service import PayloadStore
+
+NOW = datetime(2026, 10, 17, 12, 30, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db(sqlite_db):
+    return sqlite_db(JobIdempotencyKey, PayloadBlob)
+
+
+def test_month_arithmetic_and_names():
+    assert month_start(NOW) == datetime(2026, 10, 1, tzinfo=timezone.utc)
+    assert add_months(month_start(NOW), 3) == datetime(2027, 1, 1, tzinfo=timezone.utc)
+    assert add_months(month_start(NOW), -10) == datetime(2025, 12, 1, tzinfo=timezone.utc)
+    name = partition_name("transpiler_jobs", datetime(2025, 12, 1))
+    assert name == "transpiler_jobs_p2025_12"
+    assert partition_month("transpiler_jobs", name) == datetime(2025, 12, 1, tzinfo=timezone.utc)
+    assert partition_month("transpiler_jobs", "transpiler_jobs_default") is None
+    assert partition_month("code_executions", name) is None
+
+
+def test_job_ids_name_their_partition():
+    job_id = new_job_id(datetime(2026, 10, 31, 23, 59))
+    assert job_id.startswith("job_202610_")
+    assert job_month(job_id) == datetime(2026, 10, 1, tzinfo=timezone.utc)
+    # The queued submitted_at wins; ids from before months were encoded carry none
+    assert job_month("job_0123456789ab", "2026-09-30T10:00:00") == datetime(2026, 9, 1, tzinfo=timezone.utc)
+    assert job_month("job_0123456789ab") is None
+    assert job_month("job_209913_0123456789ab") is None
+
+    bounded = str(job_filter(job_id).compile(compile_kwargs={"literal_binds": True}))
+    assert "submitted_at >= '2026-10-01" in bounded and "submitted_at < '2026-11-01" in bounded
+    assert "submitted_at" not in str(job_filter("job_0123456789ab"))
+
+
+def test_wanted_and_due_partitions():
+    manager = PartitionManager(months_ahead=2, retention_months=12)
+    assert [f"{month:%Y-%m}" for month in manager.wanted(NOW)] == ["2026-10", "2026-11", "2026-12"]
+    names = ["transpiler_jobs_default", "transpiler_jobs_p2025_11", "transpiler_jobs_p2025_09",
+             "transpiler_jobs_p2025_10", "transpiler_jobs_p2026_10"]
+    # The current month plus the twelve before it are kept
+    assert manager.due("transpiler_jobs", names, NOW) == ["transpiler_jobs_p2025_09"]
+
+
+def test_archive_round_trip(tmp_path):
+    rows = [{"id": f"job_{n}", "submitted_at": NOW, "meta": {"n": n}, "code": "ক = 1"} for n in range(3)]
+    path = str(tmp_path / "transpiler_jobs" / "transpiler_jobs_p2025_09.jsonl.gz")
+    assert write_archive(path, rows) == 3
+    assert list(read_archive(path)) == [{**row, "submitted_at": str(NOW)} for row in rows]
+    assert [p.name for p in (tmp_path / "transpiler_jobs").iterdir()] == ["transpiler_jobs_p2025_09.jsonl.gz"]
+
+
+def test_partitioning_is_a_no_op_off_postgres(db, tmp_path):
+    manager = PartitionManager(archive_dir=str(tmp_path))
+    assert manager.ensure(db, NOW) == []
+    assert manager.archive(db, NOW) == {}
+
+
+def test_prune_drops_expired_keys_and_unused_blobs(db):
+    manager = PartitionManager(retention_months=12)
+    old, recent = NOW - timedelta(days=400), NOW - timedelta(days=30)
+    db.add_all([
+        JobIdempotencyKey(user_id=1, idempotency_key="old", job_id="job_1", submitted_at=old),
+        JobIdempotencyKey(user_id=1, idempotency_key="new", job_id="job_2", submitted_at=recent),
+    ])
+    store = PayloadStore()
+    stale, live = store.encode("print(1)"), store.encode("print(2)")
+    stale.used_at, live.used_at = old, recent
+    db.add_all([stale, live])
+    db.commit()
+
+    assert manager.prune(db, NOW, dry_run=True) == {"idempotency_keys": 1, "payload_blobs": 1}
+    assert manager.prune(db, NOW) == {"idempotency_keys": 1, "payload_blobs": 1}
+    assert db.scalars(select(JobIdempotencyKey.idempotency_key)).all() == ["new"]
+    assert db.scalars(select(PayloadBlob.hash)).all() == [live.hash]
+    assert db.scalar(select(func.count()).select_from(PayloadBlob)) == 1
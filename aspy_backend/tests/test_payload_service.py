@@ -0,0 +1,70 @@
+# test_payload_service.py
+import pytest
+from sqlalchemy import event, func, select
+
+from app.models.payload_blob import PayloadBlob
+from app.models.transpiler_job import TranspilerJob
+from app.services.payload_service import PayloadStore
+
+OUTPUT = "নমস্কাৰ\n" * 500
+
+
+@pytest.fixture
+def db(sqlite_db):
+    return sqlite_db(TranspilerJob, PayloadBlob)
+
+
+@pytest.fixture
+def engine(db):
+    engine = db.get_bind()
+    engine.blob_reads = 0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(_conn, _cursor, statement, *_args):
+        if statement.startswith("SELECT") and "payload_blobs" in statement:
+            engine.blob_reads += 1
+
+    return engine
+
+
+def test_round_trip_compresses_large_payloads():
+    store = PayloadStore()
+    small, large = store.encode("print(1)"), store.encode(OUTPUT)
+    assert small.codec == "raw"
+    assert large.codec == "zlib" and len(large.data) < large.size / 10
+    assert store.decode(large) == OUTPUT
+
+
+def test_identical_payloads_are_stored_once(db):
+    store = PayloadStore()
+    for n in range(3):
+        job = TranspilerJob(id=f"job_{n}", user_id=1, language="khasi")
+        store.save_job(db, job, code="pynpaw('hi')", execution_output=OUTPUT, errors=None)
+        db.add(job)
+    db.commit()
+
+    assert db.scalar(select(func.count()).select_from(PayloadBlob)) == 2
+    job = db.get(TranspilerJob, "job_2")
+    assert job.errors_ref is None
+    assert job.output_preview == OUTPUT[:100] + "..."
+
+
+def test_load_reads_only_requested_payloads_and_caches_them(engine, db):
+    store = PayloadStore()
+    job = TranspilerJob(id="job_1", user_id=1, language="khasi")
+    store.save_job(db, job, code="pynpaw('hi')", execution_output=OUTPUT, logs="")
+    db.add(job)
+    db.commit()
+
+    reader = PayloadStore()  # another process: nothing cached yet
+    assert reader.load_job(db, job, "code") == {"code": "pynpaw('hi')"}
+    assert engine.blob_reads == 1
+
+    payloads = reader.load_job(db, job)
+    assert payloads == {
+        "code": "pynpaw('hi')", "transpiled_code": None, "execution_output": OUTPUT, "errors": None, "logs": ""
+    }
+    assert engine.blob_reads == 2  # code came from the cache; output and logs in one query
+
+    reader.load_job(db, job)
+    assert engine.blob_reads == 2
@@ -0,0 +1,74 @@
+# test_plan_service.py
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.db import session as db_session
+from app.models.subscription import Plan, PlanType
+from app.services.plan_service import PlanCatalog
+
+
+@pytest.fixture
+def Session(monkeypatch, sqlite_db):
+    db = sqlite_db(Plan)
+    factory = sessionmaker(bind=db.get_bind())
+    monkeypatch.setattr(db_session, "SessionLocal", factory)
+    db.add_all([
+        Plan(name="Free", type=PlanType.FREE, price=0, monthly_executions=10),
+        Plan(name="Pro", type=PlanType.PRO, price=299, monthly_executions=100),
+    ])
+    db.commit()
+    return factory
+
+
+def test_lookups_served_from_memory(Session):
+    catalog = PlanCatalog(ttl=60)
+    catalog.load()
+
+    pro = catalog.by_name("pro")
+    assert pro.monthly_executions == 100
+    assert catalog.get(pro.id) is pro
+    assert catalog.get(str(pro.id)) is pro
+    assert catalog.by_type("free").name == "Free"
+    assert catalog.loads == 1
+    assert catalog.hits == 4
+
+
+def test_plan_change_invalidates_and_changes_etag(Session, monkeypatch):
+    from app.services import plan_service
+
+    catalog = PlanCatalog(ttl=60)
+    monkeypatch.setattr(plan_service, "plan_catalog", catalog)
+    listing, etag = catalog.listing()
+    assert [plan["name"] for plan in listing] == ["Free", "Pro"]
+
+    db = Session()
+    db.query(Plan).filter(Plan.name == "Pro").first().monthly_executions = 200
+    db.commit()
+    db.close()
+
+    assert catalog.invalidations == 1
+    assert catalog.by_name("Pro").monthly_executions == 200
+    assert catalog.listing()[1] != etag
+
+
+def test_unknown_ids_do_not_reload_on_every_lookup(Session, monkeypatch):
+    from app.services import plan_service
+
+    catalog = PlanCatalog(ttl=60)
+    catalog.load()
+    monkeypatch.setattr(plan_service, "MISS_RELOAD_INTERVAL", 0)
+
+    assert catalog.get(999) is None
+    assert catalog.loads == 2
+    for _ in range(10):
+        assert catalog.get(999) is None
+    assert catalog.loads == 2
+
+    # A plan created elsewhere is still found by a later miss-triggered reload
+    db = Session()
+    db.add(Plan(name="Team", type=PlanType.TEAM, price=999, monthly_executions=1000))
+    db.commit()
+    team_id = db.query(Plan).filter(Plan.name == "Team").one().id
+    db.close()
+    assert catalog.get(team_id).name == "Team"
+    assert catalog.loads == 3
@@ -0,0 +1,181 @@
+# test_query_plans.py
+"""EXPLAIN the per-user hot queries and fail if one stops using an index.
+
+Runs against a seeded in-memory SQLite database. Set QUERY_PLAN_DATABASE_URL
+to a Postgres database to check its planner too; everything there happens in
+one transaction that is rolled back, and sequential scans are disabled so a
+plan only falls back to one when no usable index exists.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+
+from app.core.pagination import count_query, encode_cursor, paginate
+from app.db.base import Base
+from app.models.code_execution import CodeExecution
+from app.models.invoice import Invoice
+from app.models.subscription import Subscription, SubscriptionStatus
+from app.models.transpiler_job import JobIdempotencyKey, JobStatus, TranspilerJob
+from app.models.usage_rollup import UsageRollup
+from app.services.partition_service import job_filter
+
+TABLES = [
+    TranspilerJob.__table__, JobIdempotencyKey.__table__, CodeExecution.__table__,
+    Subscription.__table__, Invoice.__table__, UsageRollup.__table__
+]
+MONTH_START = datetime(2026, 3, 1)
+
+LAST_SEEN = encode_cursor(MONTH_START, "job_7_20")
+
+HOT_QUERIES = {
+    "job_history": paginate(
+        select(TranspilerJob).where(TranspilerJob.user_id == 7),
+        TranspilerJob.submitted_at, TranspilerJob.id, None, 20),
+    "job_history_next_page": paginate(
+        select(TranspilerJob).where(TranspilerJob.user_id == 7),
+        TranspilerJob.submitted_at, TranspilerJob.id, LAST_SEEN, 20),
+    "job_history_by_status": paginate(
+        select(TranspilerJob).where(TranspilerJob.user_id == 7, TranspilerJob.status == JobStatus.COMPLETED),
+        TranspilerJob.submitted_at, TranspilerJob.id, LAST_SEEN, 20),
+    "jobs_total": count_query(select(TranspilerJob).where(TranspilerJob.user_id == 7)),
+    "jobs_this_month": select(func.count(TranspilerJob.id))
+    .where(TranspilerJob.user_id == 7, TranspilerJob.submitted_at >= MONTH_START),
+    "idempotency_lookup": select(JobIdempotencyKey)
+    .where(JobIdempotencyKey.user_id == 7, JobIdempotencyKey.idempotency_key == "key-7-3"),
+    "job_by_id": select(TranspilerJob).where(job_filter("job_7_3", MONTH_START)),
+    "idempotent_job": select(TranspilerJob)
+    .where(TranspilerJob.id == "job_7_3", TranspilerJob.submitted_at == MONTH_START),
+    "execution_history": paginate(
+        select(CodeExecution).where(CodeExecution.user_id == 7),
+        CodeExecution.created_at, CodeExecution.id, encode_cursor(MONTH_START, 300), 20),
+    "executions_this_month": select(func.count(CodeExecution.id))
+    .where(CodeExecution.user_id == 7, CodeExecution.created_at >= MONTH_START),
+    "usage_summary": select(func.sum(UsageRollup.executions), func.sum(UsageRollup.successes))
+    .where(UsageRollup.user_id == 7),
+    "active_subscription": select(Subscription)
+    .where(Subscription.user_id == 7, Subscription.status == SubscriptionStatus.ACTIVE),
+    "invoice_history": paginate(
+        select(Invoice).where(Invoice.user_id == 7),
+        Invoice.created_at, Invoice.id, encode_cursor(MONTH_START, 20), 50),
+}
+
+
+def seed(conn, users=50, per_user=40):
+    start = MONTH_START - timedelta(days=60)
+    jobs, keys, executions, rollups, subscriptions, invoices = [], [], [], [], [], []
+    for user_id in range(1, users + 1):
+        for n in range(per_user):
+            at = start + timedelta(hours=n * 36 + user_id)
+            jobs.append(dict(
+                id=f"job_{user_id}_{n}", user_id=user_id, language="khasi", code_ref="", submitted_at=at,
+                status=list(JobStatus)[n % len(JobStatus)],
+                idempotency_key=f"key-{user_id}-{n}" if n % 2 else None
+            ))
+            if n % 2:
+                keys.append(dict(
+                    user_id=user_id, idempotency_key=f"key-{user_id}-{n}", job_id=f"job_{user_id}_{n}", submitted_at=at
+                ))
+            rollups.append(dict(
+                user_id=user_id, day=at.date(), language="khasi", executions=2, successes=1, execution_ms=300
+            ))
+            executions.append(dict(
+                id=len(executions) + 1, user_id=user_id, execution_id=f"exec_{user_id}_{n}", language="khasi", created_at=at
+            ))
+        for n in range(3):
+            subscriptions.append(dict(
+                user_id=user_id, plan_id=1,
+                status=SubscriptionStatus.ACTIVE if n == 2 else SubscriptionStatus.CANCELLED
+            ))
+            invoices.append(dict(user_id=user_id, amount=100, created_at=start + timedelta(days=30 * n)))
+    conn.execute(TranspilerJob.__table__.insert(), jobs)
+    conn.execute(JobIdempotencyKey.__table__.insert(), keys)
+    conn.execute(CodeExecution.__table__.insert(), executions)
+    conn.execute(Subscription.__table__.insert(), subscriptions)
+    conn.execute(Invoice.__table__.insert(), invoices)
+    conn.execute(UsageRollup.__table__.insert(), rollups)
+    conn.exec_driver_sql("ANALYZE")
+
+
+def database_urls():
+    urls = ["sqlite://"]
+    if os.getenv("QUERY_PLAN_DATABASE_URL"):
+        urls.append(os.getenv("QUERY_PLAN_DATABASE_URL"))
+    return urls
+
+
+@pytest.fixture(scope="module", params=database_urls(), ids=lambda url: url.split(":")[0])
+def conn(request):
+    engine = create_engine(request.param)
+    postgres = engine.dialect.name == "postgresql"
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def explain(connection, _cursor, statement, parameters, _context, _executemany):
+        if connection.info.get("explain"):
+            prefix = "EXPLAIN (FORMAT JSON) " if postgres else "EXPLAIN QUERY PLAN "
+            statement = prefix + statement
+        return statement, parameters
+
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        Base.metadata.create_all(connection, tables=TABLES)
+        seed(connection)
+        if postgres:
+            connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        yield connection
+        transaction.rollback()
+    engine.dispose()
+
+
+def explain(conn, statement):
+    """Plan steps as (operation, detail) pairs"""
+    conn.info["explain"] = True
+    try:
+        rows = conn.execute(statement).cursor.fetchall()
+    finally:
+        conn.info["explain"] = False
+
+    if conn.dialect.name == "sqlite":
+        return [(row[3].split(" ")[0], row[3]) for row in rows]
+
+    plan = rows[0][0]
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    steps, nodes = [], [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        steps.append((node["Node Type"], node.get("Relation Name", "")))
+        nodes.extend(node.get("Plans", []))
+    return steps
+
+
+@pytest.mark.parametrize("name", list(HOT_QUERIES))
+def test_hot_query_uses_an_index(conn, name):
+    steps = explain(conn, HOT_QUERIES[name])
+    # SQLite: SCAN reads a whole table (or index), a temp B-tree sorts; Postgres: same in node types.
+    # Scanning a subquery's own rows (a capped count) is fine.
+    tables = {table.name for table in TABLES}
+    degraded = [
+        detail or operation for operation, detail in steps
+        if (operation == "SCAN" and detail.split(" ")[1] in tables)
+        or operation in ("Seq Scan", "Sort") or "TEMP B-TREE" in detail
+    ]
+    assert not degraded, f"{name} no longer uses an index: {steps}"
+
+
+def test_idempotency_key_is_unique_per_user(conn):
+    transaction = conn.begin_nested()
+    try:
+        with pytest.raises(Exception, match="(?i)unique"):
+            conn.execute(JobIdempotencyKey.__table__.insert().values(
+                user_id=7, idempotency_key="key-7-3", job_id="job_dup", submitted_at=MONTH_START
+            ))
+    finally:
+        transaction.rollback()
+    # Keys are scoped per user
+    with conn.begin_nested() as transaction:
+        conn.execute(JobIdempotencyKey.__table__.insert().values(
+            user_id=8000, idempotency_key="key-7-3", job_id="job_other_user", submitted_at=MONTH_START
+        ))
+        transaction.rollback()
@@ -0,0 +1,317 @@
+# test_queue_service.py
+import asyncio
+import os
+import threading
+import time
+from unittest import mock
+
+import pytest
+import redis
+
+from app.services.queue_service import QueueService
+
+
+def new_queue_service(client=None, **env) -> QueueService:
+    """A fresh QueueService (the class is a singleton) on ``client``, or in memory without one"""
+    def connect(*args, **kwargs):
+        if client is None:
+            raise redis.ConnectionError("no Redis in this test")
+        return client
+
+    with mock.patch.object(redis.Redis, "from_url", connect), mock.patch.dict(os.environ, env):
+        service = object.__new__(QueueService)
+        service._init_queue()
+    return service
+
+
+queue_service = new_queue_service()
+
+
+@pytest.fixture
+def fake_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+
+
+def test_blocking_dequeue_wakes_on_enqueue():
+    """A waiting consumer picks up a job as soon as it is enqueued"""
+    async def scenario():
+        consumer = asyncio.create_task(queue_service.dequeue_async("test_wake", timeout=5))
+        await asyncio.sleep(0.05)
+        enqueued_at = time.perf_counter()
+        queue_service.enqueue("test_wake", {"job_id": "wake"})
+        job = await consumer
+        return job, time.perf_counter() - enqueued_at
+
+    job, latency = asyncio.run(scenario())
+    assert job["job_id"] == "wake"
+    assert latency < 0.01
+
+
+def test_enqueue_from_another_thread():
+    """Producers outside the consumer's event loop still wake it"""
+    async def scenario():
+        consumer = asyncio.create_task(queue_service.dequeue_async("test_thread", timeout=5))
+        await asyncio.sleep(0.05)
+        threading.Thread(target=queue_service.enqueue, args=("test_thread", {"job_id": "t"})).start()
+        return await consumer
+
+    assert asyncio.run(scenario())["job_id"] == "t"
+
+
+def test_idle_dequeue_times_out():
+    """An empty queue returns None after the timeout"""
+    start = time.perf_counter()
+    assert asyncio.run(queue_service.dequeue_async("test_idle", timeout=1)) is None
+    assert 0.9 < time.perf_counter() - start < 1.5
+
+
+def test_queues_are_independent():
+    """Jobs only come out of the queue they were put on"""
+    queue_service.enqueue("test_a", {"job_id": "a"})
+    assert queue_service.dequeue("test_b") is None
+    assert queue_service.get_queue_length("test_a") == 1
+    assert queue_service.dequeue("test_a")["job_id"] == "a"
+
+
+def test_unacked_job_redelivered_after_lease_expires(monkeypatch):
+    """A job whose worker died is requeued by the reaper; acked jobs are not"""
+    monkeypatch.setattr(queue_service, "visibility_timeout", 0.1)
+    queue_service.enqueue("test_lease", {"job_id": "crashed"})
+    queue_service.enqueue("test_lease", {"job_id": "done"})
+
+    crashed = queue_service.dequeue("test_lease")
+    done = queue_service.dequeue("test_lease")
+    assert queue_service.ack(done)
+    assert queue_service.get_inflight_count("test_lease") == 1
+
+    assert queue_service.requeue_expired("test_lease")["requeued"] == 0
+    time.sleep(0.15)
+    assert queue_service.requeue_expired("test_lease")["requeued"] == 1
+
+    redelivered = queue_service.dequeue("test_lease")
+    assert redelivered["job_id"] == crashed["job_id"]
+    assert queue_service.dequeue("test_lease") is None
+    queue_service.ack(redelivered)
+
+
+def test_heartbeat_keeps_lease(monkeypatch):
+    """Extending the lease stops the reaper from taking the job back"""
+    monkeypatch.setattr(queue_service, "visibility_timeout", 0.2)
+    queue_service.enqueue("test_heartbeat", {"job_id": "slow"})
+    job = queue_service.dequeue("test_heartbeat")
+    for _ in range(3):
+        time.sleep(0.1)
+        assert queue_service.extend_lease(job)
+        assert queue_service.requeue_expired("test_heartbeat")["requeued"] == 0
+    assert queue_service.ack(job)
+    assert not queue_service.extend_lease(job)
+
+
+def test_poison_job_dead_lettered(monkeypatch):
+    """A job that keeps expiring is dead-lettered after max_deliveries"""
+    monkeypatch.setattr(queue_service, "visibility_timeout", 0.05)
+    monkeypatch.setattr(queue_service, "max_deliveries", 2)
+    queue_service.enqueue("test_poison", {"job_id": "poison"})
+
+    queue_service.dequeue("test_poison")
+    time.sleep(0.06)
+    assert queue_service.requeue_expired("test_poison")["requeued"] == 1
+    queue_service.dequeue("test_poison")
+    time.sleep(0.06)
+    result = queue_service.requeue_expired("test_poison")
+    assert [job["job_id"] for job in result["dead"]] == ["poison"]
+    assert queue_service.stats("test_poison")["dead_lettered"] == 1
+
+
+def test_weighted_fair_lanes():
+    """Busy lanes are served in proportion to their weights"""
+    for lane in queue_service.lane_weights:
+        for i in range(50):
+            queue_service.enqueue("test_fair", {"job_id": f"{lane}-{i}"}, lane=lane)
+
+    picks = [queue_service.dequeue_fair("test_fair")["job_id"].split("-")[0] for _ in range(19 * 2)]
+    for lane, weight in queue_service.lane_weights.items():
+        assert picks.count(lane) == weight * 2
+
+
+def test_paid_lane_not_starved_by_free_burst():
+    """A pro job submitted behind a free-tier burst is picked up almost immediately"""
+    for i in range(200):
+        queue_service.enqueue("test_burst", {"job_id": f"free-{i}"}, lane="free")
+    queue_service.enqueue("test_burst", {"job_id": "pro-0"}, lane="pro")
+    queue_service.enqueue("test_burst", {"job_id": "unknown-plan"}, lane="enterprise")
+
+    picks = [queue_service.dequeue_fair("test_burst")["job_id"] for _ in range(3)]
+    assert "pro-0" in picks
+    stats = queue_service.lane_stats("test_burst")
+    assert stats["free"]["pending"] == 199
+    assert stats["pro"]["wait_samples"] == 1
+    assert stats["pro"]["wait_p99_ms"] is not None
+
+
+def test_fair_dequeue_wakes_on_any_lane():
+    """A consumer blocked on all lanes wakes when any lane gets a job"""
+    async def scenario():
+        consumer = asyncio.create_task(queue_service.dequeue_fair_async("test_lane_wake", timeout=5))
+        await asyncio.sleep(0.05)
+        enqueued_at = time.perf_counter()
+        queue_service.enqueue("test_lane_wake", {"job_id": "team-job"}, lane="team")
+        job = await consumer
+        return job, time.perf_counter() - enqueued_at
+
+    job, latency = asyncio.run(scenario())
+    assert job["job_id"] == "team-job"
+    assert latency < 0.01
+
+
+def test_redis_crashed_worker_job_redelivered(fake_redis):
+    """BLMOVE leases a job; if its worker dies, the reaper hands it to another worker"""
+    crashed_worker = new_queue_service(fake_redis, QUEUE_VISIBILITY_TIMEOUT="0.1")
+    keys = crashed_worker._keys("jobs")
+    crashed_worker.enqueue("jobs", {"job_id": "crashed"})
+    crashed_worker.enqueue("jobs", {"job_id": "done"})
+
+    crashed = crashed_worker.dequeue("jobs")
+    done = crashed_worker.dequeue("jobs")
+    assert fake_redis.llen(keys["processing"]) == 2
+    assert fake_redis.zcard(keys["leases"]) == 2
+    assert crashed_worker.ack(done)
+    assert fake_redis.llen(keys["processing"]) == 1
+
+    other_worker = new_queue_service(fake_redis, QUEUE_VISIBILITY_TIMEOUT="0.1")
+    assert other_worker.requeue_expired("jobs")["requeued"] == 0
+    time.sleep(0.15)
+    assert other_worker.requeue_expired("jobs")["requeued"] == 1
+    assert fake_redis.zcard(keys["leases"]) == 0
+
+    redelivered = other_worker.dequeue("jobs")
+    assert redelivered["job_id"] == crashed["job_id"]
+    assert other_worker.dequeue("jobs") is None
+    assert other_worker.ack(redelivered)
+    assert fake_redis.llen(keys["processing"]) == 0
+    assert fake_redis.zcard(keys["leases"]) == 0
+
+
+def test_redis_heartbeat_keeps_lease(fake_redis):
+    """Extending the lease holds off the reaper; a lease the reaper took is not resurrected"""
+    service = new_queue_service(fake_redis, QUEUE_VISIBILITY_TIMEOUT="0.2")
+    service.enqueue("jobs", {"job_id": "slow"})
+    job = service.dequeue("jobs")
+    for _ in range(3):
+        time.sleep(0.1)
+        assert service.extend_lease(job)
+        assert service.requeue_expired("jobs")["requeued"] == 0
+
+    time.sleep(0.25)
+    assert service.requeue_expired("jobs")["requeued"] == 1
+    assert not service.extend_lease(job)
+
+
+def test_redis_poison_job_dead_lettered(fake_redis):
+    """A job whose lease keeps expiring moves to the dead-letter list after max_deliveries"""
+    service = new_queue_service(fake_redis, QUEUE_VISIBILITY_TIMEOUT="0.05", QUEUE_MAX_DELIVERIES="2")
+    service.enqueue("jobs", {"job_id": "poison"})
+
+    service.dequeue("jobs")
+    time.sleep(0.06)
+    assert service.requeue_expired("jobs")["requeued"] == 1
+    service.dequeue("jobs")
+    time.sleep(0.06)
+    result = service.requeue_expired("jobs")
+    assert result["requeued"] == 0
+    assert [job["job_id"] for job in result["dead"]] == ["poison"]
+    assert service.stats("jobs")["dead_lettered"] == 1
+    assert service.dequeue("jobs") is None
+
+
+def test_stream_batch_read_and_ack(fake_redis):
+    """XREADGROUP fetches a batch into the buffer; ack removes the entry with XACK and XDEL"""
+    service = new_queue_service(fake_redis, QUEUE_BACKEND="streams", QUEUE_BATCH_SIZE="3")
+    stream = service._keys("jobs")["stream"]
+    for i in range(5):
+        service.enqueue("jobs", {"job_id": str(i)})
+
+    first = service.dequeue("jobs")
+    assert first["job_id"] == "0"
+    assert len(service._stream_buffers["jobs"]) == 2
+    assert service.get_inflight_count("jobs") == 3
+    assert service.ack(first)
+    assert fake_redis.xlen(stream) == 4
+    assert service.get_inflight_count("jobs") == 2
+
+    rest = [service.dequeue("jobs") for _ in range(4)]
+    assert [job["job_id"] for job in rest] == ["1", "2", "3", "4"]
+    assert service.dequeue("jobs") is None
+    for job in rest:
+        assert service.ack(job)
+    assert fake_redis.xlen(stream) == 0
+    assert service.get_inflight_count("jobs") == 0
+
+
+def test_stream_crashed_consumer_entry_reclaimed(fake_redis):
+    """XAUTOCLAIM gives an entry whose consumer stopped heartbeating to another consumer"""
+    crashed_worker = new_queue_service(fake_redis, QUEUE_BACKEND="streams", QUEUE_VISIBILITY_TIMEOUT="0.05")
+    other_worker = new_queue_service(fake_redis, QUEUE_BACKEND="streams", QUEUE_VISIBILITY_TIMEOUT="0.05")
+    other_worker.stream_consumer = "other"
+    crashed_worker.enqueue("jobs", {"job_id": "crashed"})
+    crashed = crashed_worker.dequeue("jobs")
+
+    assert other_worker.requeue_expired("jobs")["requeued"] == 0
+    time.sleep(0.06)
+    assert other_worker.requeue_expired("jobs")["requeued"] == 1
+    assert not crashed_worker.extend_lease(crashed)
+
+    redelivered = other_worker.dequeue("jobs")
+    assert redelivered["job_id"] == "crashed"
+    assert other_worker.ack(redelivered)
+    assert other_worker.get_inflight_count("jobs") == 0
+
+
+def test_stream_poison_entry_dead_lettered(fake_redis):
+    """An entry claimed more than max_deliveries times is acked and dead-lettered"""
+    service = new_queue_service(
+        fake_redis, QUEUE_BACKEND="streams", QUEUE_VISIBILITY_TIMEOUT="0.05", QUEUE_MAX_DELIVERIES="1"
+    )
+    service.enqueue("jobs", {"job_id": "poison"})
+    service.dequeue("jobs")
+    time.sleep(0.06)
+
+    result = service.requeue_expired("jobs")
+    assert [job["job_id"] for job in result["dead"]] == ["poison"]
+    assert service.stats("jobs")["dead_lettered"] == 1
+    assert service.get_inflight_count("jobs") == 0
+    assert service.dequeue("jobs") is None
+
+
+@pytest.mark.parametrize("backend", ["list", "streams"])
+def test_deferred_job_returns_to_its_lane(fake_redis, backend):
+    """defer acks the job and parks it; promote_delayed puts it back on the same lane"""
+    service = new_queue_service(fake_redis, QUEUE_BACKEND=backend)
+    lane_queue = service.lane_queue("jobs", "pro")
+    service.enqueue("jobs", {"job_id": "limited"}, lane="pro")
+    job = service.dequeue_fair("jobs")
+
+    assert service.defer("jobs", job, 0.05)
+    assert service.get_inflight_count(lane_queue) == 0
+    assert fake_redis.zcard(service._keys("jobs")["delayed"]) == 1
+    assert service.dequeue_fair("jobs") is None
+    assert service.promote_delayed("jobs") is not None
+
+    time.sleep(0.06)
+    assert service.promote_delayed("jobs") is None
+    again = service.dequeue_fair("jobs")
+    assert (again["job_id"], again["_lane"], again["_deferrals"]) == ("limited", "pro", 1)
+    assert service.get_inflight_count(lane_queue) == 1
+    assert service.ack(again)
+
+
+def test_queue_keys_share_a_cluster_slot():
+    """A queue, its lanes and their bookkeeping keys hash to one Redis Cluster slot"""
+    from redis.crc import key_slot
+
+    names = ["jobs"] + queue_service.lane_queues("jobs")
+    keys = [queue_service._key(name) for name in names]
+    keys += [key for name in names for key in queue_service._keys(name).values()]
+    assert queue_service._key("jobs:pro") == "{jobs}:pro"
+    assert {key_slot(key.encode()) for key in keys} == {key_slot(b"{jobs}")}
@@ -0,0 +1,86 @@
+# test_quota_service.py
+from datetime import datetime, timezone
+
+import pytest
+from app.models.transpiler_job import TranspilerJob
+from app.models.usage_counter import UsageCounter
+from app.services.quota_service import QuotaService, quota_period
+
+NOW = datetime(2026, 3, 15, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db(sqlite_db):
+    return sqlite_db(TranspilerJob, UsageCounter)
+
+
+def add_job(db, job_id, user_id, submitted_at):
+    db.add(TranspilerJob(id=job_id, user_id=user_id, language="khasi", code_ref="", submitted_at=submitted_at))
+    db.commit()
+
+
+def test_quota_period():
+    assert quota_period(NOW) == (
+        "2026-03",
+        datetime(2026, 3, 1, tzinfo=timezone.utc),
+        datetime(2026, 4, 1, tzinfo=timezone.utc),
+    )
+    assert quota_period(datetime(2026, 12, 31, 23, 59, tzinfo=timezone.utc))[2].year == 2027
+
+
+def test_counter_seeded_from_existing_jobs(db):
+    """The first check of a period starts from the jobs already submitted"""
+    add_job(db, "old", 1, datetime(2026, 2, 28, tzinfo=timezone.utc))
+    add_job(db, "a", 1, datetime(2026, 3, 2, tzinfo=timezone.utc))
+    add_job(db, "b", 1, datetime(2026, 3, 3, tzinfo=timezone.utc))
+    quotas = QuotaService()
+
+    assert quotas.usage(db, 1, NOW) == 2
+    assert quotas.usage(db, 2, NOW) == 0
+    assert quotas.seeded == 2
+
+
+def test_consume_stops_at_limit(db):
+    quotas = QuotaService()
+    assert quotas.consume(db, 1, limit=2, now=NOW) == 1
+    assert quotas.consume(db, 1, limit=2, now=NOW) == 2
+    assert quotas.consume(db, 1, limit=2, now=NOW) is None
+    db.commit()
+
+    assert quotas.usage(db, 1, NOW) == 2
+    assert quotas.stats() == {"consumed": 2, "rejected": 1, "seeded": 1}
+
+
+def test_rolled_back_charge_is_not_counted(db):
+    quotas = QuotaService()
+    quotas.consume(db, 1, limit=5, now=NOW)
+    db.rollback()
+    assert quotas.usage(db, 1, NOW) == 0
+
+
+def test_reconcile_only_raises_counters(db):
+    """Missing charges are added; counters above the job count (a charge racing the
+    reconcile's snapshot) are kept"""
+    quotas = QuotaService()
+    for _ in range(3):
+        quotas.consume(db, 1, limit=10, now=NOW)
+    quotas.consume(db, 2, limit=10, now=NOW)
+    db.commit()
+    add_job(db, "a", 1, datetime(2026, 3, 2, tzinfo=timezone.utc))
+    for job_id in ("b", "c"):
+        add_job(db, job_id, 2, datetime(2026, 3, 2, tzinfo=timezone.utc))
+    add_job(db, "d", 3, datetime(2026, 3, 2, tzinfo=timezone.utc))
+
+    assert quotas.reconcile(db, NOW) == 3
+    assert quotas.usage(db, 1, NOW) == 3
+    assert quotas.usage(db, 2, NOW) == 2
+    assert quotas.usage(db, 3, NOW) == 1
+
+
+def test_usage_does_not_commit_the_callers_work(db):
+    quotas = QuotaService()
+    db.add(TranspilerJob(id="pending", user_id=1, language="khasi", code_ref="", submitted_at=NOW))
+    db.flush()
+    quotas.usage(db, 1, NOW)
+    db.rollback()
+    assert db.get(TranspilerJob, "pending") is None
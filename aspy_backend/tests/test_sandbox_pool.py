@@ -0,0 +1,189 @@
+# test_sandbox_pool.py
+import errno
+import json
+import os
+import time
+
+import pytest
+
+from app.services import sandbox_runner
+from app.services.sandbox_pool import SandboxError, SandboxPool, SandboxWorker, sandbox_supported
+
+pytestmark = pytest.mark.skipif(
+    not sandbox_supported or os.geteuid() != 0,
+    reason="Sandbox requires POSIX, seccomp and root for namespace isolation"
+)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = SandboxPool(size=2, max_runs=3)
+    pool.start()
+    yield pool
+    pool.stop()
+
+
+def test_runs_program_with_input(pool):
+    """stdout and stdin are wired through the pipe"""
+    result = pool.run_sync("name = input()\nprint('hello', name)", "desi\n", 2)
+    assert result["stdout"] == "hello desi\n"
+    assert result["exit_code"] == 0
+    assert result["violation"] is None
+
+
+def test_exception_reported_on_stderr(pool):
+    """Tracebacks start at the submitted program"""
+    result = pool.run_sync("1 / 0", None, 2)
+    assert result["exit_code"] == 1
+    assert "ZeroDivisionError" in result["stderr"]
+    assert "sandbox_runner" not in result["stderr"]
+
+
+def test_timeout_recycles_worker(pool):
+    """A runaway program is killed and its worker replaced"""
+    recycled = pool.recycled
+    result = pool.run_sync("while True:\n    pass", None, 1)
+    assert result["violation"] == "timeout"
+    assert pool.recycled == recycled + 1
+    assert pool.violations["timeout"] >= 1
+
+
+def test_no_network_or_filesystem_writes(pool):
+    """Sockets, subprocesses and file writes are refused"""
+    for code in (
+        "import socket",
+        "import os\nos.system('true')",
+        "open('/tmp/sandbox_escape', 'w').write('x')",
+        "print(open('/etc/passwd').read())",
+    ):
+        result = pool.run_sync(code, None, 2)
+        assert result["exit_code"] != 0, code
+        assert result["stdout"] == "", code
+
+
+def test_runner_state_out_of_reach(pool):
+    """The program's __main__ is its own and frames cannot lead back to the runner"""
+    result = pool.run_sync("import sys\nprint(hasattr(sys.modules['__main__'], 'BLOCKED_EVENTS'))", None, 2)
+    assert result["stdout"] == "False\n"
+    for code in ("import sys\nsys._getframe()", "try:\n    1 / 0\nexcept Exception as e:\n    e.__traceback__.tb_frame"):
+        assert "PermissionError" in pool.run_sync(code, None, 2)["stderr"], code
+
+
+def test_children_confined_by_the_kernel():
+    """Without the audit hook, an isolated child has no privileges, processes, exec or network"""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            import socket
+            sandbox_runner._isolate()
+            results = [os.getuid()]
+            for attempt in (
+                lambda: socket.socket(socket.AF_INET, socket.SOCK_STREAM),
+                lambda: os.fork() == 0 and os._exit(0),
+                lambda: os.execv("/bin/true", ["true"]),
+            ):
+                try:
+                    attempt()
+                    results.append("allowed")
+                except OSError as e:
+                    results.append(e.errno)
+            os.write(write_fd, json.dumps(results).encode())
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as stream:
+        uid, *errors = json.loads(stream.read())
+    os.waitpid(pid, 0)
+    assert uid == 65534
+    assert errors == [errno.EPERM, errno.EPERM, errno.EPERM]
+
+
+def test_runner_refuses_to_start_unconfined():
+    """A runner whose children cannot isolate themselves never reports ready"""
+    pool = SandboxPool(size=1, isolation="wrapper")
+    with pytest.raises(SandboxError, match="isolation failed"):
+        SandboxWorker(pool.command, pool.env).start()
+
+
+def test_failed_spawns_are_retried(monkeypatch):
+    """With no runner able to start, requests fail fast; the pool refills once runners start again"""
+    from app.services import sandbox_pool as sandbox_pool_module
+
+    monkeypatch.setattr(sandbox_pool_module, "SPAWN_BACKOFF", 0.05)
+    pool = SandboxPool(size=1)
+    command, pool.command = pool.command, ["false"]
+    try:
+        pool.start()
+        start = time.monotonic()
+        with pytest.raises(SandboxError, match="no sandbox worker available"):
+            pool.run_sync("print(1)", None, 2)
+        assert time.monotonic() - start < 1
+        assert pool.stats()["spawn_failures"] >= 1
+
+        pool.command = command
+        deadline = time.monotonic() + 5
+        while pool.stats()["idle"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert pool.run_sync("print(1)", None, 2)["stdout"] == "1\n"
+        assert pool.stats()["live"] == 1
+    finally:
+        pool.stop()
+
+
+def test_state_does_not_leak_between_runs(pool):
+    """Every job runs in a fresh child of the warm runner"""
+    pool.run_sync("import json\njson.leaked = True", None, 2)
+    result = pool.run_sync("import json\nprint(hasattr(json, 'leaked'))", None, 2)
+    assert result["stdout"] == "False\n"
+
+
+def test_hash_seed_is_pinned():
+    """String hashes, and so set order, are the same in every runner"""
+    first, second = SandboxPool(size=1), SandboxPool(size=1)
+    try:
+        code = "print(hash('desi'), list({'a', 'b', 'c', 'd'}))"
+        assert first.run_sync(code, None, 2)["stdout"] == second.run_sync(code, None, 2)["stdout"]
+    finally:
+        first.stop()
+        second.stop()
+
+
+def test_worker_recycled_after_max_runs():
+    """Workers are replaced after max_runs jobs"""
+    pool = SandboxPool(size=1, max_runs=2)
+    try:
+        for _ in range(2):
+            assert pool.run_sync("print(1)", None, 2)["stdout"] == "1\n"
+        assert pool.recycled == 1
+        assert pool.run_sync("print(2)", None, 2)["stdout"] == "2\n"
+    finally:
+        pool.stop()
+
+
+def test_output_streamed_while_program_runs(pool):
+    """Progress lines arrive before the program finishes"""
+    chunks = []
+    result = pool.run_sync(
+        "import sys, time\nprint('start')\ntime.sleep(0.5)\nprint('oops', file=sys.stderr)\nprint('done')", None, 3,
+        lambda stream, text: chunks.append((stream, text, time.monotonic()))
+    )
+    finished = time.monotonic()
+    assert chunks[0][:2] == ("stdout", "start\n")
+    assert finished - chunks[0][2] > 0.3
+    assert "".join(text for stream, text, _ in chunks if stream == "stdout") == result["stdout"] == "start\ndone\n"
+    assert ("stderr", "oops\n") in [chunk[:2] for chunk in chunks]
+
+
+def test_output_truncated_at_limit():
+    """Runaway output is cut at max_output_bytes and marked"""
+    pool = SandboxPool(size=1, max_output_bytes=100)
+    try:
+        chunks = []
+        result = pool.run_sync("while True:\n    print('x' * 30)", None, 2, lambda stream, text: chunks.append(text))
+        assert result["violation"] == "output_limit"
+        assert result["stdout"].endswith("\n[output truncated: limit of 100 bytes reached]\n")
+        assert len(result["stdout"].split("\n[output")[0]) == 100
+        assert "".join(chunks) == result["stdout"]
+    finally:
+        pool.stop()
@@ -0,0 +1,78 @@
+# test_transpiler_engine.py
+import time
+
+from app.services.transpiler_engine import LANGUAGE_TABLES, build_transpilers
+
+transpilers = build_transpilers()
+
+
+def test_all_languages_compiled():
+    """Every supported language has a compiled matcher"""
+    assert set(transpilers) == {"assamese", "bengali", "bodo", "manipuri", "khasi", "garo", "mizo"}
+    assert set(transpilers) == set(LANGUAGE_TABLES)
+
+
+def test_assamese_keywords():
+    """Assamese keywords and builtins become Python"""
+    code = 'প্ৰতিটো i ভিতৰত পৰিসৰ(3):\n    যদি i আৰু সঁচা:\n        প্ৰিন্ট(i)\n'
+    assert transpilers["assamese"].transpile(code) == (
+        'for i in range(3):\n    if i and True:\n        print(i)\n'
+    )
+
+
+def test_strings_and_comments_untouched():
+    """Keywords inside string literals and comments are kept verbatim"""
+    code = 'প্রিন্ট("যদি প্রিন্ট")  # যদি\nপ্রিন্ট(\'\'\'যদি\nনাহলে\'\'\')'
+    assert transpilers["bengali"].transpile(code) == (
+        'print("যদি প্রিন্ট")  # যদি\nprint(\'\'\'যদি\nনাহলে\'\'\')'
+    )
+
+
+def test_identifier_boundaries():
+    """Keywords embedded in longer identifiers are not translated"""
+    transpiler = transpilers["mizo"]
+    assert transpiler.transpile("dik = diklo or tilang_count") == "True = False or tilang_count"
+    assert transpiler.transpile("xdik = dikx") == "xdik = dikx"
+
+
+def test_alternate_spellings():
+    """Precomposed and decomposed nukta letters both match"""
+    decomposed = "নয়"
+    precomposed = "নয়"
+    assert transpilers["bengali"].transpile(decomposed) == "not"
+    assert transpilers["bengali"].transpile(precomposed) == "not"
+
+
+def test_large_submission_linear():
+    """Transpile time grows linearly with submission size"""
+    line = 'যদি মান > 10:  # মন্তব্য\n    প্ৰিন্ট("মান", মান)\n'
+    small = (line * (5000 // len(line) + 1))[:5000]
+    large = (line * (50000 // len(line) + 1))[:50000]
+    transpiler = transpilers["assamese"]
+
+    def best_of(code, runs=5):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            transpiler.transpile(code)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    transpiler.transpile(large)
+    # 10x the input may take at most ~20x the time; a quadratic matcher takes ~100x.
+    assert best_of(large) < 20 * best_of(small)
+
+
+def test_nondeterminism_detection():
+    """Randomness, clock, entropy and dynamic-import names and unlisted imports are flagged outside string literals"""
+    from app.services.transpiler_engine import uses_nondeterminism
+
+    assert uses_nondeterminism("import random\nprint(random.randint(1, 6))")
+    assert uses_nondeterminism("from datetime import date")
+    assert not uses_nondeterminism('print("random time")  # datetime')
+    assert not uses_nondeterminism("timeout = 5\nprint(timeout)")
+    assert uses_nondeterminism("import os\nprint(os.urandom(4))")
+    assert uses_nondeterminism("print(id(object()), hash('a'))")
+    assert uses_nondeterminism("m = __import__('ran' + 'dom')")
+    assert uses_nondeterminism("import math, heapq as h, shelve")
+    assert not uses_nondeterminism("import math, heapq as h\nfrom collections import Counter\nprint(math.pi)")
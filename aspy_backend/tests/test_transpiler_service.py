@@ -0,0 +1,115 @@
+# test_transpiler_service.py
+import asyncio
+import time
+
+import pytest
+
+from app.services.transpiler_service import TranspilerService
+
+
+def test_transpile_and_execute():
+    """Transpiled code and output are returned without blocking"""
+    service = TranspilerService()
+    result = asyncio.run(service.transpile_and_execute('প্ৰিন্ট("নমস্কাৰ")', "assamese"))
+    assert result["success"]
+    assert 'print("নমস্কাৰ")' in result["transpiled_code"]
+    assert result["execution_time"] < 0.5
+
+
+def test_unsupported_language():
+    """Unknown languages fail cleanly"""
+    service = TranspilerService()
+    result = asyncio.run(service.transpile_and_execute("print(1)", "klingon"))
+    assert not result["success"]
+    assert "Unsupported language" in result["error"]
+
+
+def test_parallel_submissions_overlap(monkeypatch):
+    """N slow submissions finish in about the slowest latency, not the sum"""
+    service = TranspilerService()
+    delay = 0.3
+    original = service.transpile
+
+    def slow_transpile(code, language):
+        time.sleep(delay)
+        return original(code, language)
+
+    monkeypatch.setattr(service, "transpile", slow_transpile)
+
+    async def run_all(count):
+        return await asyncio.gather(*[
+            service.transpile_and_execute(f"print({i})", "khasi") for i in range(count)
+        ])
+
+    count = min(service.cpu_executor._max_workers, 8)
+    start = time.perf_counter()
+    results = asyncio.run(run_all(count))
+    elapsed = time.perf_counter() - start
+
+    assert all(result["success"] for result in results)
+    assert elapsed < delay * 2, f"{count} submissions took {elapsed:.2f}s"
+
+
+def test_transpile_cache_hit():
+    """Identical submissions skip transpilation on the second run"""
+    from app.services.cache_service import transpile_cache
+
+    service = TranspilerService()
+    code = 'দেখুৱাও("cache")  # transpile cache test'
+    first = asyncio.run(service.transpile_and_execute(code, "assamese"))
+    hits_before = transpile_cache.memory.hits
+    second = asyncio.run(service.transpile_and_execute(code, "assamese"))
+
+    assert not first["transpile_cache_hit"]
+    assert second["transpile_cache_hit"]
+    assert second["transpiled_code"] == first["transpiled_code"]
+    assert transpile_cache.memory.hits == hits_before + 1
+
+
+def test_execution_cache(monkeypatch):
+    """Deterministic programs are memoized; programs using randomness are not"""
+    from app.services import transpiler_service as module
+
+    monkeypatch.setattr(module, "execution_cache_enabled", True)
+    service = TranspilerService()
+
+    pure = 'প্ৰিন্ট("pure")  # execution cache test'
+    first = asyncio.run(service.transpile_and_execute(pure, "assamese", input_data="1", timeout=5))
+    second = asyncio.run(service.transpile_and_execute(pure, "assamese", input_data="1", timeout=5))
+    other_input = asyncio.run(service.transpile_and_execute(pure, "assamese", input_data="2", timeout=5))
+
+    assert not first["execution_cache_hit"]
+    assert second["execution_cache_hit"]
+    assert second["output"] == first["output"]
+    assert not other_input["execution_cache_hit"]
+
+    chunks = []
+    streamed = asyncio.run(service.transpile_and_execute(
+        pure, "assamese", input_data="1", timeout=5, on_output=lambda stream, text: chunks.append((stream, text))))
+    assert streamed["execution_cache_hit"]
+    assert "".join(text for stream, text in chunks if stream == "stdout") == first["output"]
+
+    impure = 'আমদানি random\nপ্ৰিন্ট(random.random())'
+    asyncio.run(service.transpile_and_execute(impure, "assamese"))
+    again = asyncio.run(service.transpile_and_execute(impure, "assamese"))
+    assert not again["execution_cache_hit"]
+
+
+def test_execution_failure_reported(monkeypatch):
+    """A program that raises fails the job and surfaces the traceback"""
+    import os
+
+    from app.services import transpiler_service
+    from app.services.sandbox_pool import sandbox_supported
+
+    if not sandbox_supported or os.geteuid() != 0:
+        pytest.skip("Sandbox requires POSIX, seccomp and root for namespace isolation")
+    monkeypatch.setattr(transpiler_service, "sandbox_enabled", True)
+    service = TranspilerService()
+    ok = asyncio.run(service.transpile_and_execute('প্ৰিন্ট("নমস্কাৰ")', "assamese"))
+    failed = asyncio.run(service.transpile_and_execute("pynpaw(1 / 0)", "khasi"))
+
+    assert ok["output"] == "নমস্কাৰ\n"
+    assert not failed["success"]
+    assert failed["exit_code"] == 1
+    assert "ZeroDivisionError" in failed["errors"]
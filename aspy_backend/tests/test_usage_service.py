@@ -0,0 +1,73 @@
+# test_usage_service.py
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.models.transpiler_job import JobStatus, TranspilerJob
+from app.models.usage_rollup import UsageRollup
+from app.services.usage_service import UsageRollupService, usage_day
+
+
+@pytest.fixture
+def db(sqlite_db):
+    return sqlite_db(TranspilerJob, UsageRollup)
+
+
+def add_job(db, job_id, submitted_at, status=JobStatus.COMPLETED, success=True, ms=100, language="khasi"):
+    db.add(TranspilerJob(
+        id=job_id, user_id=1, language=language, code_ref="", submitted_at=submitted_at,
+        status=status, success=success, execution_time_ms=ms
+    ))
+    db.commit()
+
+
+def test_usage_day_is_utc():
+    ist = timezone(timedelta(hours=5, minutes=30))
+    assert usage_day(datetime(2026, 3, 1, 1, 30, tzinfo=ist)) == date(2026, 2, 28)
+    assert usage_day(datetime(2026, 3, 31, 23, 0, tzinfo=timezone.utc)) == date(2026, 3, 31)
+    assert usage_day(datetime(2026, 3, 1, 3, 0)) == date(2026, 3, 1)
+
+
+def test_record_accumulates_per_day_and_language(db):
+    usage = UsageRollupService()
+    at = datetime(2026, 3, 15, 12, 0, tzinfo=timezone.utc)
+    usage.record(db, 1, "khasi", True, 120, at)
+    usage.record(db, 1, "khasi", False, 80, at)
+    usage.record(db, 1, "mizo", True, None, at)
+    usage.record(db, 1, "khasi", True, 50, datetime(2026, 2, 27, tzinfo=timezone.utc))
+    usage.record(db, 2, "khasi", True, 999, at)
+    db.commit()
+
+    row = db.get(UsageRollup, (1, date(2026, 3, 15), "khasi"))
+    assert (row.executions, row.successes, row.execution_ms) == (2, 1, 200)
+    assert usage.summary(db, 1, date(2026, 3, 1)) == {
+        "executions": 4, "successes": 3, "execution_ms": 250, "period_executions": 3, "period_successes": 2
+    }
+    assert usage.summary(db, 3, date(2026, 3, 1))["executions"] == 0
+    assert usage.last_execution(db, 1) is not None
+    assert usage.last_execution(db, 3) is None
+
+
+def test_backfill_matches_recorded_rollups(db):
+    add_job(db, "job_1", datetime(2026, 2, 27, 10, 0))
+    add_job(db, "job_2", datetime(2026, 3, 15, 9, 0), status=JobStatus.FAILED, success=False, ms=40)
+    add_job(db, "job_3", datetime(2026, 3, 15, 18, 0), ms=60)
+    add_job(db, "job_4", datetime(2026, 3, 15, 19, 0), status=JobStatus.QUEUED, success=False, ms=None)
+    add_job(db, "job_5", datetime(2026, 3, 16, 8, 0), status=JobStatus.CANCELLED, success=False, ms=None)
+
+    usage = UsageRollupService()
+    # Drifted and archived-day rollups: the first is corrected, the second kept
+    usage.record(db, 1, "khasi", True, 1, datetime(2026, 3, 15, tzinfo=timezone.utc))
+    usage.record(db, 1, "khasi", True, 1, datetime(2025, 1, 2, tzinfo=timezone.utc))
+    db.commit()
+
+    assert usage.backfill(db) == 2
+    rows = db.execute(select(
+        UsageRollup.day, UsageRollup.executions, UsageRollup.successes, UsageRollup.execution_ms
+    ).order_by(UsageRollup.day)).all()
+    assert [tuple(row) for row in rows] == [
+        (date(2025, 1, 2), 1, 1, 1),
+        (date(2026, 2, 27), 1, 1, 100),
+        (date(2026, 3, 15), 2, 1, 100),
+    ]
@@ -0,0 +1,87 @@
+# test_user_cache_service.py
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.models  # noqa: F401 - configures the User relationships
+from app.core.security import create_access_token, get_current_user
+from app.db.base import Base
+from app.models.user import User
+from app.services.user_cache_service import user_cache
+
+
+@pytest.fixture
+def Session(tmp_path):
+    path = tmp_path / "users.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[User.__table__])
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert().values(id=1, username="asha", email="asha@example.com", password="x"))
+    engine.dispose()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    queries = async_engine.sync_engine.queries = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+    user_cache.users.clear()
+    user_cache.tokens.clear()
+    yield async_sessionmaker(async_engine, expire_on_commit=False)
+    user_cache.users.clear()
+    asyncio.run(async_engine.dispose())
+
+
+def authenticate(Session, token, change=None):
+    async def run():
+        async with Session() as db:
+            user = await get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token), db)
+            if change:
+                change(user)
+                await db.commit()
+            return user.username
+    return asyncio.run(run())
+
+
+def test_cached_user_needs_no_queries(Session):
+    token = create_access_token({"sub": "asha@example.com", "user_id": 1})
+    engine = Session.kw["bind"].sync_engine
+
+    assert authenticate(Session, token) == "asha"
+    engine.queries.clear()
+    assert authenticate(Session, token) == "asha"
+    assert engine.queries == []
+    assert user_cache.tokens.hits == 1
+
+
+def test_profile_change_invalidates(Session):
+    token = create_access_token({"sub": "asha@example.com", "user_id": 1})
+    authenticate(Session, token)
+
+    async def change_email():
+        async with Session() as db:
+            (await db.get(User, 1)).email = "asha@new.example.com"
+            await db.commit()
+    asyncio.run(change_email())
+
+    # The old token names the old email, so it no longer authenticates
+    with pytest.raises(HTTPException) as excinfo:
+        authenticate(Session, token)
+    assert excinfo.value.status_code == 401
+
+    new_token = create_access_token({"sub": "asha@new.example.com", "user_id": 1})
+    assert authenticate(Session, new_token) == "asha"
+
+
+def test_cached_user_can_be_updated(Session):
+    """The user handed to an endpoint is attached to its session"""
+    token = create_access_token({"sub": "asha@example.com", "user_id": 1})
+    authenticate(Session, token)
+    authenticate(Session, token, change=lambda user: setattr(user, "stripe_customer_id", "cus_123"))
+
+    async def stored():
+        async with Session() as db:
+            return await db.scalar(select(User.stripe_customer_id).where(User.id == 1))
+    assert asyncio.run(stored()) == "cus_123"
+    assert user_cache.users.get(1) is None
@@ -0,0 +1,159 @@
+# test_worker_service.py
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+from app.services.queue_service import queue_service
+from app.services.worker_services import WorkerService
+
+pytestmark = pytest.mark.skipif(queue_service.use_redis, reason="Exercises the in-memory queue")
+
+
+def make_worker(monkeypatch, queue_name, concurrency, delay, finished):
+    worker = WorkerService()
+    worker.queue_name = queue_name
+    worker.concurrency = concurrency
+    worker.dequeue_timeout = 1
+
+    async def fake_run_job(job_data):
+        await asyncio.sleep(delay)
+        finished.append(job_data["job_id"])
+
+    monkeypatch.setattr(worker, "_run_job", fake_run_job)
+    return worker
+
+
+def test_jobs_run_concurrently(monkeypatch):
+    """K jobs finish in about one job's latency, and all are acknowledged"""
+    finished = []
+    worker = make_worker(monkeypatch, "test_concurrent", concurrency=4, delay=0.3, finished=finished)
+
+    async def scenario():
+        for i in range(4):
+            queue_service.enqueue("test_concurrent", {"job_id": str(i)}, lane="pro")
+        runner = asyncio.create_task(worker.start())
+        start = time.perf_counter()
+        while len(finished) < 4 and time.perf_counter() - start < 3:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        worker.stop()
+        await runner
+        return elapsed
+
+    elapsed = asyncio.run(scenario())
+    assert sorted(finished) == ["0", "1", "2", "3"]
+    assert elapsed < 0.6
+    assert queue_service.get_inflight_count(queue_service.lane_queue("test_concurrent", "pro")) == 0
+
+
+def test_stop_drains_in_flight_jobs(monkeypatch):
+    """stop() waits for running jobs instead of dropping them"""
+    finished = []
+    worker = make_worker(monkeypatch, "test_drain", concurrency=2, delay=0.3, finished=finished)
+
+    async def scenario():
+        queue_service.enqueue("test_drain", {"job_id": "a"}, lane="free")
+        queue_service.enqueue("test_drain", {"job_id": "b"}, lane="free")
+        runner = asyncio.create_task(worker.start())
+        await asyncio.sleep(0.1)
+        worker.stop()
+        await asyncio.wait_for(runner, timeout=3)
+
+    asyncio.run(scenario())
+    assert sorted(finished) == ["a", "b"]
+
+
+def test_drain_timeout_leaves_job_leased(monkeypatch):
+    """A job cut off by the drain timeout is not acknowledged"""
+    finished = []
+    worker = make_worker(monkeypatch, "test_abandon", concurrency=1, delay=5, finished=finished)
+    worker.drain_timeout = 0.1
+
+    async def scenario():
+        queue_service.enqueue("test_abandon", {"job_id": "slow"}, lane="free")
+        runner = asyncio.create_task(worker.start())
+        await asyncio.sleep(0.1)
+        worker.stop()
+        await asyncio.wait_for(runner, timeout=3)
+
+    asyncio.run(scenario())
+    assert finished == []
+    assert queue_service.get_inflight_count(queue_service.lane_queue("test_abandon", "free")) == 1
+
+
+def test_plan_concurrency_limit_defers_jobs(monkeypatch):
+    """Jobs over the account's concurrent_executions wait for a slot instead of running"""
+    finished = []
+    running = []
+    peak = []
+    worker = make_worker(monkeypatch, "test_plan_limit", concurrency=3, delay=0, finished=finished)
+    worker.defer_delay = 0.05
+
+    async def fake_run_job(job_data):
+        running.append(job_data["job_id"])
+        peak.append(len(running))
+        await asyncio.sleep(0.1)
+        running.remove(job_data["job_id"])
+        finished.append(job_data["job_id"])
+
+    monkeypatch.setattr(worker, "_run_job", fake_run_job)
+
+    async def scenario():
+        for i in range(3):
+            queue_service.enqueue("test_plan_limit", {
+                "job_id": str(i), "user_id": "limited-user", "concurrency_limit": 1
+            }, lane="free")
+        runner = asyncio.create_task(worker.start())
+        start = time.perf_counter()
+        while len(finished) < 3 and time.perf_counter() - start < 5:
+            await asyncio.sleep(0.01)
+        worker.stop()
+        await runner
+
+    asyncio.run(scenario())
+    assert sorted(finished) == ["0", "1", "2"]
+    assert max(peak) == 1
+    assert worker.jobs_deferred > 0
+
+
+def test_redelivered_job_is_billed_once(tmp_path, monkeypatch):
+    """A job finished by two deliveries counts once in usage and on the subscription"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.db.base import Base
+    from app.models.payload_blob import PayloadBlob
+    from app.models.subscription import Plan, Subscription, SubscriptionStatus
+    from app.models.transpiler_job import JobStatus, TranspilerJob
+    from app.models.usage_rollup import UsageRollup
+    from app.models.user import User
+    from app.services import worker_services
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, Plan.__table__, Subscription.__table__, TranspilerJob.__table__,
+        UsageRollup.__table__, PayloadBlob.__table__
+    ])
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(User(id=1, username="u", email="u@example.com", password="x"))
+        db.add(Subscription(user_id=1, status=SubscriptionStatus.ACTIVE, executions_this_month=0, total_executions=0))
+        db.add(TranspilerJob(
+            id="job_1", user_id=1, language="khasi", code_ref="", status=JobStatus.PROCESSING,
+            submitted_at=datetime(2026, 10, 17, 12, 0)
+        ))
+        db.commit()
+    monkeypatch.setattr(worker_services, "SessionLocal", Session)
+
+    worker = WorkerService()
+    result = {"success": True, "output": "ok\n", "errors": "", "transpiled_code": "print('ok')"}
+    worker._finish_job("job_1", result, 0.01)
+    worker._finish_job("job_1", result, 0.01)
+
+    with Session() as db:
+        subscription = db.query(Subscription).one()
+        assert (subscription.executions_this_month, subscription.total_executions) == (1, 1)
+        assert db.query(UsageRollup).one().executions == 1
+        assert db.get(TranspilerJob, "job_1").status == JobStatus.COMPLETED